@@ -0,0 +1,82 @@
+import pandas as pd
+import numpy as np
+
+# Rasterization of the objects in the environment to the air grid.
+#
+# Function that determines which cells of the air grid fall within impenetrable
+# objects, so that they can be made into `Void`s.
+def rasterize_voids(objects,
+                    origin,
+                    cell_size,
+                    width,
+                    height):
+    """"Rasterize objects to void cells
+
+    The center of each cell of the air grid is tested against each of the
+    polygons with the even-odd rule. Rather than testing each cell separately,
+    all cells within the bounding box of a polygon are tested at once against
+    one edge of the polygon at a time, so that the cost scales with the number
+    of edges rather than with the number of cells times the number of edges in
+    the interpreter.
+
+    Parameters
+    ----------
+    objects : list
+        List of arrays of shape (n, 2) containing the corner points of each of
+        the objects, as returned by `predped::points`. Circles are approximated
+        by the polygon through their points.
+    origin : array
+        Lower-left corner of the environment, in the units of the points.
+    cell_size : float
+        Size of a single air cell, in the units of the points.
+    width : int
+        Number of air cells in the x-direction.
+    height : int
+        Number of air cells in the y-direction.
+
+    Returns
+    -------
+    pd.DataFrame
+        Pandas dataframe containing the indices of the air cells ("x", "y") of
+        which the center falls within any of the objects, one cell per row.
+    """
+
+    origin = np.asarray(origin, dtype = float).ravel()
+    width = int(width)
+    height = int(height)
+
+    # Centers of the cells on the grid
+    centers_x = origin[0] + (np.arange(width) + 0.5) * cell_size
+    centers_y = origin[1] + (np.arange(height) + 0.5) * cell_size
+
+    mask = np.zeros((width, height), dtype = bool)
+    for points in objects:
+        points = np.asarray(points, dtype = float).reshape(-1, 2)
+        if len(points) < 3:
+            continue
+
+        # Only consider the cells within the bounding box of the polygon
+        lower = np.searchsorted(centers_x, points[:, 0].min())
+        upper = np.searchsorted(centers_x, points[:, 0].max(), side = "right")
+        left = np.searchsorted(centers_y, points[:, 1].min())
+        right = np.searchsorted(centers_y, points[:, 1].max(), side = "right")
+        if lower >= upper or left >= right:
+            continue
+
+        x = centers_x[lower:upper, None]
+        y = centers_y[None, left:right]
+
+        # Even-odd rule: a center is within the polygon if a ray to its right
+        # crosses an odd number of edges
+        within = np.zeros((upper - lower, right - left), dtype = bool)
+        for (x1, y1), (x2, y2) in zip(points, np.roll(points, -1, axis = 0)):
+            if y1 == y2:
+                continue
+            crosses = (y1 > y) != (y2 > y)
+            crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            within ^= crosses & (x < crossing_x)
+
+        mask[lower:upper, left:right] |= within
+
+    x, y = np.nonzero(mask)
+    return pd.DataFrame({"x": x.astype(int), "y": y.astype(int)})
@@ -2,6 +2,7 @@ import ipdb
 
 from qvemod.corona_model.model import Model
 
-from utility import select, dfs_to_object, df_to_object
+from utility import select, index_by_id, dfs_to_object, df_to_object
 from translate import translate_data, translate_env, translate_items, translate_row, translate_surf
-from run_model import run_model
+from geometry import rasterize_voids
+from run_model import run_model, run_ensemble, run_sweep, run_sensitivity
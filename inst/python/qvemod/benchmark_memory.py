@@ -0,0 +1,161 @@
+import argparse
+import random
+import tracemalloc
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__)
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.environment import Environment
+from corona_model.air import Void, Edge
+from corona_model.barriers import Wall, Shield
+from corona_model.model import Model
+from corona_model.actions import *
+from corona_model.surfaces import Item, Fixture
+from corona_model.script import Script
+
+# Memory benchmark on a supermarket-like model: a 30 x 20 m store at MobilityCellSize 10 cm and AirCellSize 50 cm with
+# rows of shelves (walls around void cells), a checkout area behind shields, products on the shelves and shoppers
+# walking the aisles. Prints the memory held by each part of the model, as measured by tracemalloc, next to that of
+# the same objects with their attributes in a __dict__ instead of __slots__, and the ratio of the two. The saving of the
+# compact Scripts over dicts of Actions is reported on a line of its own.
+
+CONFIG = {
+    'env': {'AirCellSize': 50, 'MobilityCellSize': 10, 'AgentReach': 50},
+    'output': {},
+}
+
+
+def shelves(width, height, wrap=lambda obj: obj):
+    """Walls around and voids within the shelves, in air cells"""
+    barriers, voids = [], []
+    for x in range(4, width - 4, 6):
+        x1, y1, x2, y2 = x, 4, x + 2, height - 10
+        barriers += [wrap(Wall(x1, y1, x2, y1)), wrap(Wall(x2, y1, x2, y2)), wrap(Wall(x2, y2, x1, y2)),
+                     wrap(Wall(x1, y2, x1, y1))]
+        voids += [wrap(Void(i, j)) for i in range(x1, x2) for j in range(y1, y2)]
+    barriers += [wrap(Shield(x, height - 6, x, height - 2)) for x in range(6, width - 6, 4)]
+    return barriers, voids
+
+
+_plain_classes = {}
+
+
+def plain(obj, **attributes):
+    """A copy of an object with __slots__ that keeps the same attributes, or those given, in a __dict__"""
+    # A class per class of the objects, so that the copies share the keys of their __dict__ as instances of that class
+    # would
+    cls = type(obj)
+    if cls not in _plain_classes:
+        _plain_classes[cls] = type(cls.__name__, (), {})
+    copy = _plain_classes[cls]()
+    for base in cls.__mro__:
+        for name in getattr(base, '__slots__', ()):
+            if hasattr(obj, name):
+                setattr(copy, name, attributes.get(name, getattr(obj, name)))
+    return copy
+
+
+def script(rng, width, height, ticks, wrap=lambda action: action):
+    """Script of a shopper that enters, wanders through the aisles, picks up products and leaves"""
+    x, y = 1, 1
+    actions = {0: wrap(Enter(x, y, 'N'))}
+    for tick in range(1, ticks - 1):
+        r = rng.random()
+        if r < 0.05:
+            actions[tick] = wrap(Pickup('product {}'.format(rng.randrange(200))))
+        elif r < 0.3:
+            actions[tick] = wrap(Face(rng.choice('NSEW')))
+        else:
+            dx, dy = rng.choice(((1, 0), (-1, 0), (0, 1), (0, -1)))
+            if 0 <= x + dx < width and 0 <= y + dy < height:
+                x, y = x + dx, y + dy
+                actions[tick] = wrap(Move(dx, dy, facing=rng.choice('NSEW')))
+    actions[ticks - 1] = wrap(Leave())
+    return actions
+
+
+def measure(build):
+    """Memory in bytes held by the result of build, and the result itself"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def compare(label, build, rng, unit=2 ** 20, sides=('with __dict__', 'with __slots__')):
+    """
+    Print the memory held by the objects of build(rng, wrap) with and without __slots__, on the same random numbers
+
+    :param build: Function of the random generator and a function that is applied to every object with __slots__,
+                  plain for the baseline
+    :param sides: Descriptions of the baseline and of the objects as they are
+    :return: The objects with __slots__
+    """
+    state = rng.getstate()
+    baseline, _ = measure(lambda: build(rng, plain))
+    rng.setstate(state)
+    size, result = measure(lambda: build(rng, lambda obj: obj))
+    suffix = 'MB' if unit == 2 ** 20 else 'kB'
+    print('{}: {:.1f} {} {}, {:.1f} {} {} ({:.2f})'.format(
+        label.format(len(result)), baseline / unit, suffix, sides[0], size / unit, suffix, sides[1], size / baseline))
+    return result
+
+
+def main(agents, ticks, seed):
+    width, height = 300, 200  # Mobility cells
+    air_width, air_height = width // 5, height // 5
+    rng = random.Random(seed)
+
+    compare('Actions ({{}} scripts of {} ticks)'.format(ticks),
+            lambda rng, wrap: [script(rng, width, height, ticks, wrap) for _ in range(agents)], rng)
+
+    # The same scripts as compact Scripts, which keep their actions in arrays instead of Action objects
+    scripts = compare('Scripts', lambda rng, wrap: [script(rng, width, height, ticks) if wrap is plain else
+                                                    Script(script(rng, width, height, ticks)) for _ in range(agents)],
+                      rng, sides=('as dicts of Actions', 'as compact Scripts'))
+
+    # Agents that keep these Scripts, measured without the Scripts themselves
+    crowd = compare('Agents ({})', lambda rng, wrap: [
+        wrap(Agent('shopper {}'.format(i), int(i == 0), 0, 0, 0, 0.53, 0.47, 2.3, 2.3, scripts[i]))
+        for i in range(agents)], rng, 2 ** 10)
+
+    surfaces = compare('Surfaces ({})', lambda rng, wrap: (
+        [wrap(Item('product {}'.format(i), rng.randrange(width), rng.randrange(height), 0.7, 0.2, 0.274))
+         for i in range(200)] +
+        [wrap(Fixture('shelf {}'.format(i), rng.randrange(width), rng.randrange(height), 0.5, 0.8, 15, 0.969))
+         for i in range(40)]), rng, 2 ** 10)
+
+    barriers, voids = compare('Barriers and voids', lambda rng, wrap: shelves(air_width, air_height, wrap), rng,
+                              2 ** 10)
+
+    compare('Edges ({})', lambda rng, wrap: [wrap(Edge(x, y, x + dx, y + dy)) for x in range(air_width - 1)
+                                             for y in range(air_height - 1) for dx, dy in ((1, 0), (0, 1))],
+            rng, 2 ** 10)
+
+    def model():
+        env = Environment(height, width, 1.51, 0.3, 0.262, 0.2, 18.18, barriers=barriers, walls=voids)
+        env.set_config(CONFIG)
+        return Model(ticks, env, crowd, surfaces=surfaces)
+    size, _ = measure(model)
+    print('Environment: {:.1f} MB'.format(size / 2 ** 20))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--agents', default=500, type=int)
+    parser.add_argument('--ticks', default=1000, type=int)
+    parser.add_argument('--seed', default=1, type=int)
+    args = parser.parse_args()
+    main(args.agents, args.ticks, args.seed)
@@ -1,7 +1,7 @@
 class DoffMask:
     """Take of Mask returning Emission and Pickup to and from Air and Droplet Layers to effected rates"""
-    def __init__(self):
-        self.type = 'doffmask'
+    type = 'doffmask'
+    __slots__ = ()
 
     def serialize(self):
         return {
@@ -1,7 +1,7 @@
 class DonMask:
     """Put on Mask reducing Emission and Pickup to and from Air and Droplet Layers"""
-    def __init__(self):
-        self.type = 'donmask'
+    type = 'donmask'
+    __slots__ = ()
 
     def serialize(self):
         return {
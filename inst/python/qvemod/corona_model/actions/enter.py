@@ -1,7 +1,9 @@
 class Enter:
     """Used to place the Agent in their initial entry point in the Environment"""
+    type = 'enter'
+    __slots__ = ('x', 'y', 'facing')
+
     def __init__(self, x, y, facing='N'):
-        self.type = 'enter'
         self.x = x
         self.y = y
         assert facing in ('N', 'S', 'E', 'W')
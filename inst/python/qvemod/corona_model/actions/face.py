@@ -1,6 +1,8 @@
 class Face:
+    type = 'face'
+    __slots__ = ('direction',)
+
     def __init__(self, direction):
-        self.type = 'face'
         self.direction = direction
 
     def serialize(self):
@@ -1,7 +1,7 @@
 class Handwash:
     """Reduce Contamination Load from surfaces for a time period"""
-    def __init__(self):
-        self.type = 'handwash'
+    type = 'handwash'
+    __slots__ = ()
 
     def serialize(self):
         return {
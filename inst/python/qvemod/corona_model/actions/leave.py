@@ -1,6 +1,6 @@
 class Leave:
-    def __init__(self):
-        self.type = 'leave'
+    type = 'leave'
+    __slots__ = ()
 
     def serialize(self):
         return {
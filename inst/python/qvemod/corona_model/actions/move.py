@@ -1,6 +1,8 @@
 class Move:
+    type = 'move'
+    __slots__ = ('x', 'y', 'facing')
+
     def __init__(self, x, y, facing=None):
-        self.type = 'move'
         self.x = x
         self.y = y
         assert facing in ('N', 'S', 'E', 'W') or facing is None
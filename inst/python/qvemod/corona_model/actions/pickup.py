@@ -1,6 +1,8 @@
 class Pickup:
+    type = 'pickup'
+    __slots__ = ('target',)
+
     def __init__(self, target):
-        self.type = 'pickup'
         self.target = target
 
     def serialize(self):
@@ -1,6 +1,8 @@
 class Putdown:
+    type = 'putdown'
+    __slots__ = ('target',)
+
     def __init__(self, target):
-        self.type = 'putdown'
         self.target = target
 
     def serialize(self):
@@ -1,5 +1,6 @@
 import warnings
 import random
+from functools import partial
 import ipdb
 
 # Add the QVEmod package to the system path. Needed to import corona_model as 
@@ -18,10 +19,16 @@ if not filename in sys.path:
 from corona_model.actions import *
 from corona_model.facing import Facing
 from corona_model.surfaces import Fixture
+from corona_model.script import Script
+from corona_model.streams import agent_seeds, draw_ticks_to_cough
 
 
 class Agent:
     class_counter = 0
+    __slots__ = ('id', 'name', 'viral_load', 'contamination_load_air', 'contamination_load_droplet',
+                 'contamination_load_surface_accumulation', 'emission_rate_air', 'emission_rate_droplet', 'pick_up_air',
+                 'pick_up_droplet', 'script', 'is_active', 'held', 'effects', 'facing', 'queued_cough', 'config',
+                 'rng', 'ticks_to_cough', '_initial', '_own_script')
 
     def __init__(self, name, viral_load, contamination_load_air, contamination_load_droplet, contamination_load_surface,
                  emission_rate_air, emission_rate_droplet, pick_up_air, pick_up_droplet,
@@ -36,12 +43,13 @@ class Agent:
         self.emission_rate_droplet = emission_rate_droplet
         self.pick_up_air = pick_up_air
         self.pick_up_droplet = pick_up_droplet
-        self.script = script
+        self.script: Script = script if isinstance(script, Script) else Script(script)
+        self._own_script = None  # Set while the Agent follows the Script given to follow
         first_action = None
-        if not script:
+        if not self.script:
             warnings.warn('Agent {} has no script'.format(name))
         else:  # Check first action
-            first_action = script[min(script.keys())]
+            first_action = self.script.action(0)
             if not isinstance(first_action, Enter):
                 warnings.warn('First script action is not Enter, Agent {} will never be active'.format(name))
         self.is_active = is_active
@@ -57,18 +65,66 @@ class Agent:
         Agent.class_counter += 1
     
         self.config = None
+        self.rng = None  # Random stream of the Agent, set by set_config
+        self.ticks_to_cough = None  # Active ticks until the next cough, drawn by set_config
+
+        # State to return to on reset
+        self._initial = (contamination_load_air, contamination_load_droplet, contamination_load_surface, is_active,
+                         bool(wearing_mask), self.facing)
+
+    def reset(self):
+        """Return the Agent to the state it was created in, keeping its parameters and Script"""
+        if self._own_script is not None:
+            self.script, self._own_script = self._own_script, None
+        (self.contamination_load_air, self.contamination_load_droplet, self.contamination_load_surface_accumulation,
+         self.is_active, wearing_mask, self.facing) = self._initial
+        self.held = list()
+        self.effects = list()
+        if wearing_mask:
+            self.don_mask()
+        self.queued_cough = False
+        self.config = None
+        self.rng = None
+        self.ticks_to_cough = None
 
-    def set_config(self, config):
+    def follow(self, script: Script) -> None:
+        """Follow the given Script, such as a fixed copy of its own, instead of its own Script until the next reset"""
+        if self._own_script is None:
+            self._own_script = self.script
+        self.script = script
+
+    @property
+    def own_script(self) -> Script:
+        """The Script of the Agent itself, also while it follows another one"""
+        return self.script if self._own_script is None else self._own_script
+
+    def set_config(self, config, seed: int = None):
+        """
+        :param seed: Seed of the random stream of the Agent, as derived by the Model for each of its Agents. Defaults to
+                     one derived from the Seed in the config, or from the global random state without one, and the
+                     name of the Agent.
+        """
         self.config = config
 
         # ipdb.set_trace()
         if self.viral_load > 0:
-            def maybe_cough():
-                if (random.random() <
-                        config['env']['CoughingRate'] *
-                        config['env']['SimulationTimeStep']):
-                    self.queued_cough = True
-            self.effects.append(Effect('coughing', event=maybe_cough))
+            # Every Agent draws from its own stream, so that its coughs do not depend on the other Agents
+            if seed is None:
+                run_seed = config['env'].get('Seed')
+                seed = agent_seeds(random.getrandbits(64) if run_seed is None else run_seed, [self.name])[0]
+            self.rng = random.Random(seed)
+            self.ticks_to_cough = self._draw_ticks_to_cough()
+            self.effects.append(Effect('coughing', event=self._count_down_cough))
+
+    def _draw_ticks_to_cough(self):
+        return draw_ticks_to_cough(self.rng, self.config['env']['CoughingRate'] * self.config['env']['SimulationTimeStep'])
+
+    # Events of Effects are methods rather than closures, so that Agents can be pickled in a checkpoint
+    def _count_down_cough(self):
+        self.ticks_to_cough -= 1
+        if self.ticks_to_cough <= 0:
+            self.queued_cough = True
+            self.ticks_to_cough = self._draw_ticks_to_cough()
 
     def emit_aerosol(self):
         emission_load = (self.viral_load * self.emission_rate_air *
@@ -162,10 +218,7 @@ class Agent:
                 return  # Do not add another
 
         # No existing handwash effect found so start a new one
-        end_handwashing_effect_contamination_load = self.contamination_load_surface_accumulation
-
-        def end_handwashing_effect():
-            self.contamination_load_surface_accumulation = end_handwashing_effect_contamination_load
+        end_handwashing_effect = partial(self._end_handwashing_effect, self.contamination_load_surface_accumulation)
 
         duration = (self.config['env']['HandwashingEffectDuration'] /
                     self.config['env']['SimulationtimeStep'])
@@ -174,6 +227,9 @@ class Agent:
                                                         self.config['env']['HandwashingContaminationFraction'])
         self.effects.append(e)
 
+    def _end_handwashing_effect(self, contamination_load):
+        self.contamination_load_surface_accumulation = contamination_load
+
     def don_mask(self):
         if not self.under_effect('wearing_mask'):
             e = Effect('wearing_mask')
@@ -217,14 +273,20 @@ class Agent:
             'emission_rate_droplet': self.emission_rate_droplet,
             'pick_up_air': self.pick_up_air,
             'pick_up_droplet': self.pick_up_droplet,
-            'script': {k: a.serialize() for k, a in self.script.items()},
+            'script': self.own_script.serialize(),
             'is_active': self.is_active,
             'wearing_mask': self.under_effect('wearing_mask'),
         }
 
     @classmethod
     def deserialize(cls, serial):
-        # Create a new dictionary where the keys will be integers
+        if 'ticks' in serial['script']:  # Compact Script
+            serial['script'] = Script.deserialize(serial['script'])
+            if 'contamination_fraction' in serial:
+                serial.pop('contamination_fraction')
+            return Agent(**serial)
+
+        # Legacy script: create a new dictionary where the keys will be integers
         # rather than strings, thus matching their original
         # definition.
         script = dict()
@@ -254,6 +316,8 @@ class Agent:
 
 
 class Effect:
+    __slots__ = ('name', 'remaining_ticks', 'event', 'conclusion')
+
     def __init__(self, name, duration=None, event=None, conclusion=None):
         self.name = name  # type of effect
         self.remaining_ticks = duration
@@ -1,5 +1,5 @@
 import math
-from typing import List, Tuple, Union, Dict
+from typing import List, Sequence, Tuple, Union, Dict
 from enum import auto, Enum
 from copy import deepcopy
 
@@ -19,6 +19,7 @@ if not filename in sys.path:
 from corona_model.facing import Facing
 from corona_model.barriers import Wall, Shield
 from corona_model.emissionpatterns import EmissionPattern
+from corona_model.geometry_cache import GeometryCache
 
 
 class OutOfBoundsException(Exception):
@@ -27,6 +28,7 @@ class OutOfBoundsException(Exception):
 
 class Void:
     """A dead air cell which is used as the legacy definition of Walls"""
+    __slots__ = ('x', 'y')
 
     def __init__(self, x, y):
         self.x = x
@@ -58,6 +60,7 @@ class Void:
 
 
 class Edge:
+    __slots__ = ('x1', 'y1', 'x2', 'y2')
 
     def __init__(self, x1: int, y1: int, x2: int, y2: int):
         self.x1, self.y1 = min(x1, x2), min(y1, y2)
@@ -78,7 +81,10 @@ class Edge:
 
 
 def get_edges(x1: int, y1: int, x2: int, y2: int) -> List[Edge]:
-    assert x1 == x2 or y1 == y2, "Only vertical or horizontal lines"
+    """
+    Get the Edges between cells that a line along the grid lines blocks. Diagonal lines are covered by a staircase
+    of unit steps along the grid lines that stays closest to the line, so that the line can not be crossed.
+    """
     edges = []
     if x1 == x2:  # Vertical
         for y in range(min(y1, y2), max(y1, y2)):
@@ -86,11 +92,30 @@ def get_edges(x1: int, y1: int, x2: int, y2: int) -> List[Edge]:
     elif y1 == y2:  # Horizontal
         for x in range(min(x1, x2), max(x1, x2)):
             edges.append(Edge(x, y1 - 1, x, y1))
+    else:  # Diagonal
+        nx, ny = abs(x2 - x1), abs(y2 - y1)
+        sx, sy = (1 if x2 > x1 else -1), (1 if y2 > y1 else -1)
+        x, y = x1, y1
+        ix, iy = 0, 0
+        while ix < nx or iy < ny:
+            # Take the step whose midpoint comes first along the line, i.e. compare (ix + 1/2) / nx to (iy + 1/2) / ny
+            if iy == ny or (ix < nx and (2 * ix + 1) * ny <= (2 * iy + 1) * nx):
+                edges.append(Edge(min(x, x + sx), y - 1, min(x, x + sx), y))
+                x, ix = x + sx, ix + 1
+            else:
+                edges.append(Edge(x - 1, min(y, y + sy), x, min(y, y + sy)))
+                y, iy = y + sy, iy + 1
     return edges
 
 
 class Air:
     FloatGrid = List[List[Union[float, None]]]
+    # Per column, a byte per cell of which bit d is set if the cell exchanges contaminate with its neighbour at
+    # NEIGHBOURS[d]. Any sequence of byte sequences will do, such as bytes or memoryviews of shared memory.
+    ConductanceGrid = Sequence[Sequence[int]]
+
+    # Offsets of the neighbours of a cell: north, south, east, west
+    NEIGHBOURS = ((0, 1), (0, -1), (1, 0), (-1, 0))
 
     class Layer(Enum):
         AEROSOLS = 0
@@ -100,7 +125,8 @@ class Air:
         return math.floor(x * self.mobility_ratio), math.floor(y * self.mobility_ratio)
 
     def __init__(self, config: dict, width: int, height: int, aerosol_decay_rate: float, droplet_decay_rate: float,
-                 air_exchange_rate: float, barriers: List[Union[Wall, Shield]] = (), voids: List[Void] = ()):
+                 air_exchange_rate: float, barriers: List[Union[Wall, Shield]] = (), voids: List[Void] = (),
+                 compiled: Union[dict, None] = None):
         """
         Creates a new Air layer which covers the entire width and height of the Environment.
 
@@ -111,6 +137,7 @@ class Air:
         :param air_exchange_rate: Rate at which air is cycled in Environment
         :param barriers: List of Barrier classes with coordinates scaled from MobilityCellSize to AirCellSize
         :param voids: List of Void spaces to remove from the Air with coordinates scaled from MobilityCellSize to AirCellSize
+        :param compiled: Result of Air.compile for the same size, barriers and voids, to skip compiling them again
         """
         self.config = config
         self.mobility_ratio = config['env']['MobilityCellSize'] / config['env']['AirCellSize']
@@ -126,33 +153,109 @@ class Air:
         self._aerosols: Air.FloatGrid = [[0.0 for _ in range(self._height)] for _ in range(self._width)]
         self._droplets: Air.FloatGrid = [[0.0 for _ in range(self._height)] for _ in range(self._width)]
 
+        # Compile the geometry, or load it from the cache if the same geometry has been compiled before
+        self._voids = voids
+        cache = GeometryCache.from_config(config) if compiled is None else None
+        if cache is not None:
+            key = GeometryCache.key(self._width, self._height, config, barriers, voids)
+            compiled = cache.load(key)
+        if compiled is None:
+            compiled = Air.compile(self._width, self._height, barriers, voids)
+            if cache is not None:
+                cache.store(key, compiled)
+
+        self._set_geometry(compiled)
+
+        # Optional running summaries of the layers over the whole run. Void cells are copied over as None.
+        output = config.get('output', {})
+        self._aerosol_integral: Union[Air.FloatGrid, None] = None
+        self._droplet_integral: Union[Air.FloatGrid, None] = None
+        if output.get('ContaminationIntegral', False):
+            self._aerosol_integral = deepcopy(self._aerosols)
+            self._droplet_integral = deepcopy(self._droplets)
+        self._aerosol_maximum: Union[Air.FloatGrid, None] = None
+        self._droplet_maximum: Union[Air.FloatGrid, None] = None
+        if output.get('ContaminationMaximum', False):
+            self._aerosol_maximum = deepcopy(self._aerosols)
+            self._droplet_maximum = deepcopy(self._droplets)
+
+    def _set_geometry(self, compiled: dict):
+        self.compiled = compiled
+
         # Initialize aerosol and droplet barrier dictionary
-        self._aerosol_barriers: Dict[Edge, bool] = {}
-        self._droplet_barriers: Dict[Edge, bool] = {}
+        self._aerosol_barriers: Dict[Edge, bool] = {Edge(*edge): True for edge in compiled['aerosol_barriers']}
+        self._droplet_barriers: Dict[Edge, bool] = {Edge(*edge): True for edge in compiled['droplet_barriers']}
+
+        # Set void cells to None
+        for x, y in compiled['voids']:
+            self._aerosols[x][y] = None
+            self._droplets[x][y] = None
+
+        # Neighbours that each cell exchanges contaminate with during diffusion
+        self._aerosol_conductance: Air.ConductanceGrid = compiled['aerosol_conductance']
+        self._droplet_conductance: Air.ConductanceGrid = compiled['droplet_conductance']
+
+    def set_barriers(self, barriers: List[Union[Wall, Shield]]):
+        """
+        Replace the barriers while keeping the contaminate in the Air, e.g. to add a Shield halfway through a run.
+
+        :param barriers: List of Barrier classes with coordinates scaled from MobilityCellSize to AirCellSize
+        """
+        self._set_geometry(Air.compile(self._width, self._height, barriers, self._voids))
+
+    @staticmethod
+    def compile(width: int, height: int, barriers: List[Union[Wall, Shield]], voids: List[Void]) -> dict:
+        """
+        Compiles the geometry of the Air into plain data: the blocked edges of both layers, the void cells and, for
+        every cell, the neighbouring cells it exchanges contaminate with in each layer as a ConductanceGrid of bytes.
 
-        # Add barrier edges
+        :param width: Width of the Air in AirCellSize scale
+        :param height: Height of the Air in AirCellSize scale
+        """
+        aerosol_barriers, droplet_barriers = set(), set()
         for barrier in barriers:
             for edge in get_edges(barrier.x1, barrier.y1, barrier.x2, barrier.y2):
+                edge = (edge.x1, edge.y1, edge.x2, edge.y2)
                 if isinstance(barrier, Wall):
-                    self._aerosol_barriers[edge] = True
-                    self._droplet_barriers[edge] = True
+                    aerosol_barriers.add(edge)
+                    droplet_barriers.add(edge)
                 elif isinstance(barrier, Shield):
-                    self._droplet_barriers[edge] = True
+                    droplet_barriers.add(edge)
 
-        # Set void cells to None
-        self._voids = voids
-        for void in self._voids:
-            if not 0 <= void.x < self._width or not 0 <= void.y < self._height:
+        void = [[False for _ in range(height)] for _ in range(width)]
+        for v in voids:
+            if not 0 <= v.x < width or not 0 <= v.y < height:
                 raise OutOfBoundsException
-            self._aerosols[void.x][void.y] = None
-            self._droplets[void.x][void.y] = None
+            void[v.x][v.y] = True
+
+        def conductance(blocked):
+            grid = []
+            for x in range(width):
+                column = bytearray(height)
+                for y in range(height):
+                    if void[x][y]:
+                        continue
+                    for d, (dx, dy) in enumerate(Air.NEIGHBOURS):
+                        nx, ny = x + dx, y + dy
+                        if (0 <= nx < width and 0 <= ny < height and not void[nx][ny] and
+                                (min(x, nx), min(y, ny), max(x, nx), max(y, ny)) not in blocked):
+                            column[y] |= 1 << d
+                grid.append(bytes(column))
+            return grid
+
+        return {
+            'aerosol_barriers': sorted(aerosol_barriers),
+            'droplet_barriers': sorted(droplet_barriers),
+            'voids': [(v.x, v.y) for v in voids],
+            'aerosol_conductance': conductance(aerosol_barriers),
+            'droplet_conductance': conductance(droplet_barriers),
+        }
 
     def is_void(self, x: int, y: int) -> bool:
         x, y = self.convert_coordinates(x, y)
-        if Void(x, y) in self._voids:
-            return True
-        else:
+        if not 0 <= x < self._width or not 0 <= y < self._height:
             return False
+        return self._aerosols[x][y] is None  # Void cells are the only cells without a value
 
     def get_aerosol(self, x: int, y: int) -> Union[float, None]:
         return self.get_layer(x, y, Air.Layer.AEROSOLS)
@@ -214,6 +317,10 @@ class Air:
             if self._get_droplet(x, y) is not None:
                 self._droplets[x][y] = f
 
+    def close(self) -> None:
+        """Release what the Air holds besides its layers, if anything, as the processes of a DecomposedAir"""
+        pass
+
     def decay(self) -> None:
         for x in range(self._width):
             for y in range(self._height):
@@ -227,75 +334,86 @@ class Air:
                                        self._droplet_decay_rate *
                                        self.config['env']['SimulationTimeStep']))
 
+    def accumulate(self) -> None:
+        """
+        Adds the current state of both layers to the running integrals (contamination times SimulationTimeStep)
+        and running maxima, if these are tracked. Void cells are skipped.
+        """
+        integral = self._aerosol_integral is not None
+        maximum = self._aerosol_maximum is not None
+        if not integral and not maximum:
+            return
+        dt = self.config['env']['SimulationTimeStep']
+        for x in range(self._width):
+            aerosols, droplets = self._aerosols[x], self._droplets[x]
+            for y in range(self._height):
+                aerosol, droplet = aerosols[y], droplets[y]
+                if aerosol is None:
+                    continue
+                if integral:
+                    self._aerosol_integral[x][y] += aerosol * dt
+                    self._droplet_integral[x][y] += droplet * dt
+                if maximum:
+                    if aerosol > self._aerosol_maximum[x][y]:
+                        self._aerosol_maximum[x][y] = aerosol
+                    if droplet > self._droplet_maximum[x][y]:
+                        self._droplet_maximum[x][y] = droplet
+
+    @property
+    def aerosol_integral(self) -> Union[FloatGrid, None]:
+        return self._aerosol_integral
+
+    @property
+    def droplet_integral(self) -> Union[FloatGrid, None]:
+        return self._droplet_integral
+
+    @property
+    def aerosol_maximum(self) -> Union[FloatGrid, None]:
+        return self._aerosol_maximum
+
+    @property
+    def droplet_maximum(self) -> Union[FloatGrid, None]:
+        return self._droplet_maximum
+
     def diffuse(self) -> None:
         self._diffuse_aerosols()
         self._diffuse_droplets()
 
     def _diffuse_aerosols(self) -> None:
-        next_aerosols = deepcopy(self._aerosols)
-        for x in range(self._width):
-            for y in range(self._height):
-                if self._get_aerosol(x, y) is not None:  # Is this a void cell?
-                    s = []
-                    # North
-                    if (y + 1 < self._height and
-                            self._get_aerosol(x, y + 1) is not None and
-                            self._aerosol_barriers.get(Edge(x, y, x, y + 1)) is None):
-                        s.append(self._get_aerosol(x, y + 1))
-                    # South
-                    if (y - 1 >= 0 and
-                            self._get_aerosol(x, y - 1) is not None and
-                            self._aerosol_barriers.get(Edge(x, y, x, y - 1)) is None):
-                        s.append(self._get_aerosol(x, y - 1))
-                    # East
-                    if (x + 1 < self._width and  # In bounds
-                            self._get_aerosol(x + 1, y) is not None and  # Not a void cell
-                            self._aerosol_barriers.get(Edge(x, y, x + 1, y)) is None):  # No barrier between cells
-                        s.append(self._get_aerosol(x + 1, y))
-                    # West
-                    if (x - 1 >= 0 and
-                            self._get_aerosol(x - 1, y) is not None and
-                            self._aerosol_barriers.get(Edge(x, y, x - 1, y)) is None):
-                        s.append(self._get_aerosol(x - 1, y))
-                    next_aerosols[x][y] += (
-                            self.config['env']['Diffusivity'] *
-                            (sum(s) - (len(s) + ((4 - len(s)) * self.config['env']['WallAbsorbingProportion'])) *
-                             self._get_aerosol(x, y)) * self.config['env']['SimulationTimeStep']
-                    )
-        self._aerosols = next_aerosols
+        self._aerosols = self._diffuse_layer(self._aerosols, self._aerosol_conductance)
 
     def _diffuse_droplets(self) -> None:
-        next_droplets = deepcopy(self._droplets)
+        self._droplets = self._diffuse_layer(self._droplets, self._droplet_conductance)
+
+    def _diffuse_layer(self, grid: FloatGrid, conductance: ConductanceGrid) -> FloatGrid:
+        diffusivity = self.config['env']['Diffusivity']
+        absorbing = self.config['env']['WallAbsorbingProportion']
+        dt = self.config['env']['SimulationTimeStep']
+        next_grid = [column[:] for column in grid]
         for x in range(self._width):
+            column, next_column, bits = grid[x], next_grid[x], conductance[x]
+            east = grid[x + 1] if x + 1 < self._width else None
+            west = grid[x - 1] if x > 0 else None
             for y in range(self._height):
-                if self._get_droplet(x, y) is not None:
-                    s = []
-                    # North
-                    if (y + 1 < self._height and
-                            self._get_droplet(x, y + 1) is not None and
-                            self._droplet_barriers.get(Edge(x, y, x, y + 1)) is None):
-                        s.append(self._get_droplet(x, y + 1))
-                    # South
-                    if (y - 1 >= 0 and
-                            self._get_droplet(x, y - 1) is not None and
-                            self._droplet_barriers.get(Edge(x, y, x, y - 1)) is None):
-                        s.append(self._get_droplet(x, y - 1))
-                    # East
-                    if (x + 1 < self._width and
-                            self._get_droplet(x + 1, y) is not None and
-                            self._droplet_barriers.get(Edge(x, y, x + 1, y)) is None):
-                        s.append(self._get_droplet(x + 1, y))
-                    # West
-                    if (x - 1 >= 0 and
-                            self._get_droplet(x - 1, y) is not None and
-                            self._droplet_barriers.get(Edge(x, y, x - 1, y)) is None):
-                        s.append(self._get_droplet(x - 1, y))
-                    next_droplets[x][y] += (
-                            self.config['env']['Diffusivity'] *
-                            (sum(s) - (len(s) + ((4 - len(s)) * self.config['env']['WallAbsorbingProportion'])) *
-                             self._get_droplet(x, y)) * self.config['env']['SimulationTimeStep']
-                    )
-        self._droplets = next_droplets
+                value = column[y]
+                if value is not None:  # Is this a void cell?
+                    # Sum the neighbours in the order of NEIGHBOURS, as the BatchedModel does
+                    b = bits[y]
+                    if b == 15:
+                        next_column[y] += diffusivity * (column[y + 1] + column[y - 1] + east[y] + west[y] -
+                                                         4 * value) * dt
+                        continue
+                    total, n = 0, 0
+                    if b & 1:
+                        total, n = total + column[y + 1], n + 1
+                    if b & 2:
+                        total, n = total + column[y - 1], n + 1
+                    if b & 4:
+                        total, n = total + east[y], n + 1
+                    if b & 8:
+                        total, n = total + west[y], n + 1
+                    next_column[y] += diffusivity * (total - (n + ((4 - n) * absorbing)) * value) * dt
+        return next_grid
 
     def add_aerosol_pattern(self, x: int, y: int, addition: float,
                             pattern: EmissionPattern, direction: Facing) -> None:
@@ -318,7 +436,21 @@ class Air:
         :param direction: Cardinal direction of emission from origin
         :return:
         """
+        for target_x, target_y, fraction in self.pattern_cells(x, y, layer, pattern, direction):
+            self._add_layer(target_x, target_y, addition * fraction, layer)
+
+    def pattern_cells(self, x: int, y: int, layer: Layer, pattern: EmissionPattern,
+                      direction: Facing) -> List[Tuple[int, int, float]]:
+        """
+        Cells of the Air that an emission from the origin reaches, given the pattern, direction, barriers and void
+        cells, and the fraction of the emission that each of them receives.
+
+        :param x: X coordinate of emission origin
+        :param y: Y coordinate of emission origin
+        :return: List of the x and y in AirCellSize scale and the fraction of each reached cell
+        """
         x, y = self.convert_coordinates(x, y)
+        cells = []
 
         if direction == Facing.NORTH:
             pattern_x0, pattern_y0 = x - (len(pattern) // 2), y
@@ -449,7 +581,7 @@ class Air:
                     if pattern_y >= till_y:
                         break
 
-                    self._add_layer(target_x, target_y, addition * pattern[pattern_x][pattern_y], layer)
+                    cells.append((target_x, target_y, pattern[pattern_x][pattern_y]))
 
         left = range(len(pattern) // 2 - 1, -1, -1)
         center = range(len(pattern) // 2, len(pattern) // 2 + 1)
@@ -457,6 +589,7 @@ class Air:
         process(left, Flow.LEFT)
         process(center, None)
         process(right, Flow.RIGHT)
+        return cells
 
     def __str__(self) -> str:
         import os
@@ -1,8 +1,8 @@
 class Barrier:
     """Base class for Barriers"""
+    __slots__ = ('x1', 'y1', 'x2', 'y2')
 
     def __init__(self, x1, y1, x2, y2):
-        assert x1 == x2 or y1 == y2, "Only vertical or horizontal Barriers"
         self.x1, self.y1 = x1, y1
         self.x2, self.y2 = x2, y2
 
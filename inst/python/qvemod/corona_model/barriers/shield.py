@@ -2,4 +2,4 @@ from .barrier import Barrier
 
 
 class Shield(Barrier):
-    pass
+    __slots__ = ()
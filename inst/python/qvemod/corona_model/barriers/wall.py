@@ -2,4 +2,4 @@ from .barrier import Barrier
 
 
 class Wall(Barrier):
-    pass
+    __slots__ = ()
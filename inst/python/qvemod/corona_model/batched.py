@@ -0,0 +1,402 @@
+import math
+import random
+import warnings
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.air import Air
+from corona_model.emissionpatterns import aerosol_cough, droplet_cough
+from corona_model.facing import Facing
+from corona_model.script import Script
+from corona_model.streams import agent_seeds, derive_seed, draw_ticks_to_cough
+from corona_model.surfaces import Fixture
+from corona_model.validation import validate_scripts, RAISE
+
+# Parameters that may differ between the replicates: attributes of the Environment and keys of config['env']
+ENVIRONMENT_PARAMETERS = ('decay_rate_air', 'decay_rate_droplet', 'air_exchange_rate', 'droplet_to_surface_transfer_rate')
+CONFIG_PARAMETERS = ('Diffusivity', 'WallAbsorbingProportion', 'MaskEmissionAerosolReductionEfficiency',
+                     'MaskEmissionDropletReductionEfficiency', 'MaskAerosolProtectionEfficiency',
+                     'MaskDropletProtectionEfficiency', 'CoughingRate', 'CoughingFactor', 'CoughingAerosolPercentage',
+                     'CoughingDropletPercentage')
+
+
+class BatchedModel:
+    """
+    Runs K replicates of a Model at once, in a single state with a leading replicate axis.
+
+    The replicates share the Environment, Surfaces and the Scripts of the Agents, and differ in their coughs (each
+    replicate has its own seed) and optionally in the viral load, infection and mask of every Agent and in the
+    parameters of ENVIRONMENT_PARAMETERS and CONFIG_PARAMETERS. The Air is a
+    K x W x H array per layer and the loads of the Agents and Surfaces are K x A and K x S arrays, so that diffusion,
+    decay and the transfers to and from the Surfaces update all replicates with one array operation, while the Scripts
+    are followed once for all of them.
+
+    Replicate k gives the same exposures as Model.run with the seed of replicate k as Seed and the viral loads, infection,
+    masks and parameters of replicate k. Output files, contamination summaries and handwashing are not supported.
+
+    Diffusion and decay are run on tiles of whole columns of the Air by AirThreads threads (config['env'], default 1),
+    as numpy releases the GIL in its loops. Every cell is computed from the state of the previous tick with the same
+    operations whatever the tiling, so the results do not depend on the number of threads.
+
+    Needs numpy, unlike the rest of corona_model.
+    """
+
+    def __init__(self, model, k: int, viral_loads=None, infected=None, wearing_masks=None, seeds: Sequence = None,
+                 parameters: Dict[str, Sequence[float]] = None):
+        """
+        :param model: Model of which to run the replicates. It is reset by run and left in its state at the end.
+        :param k: Number of replicates
+        :param viral_loads: K x A viral loads of the Agents, defaulting to their own viral load in every replicate
+        :param infected: K x A whether the Agents behave as infected: they cough, and touch Fixtures to contaminate rather
+                         than to pick up contamination. Defaults to a positive viral load.
+        :param wearing_masks: K x A whether the Agents start with a mask, defaulting to their own
+        :param seeds: Seed of each replicate, defaults to seeds derived from the Seed in the config (0 if not given) and
+                      the number of the replicate, as for run_ensemble
+        :param parameters: K values per parameter, by its name in ENVIRONMENT_PARAMETERS or CONFIG_PARAMETERS. Other
+                           parameters have the value of the Environment and config in every replicate.
+        """
+        agents = model.agents
+        self.model = model
+        self.k = k
+        shape = (k, len(agents))
+        if viral_loads is None:
+            viral_loads = [[agent.viral_load for agent in agents]] * k
+        self.viral_loads = np.array(viral_loads, dtype=float).reshape(shape)
+        self.infected = self.viral_loads > 0 if infected is None else np.array(infected, dtype=bool).reshape(shape)
+        self.wearing_masks = None if wearing_masks is None else np.array(wearing_masks, dtype=bool).reshape(shape)
+        self.seeds = None if seeds is None else list(seeds)
+        assert self.seeds is None or len(self.seeds) == k, "Expected {} seeds, got {}".format(k, len(self.seeds))
+        self.parameters = {name: np.array(values, dtype=float).reshape(k) for name, values in (parameters or {}).items()}
+        unknown = [name for name in self.parameters if name not in ENVIRONMENT_PARAMETERS + CONFIG_PARAMETERS]
+        if unknown:
+            raise KeyError('Parameters {} can not differ between replicates'.format(unknown))
+
+        # State of the replicates, set by run
+        self.aerosols = None
+        self.droplets = None
+        self.surface_loads = None
+        self.air_loads = None
+        self.droplet_loads = None
+        self.surface_accumulation = None
+        self.air_totals = None
+        self.droplet_totals = None
+        self.surface_totals = None
+
+    def run(self, config) -> List[Dict]:
+        """
+        Run all replicates.
+
+        :return: For each replicate, a dictionary with its seed and the air, droplet and surface exposure per Agent name,
+                 as returned by run_ensemble
+        """
+        model, env, agents = self.model, self.model.env, self.model.agents
+        if any(Script.HANDWASH in agent.script.codes for agent in agents):
+            raise NotImplementedError('Handwash is not supported by the BatchedModel')
+
+        # Set up the Model, as Model.run does
+        model.reset()
+        env.place_surfaces(model.surfaces)
+        env.set_config(config)
+        validate_scripts(env, agents, config['env'].get('ScriptViolations', RAISE),
+                     model.ticks)
+        env.validated = True
+        air = env.air
+
+        settings = config['env']
+        dt = settings['SimulationTimeStep']
+        k, n = self.k, len(agents)
+
+        def parameter(name, dimensions=1):
+            """Value of a parameter, an array of shape K x 1 x ... with the given number of dimensions if it differs"""
+            if name in self.parameters:
+                return self.parameters[name].reshape((k,) + (1,) * (dimensions - 1))
+            return getattr(env, name) if name in ENVIRONMENT_PARAMETERS else settings[name]
+        seeds = self.seeds
+        if seeds is None:
+            seeds = [derive_seed(settings.get('Seed', 0), 'replicate', i) for i in range(k)]
+
+        # Air, double buffered: a tick diffuses from one array into the other, after which they are swapped
+        open_cells = np.array([[value is not None for value in column] for column in air._aerosols], dtype=bool)
+        self.aerosols = aerosols = np.zeros((k,) + open_cells.shape)
+        self.droplets = droplets = np.zeros((k,) + open_cells.shape)
+        aerosol_buffer, droplet_buffer = np.zeros_like(aerosols), np.zeros_like(droplets)
+        absorbing = parameter('WallAbsorbingProportion', 3)
+        aerosol_kernel = self._kernel(air._aerosol_conductance, open_cells, absorbing)
+        droplet_kernel = self._kernel(air._droplet_conductance, open_cells, absorbing)
+        rates = parameter('decay_rate_air', 3) + parameter('air_exchange_rate', 3)
+        aerosol_decay = np.array([math.exp(-rate * dt) for rate in np.ravel(rates)]).reshape(np.shape(rates))
+        droplet_decay_rate = parameter('decay_rate_droplet', 3)
+        diffusivity = parameter('Diffusivity', 3)
+        transfer_rate = parameter('droplet_to_surface_transfer_rate', 2)
+
+        # Surfaces
+        surfaces = list(model.surfaces)
+        index = {id(surface): i for i, surface in enumerate(surfaces)}
+        self.surface_loads = loads = np.array([[surface.contamination_load for surface in surfaces]] * k,
+                                              dtype=float).reshape(k, len(surfaces))
+        fixtures = np.array([isinstance(surface, Fixture) for surface in surfaces], dtype=bool)
+        fixture_index = np.nonzero(fixtures)[0]
+        fixture_cells = [air.convert_coordinates(surfaces[i].init_x, surfaces[i].init_y) for i in fixture_index]
+        fixture_x = np.array([x for x, _ in fixture_cells], dtype=int)
+        fixture_y = np.array([y for _, y in fixture_cells], dtype=int)
+        surface_decay = np.array([math.exp(-surface.surface_decay_rate * dt) for surface in surfaces])
+        cleaning_interval = math.ceil(settings['CleaningInterval'] / dt)
+        fixture_droplets = np.zeros((k, len(fixture_index)))  # Droplets on the cells of the Fixtures after diffusion
+
+        # Tiles of whole columns of the Air, with the scratch space of their sums of neighbours and their Fixtures
+        width, height = open_cells.shape
+        threads = max(1, min(int(settings.get('AirThreads', 1)), width))
+        edges = [round(j * width / threads) for j in range(threads + 1)]
+        tiles = [(x0, x1, np.zeros((k, x1 - x0, height)), np.nonzero((fixture_x >= x0) & (fixture_x < x1))[0])
+                 for x0, x1 in zip(edges, edges[1:])]
+
+        def step(tile):
+            """Diffuse and decay a tile, keeping the droplets on its Fixtures in between for the transfer to them"""
+            x0, x1, total, tile_fixtures = tile
+            self._diffuse(aerosols, aerosol_buffer, aerosol_kernel, diffusivity, dt, x0, x1, total)
+            self._diffuse(droplets, droplet_buffer, droplet_kernel, diffusivity, dt, x0, x1, total)
+            fixture_droplets[:, tile_fixtures] = droplet_buffer[:, fixture_x[tile_fixtures], fixture_y[tile_fixtures]]
+            aerosol_buffer[:, x0:x1] *= aerosol_decay
+            tile_droplets = droplet_buffer[:, x0:x1]
+            tile_droplets[...] = tile_droplets - tile_droplets * droplet_decay_rate * dt
+
+        # Agents
+        self.air_loads = air_loads = np.array([[agent.contamination_load_air for agent in agents]] * k,
+                                              dtype=float).reshape(k, n)
+        self.droplet_loads = droplet_loads = np.array([[agent.contamination_load_droplet for agent in agents]] * k,
+                                                      dtype=float).reshape(k, n)
+        self.surface_accumulation = accumulation = np.array(
+            [[agent.contamination_load_surface_accumulation for agent in agents]] * k, dtype=float).reshape(k, n)
+        self.air_totals = np.zeros((k, n))
+        self.droplet_totals = np.zeros((k, n))
+        self.surface_totals = np.zeros((k, n))
+        masks = self.wearing_masks
+        if masks is None:
+            masks = np.array([[agent.under_effect('wearing_mask') for agent in agents]] * k, dtype=bool).reshape(k, n)
+        masks = masks.copy()
+        infected, viral_loads = self.infected, self.viral_loads
+        emission_aerosol, emission_droplet = parameter('MaskEmissionAerosolReductionEfficiency'), \
+            parameter('MaskEmissionDropletReductionEfficiency')
+        protection_aerosol, protection_droplet = parameter('MaskAerosolProtectionEfficiency'), \
+            parameter('MaskDropletProtectionEfficiency')
+        coughing_factor = parameter('CoughingFactor')
+        coughing_aerosol, coughing_droplet = parameter('CoughingAerosolPercentage'), \
+            parameter('CoughingDropletPercentage')
+
+        # Coughs, drawn from the same streams as the Agents of a Model with the seed of the replicate as Seed
+        p = np.broadcast_to(parameter('CoughingRate') * dt, (k,))
+        queued = np.zeros((k, n), dtype=bool)
+        ticks_to_cough = np.full((k, n), math.inf)
+        streams = {}
+        coughing = [np.nonzero(infected[:, i])[0] for i in range(n)]
+        names = [agent.name for agent in agents]
+        replicate_seeds = {}
+        for i in range(n):
+            for replicate in coughing[i]:
+                if replicate not in replicate_seeds:
+                    replicate_seeds[replicate] = agent_seeds(seeds[replicate], names)
+                stream = streams[replicate, i] = random.Random(replicate_seeds[replicate][i])
+                ticks_to_cough[replicate, i] = draw_ticks_to_cough(stream, float(p[replicate]))
+
+        # Fixtures within reach and emission footprints per position, computed on first use
+        reachable = {}
+        footprints = {}
+
+        def reachable_fixtures(x, y):
+            if (x, y) not in reachable:
+                reachable[x, y] = [index[id(fixture)] for cx, cy in env.reachable_surfaces(x, y)
+                                   for fixture in env.surfaces[cx][cy] if isinstance(fixture, Fixture)]
+            return reachable[x, y]
+
+        def footprint(x, y, direction, layer, pattern):
+            key = (x, y, direction, layer)
+            if key not in footprints:
+                footprints[key] = air.pattern_cells(x, y, layer, pattern, direction)
+            return footprints[key]
+
+        def hold(i, agent, item):
+            if item in agent.held:
+                warnings.warn("{} is already holding {}".format(agent, item))
+                return
+            agent.held.append(item)
+            s = index[id(item)]
+            transferred = loads[:, s] * item.transfer_rate
+            accumulation[:, i] += transferred
+            loads[:, s] -= transferred
+            loads[:, s] += accumulation[:, i] * item.transfer_rate
+
+        def process(i, agent, row):
+            script = agent.script
+            code = script.codes[row]
+            if code == Script.ENTER:
+                env._enter(agent, script.x[row], script.y[row], Script.FACINGS[script.facing[row]])
+            elif agent.is_active:
+                if code == Script.MOVE:
+                    env._move(agent, script.x[row], script.y[row],
+                              Script.FACINGS[script.facing[row]] if script.facing[row] >= 0 else None)
+                elif code == Script.FACE:
+                    agent.set_facing(Script.FACINGS[script.facing[row]])
+                elif code == Script.LEAVE:
+                    env._leave(agent)
+                    for item in agent.held:  # Removed from the Environment with the Agent, so no longer decays
+                        surface_decay[index[id(item)]] = 1.0
+                elif code == Script.PICKUP:
+                    item = env._find_item(agent, script.targets[script.target[row]])
+                    if item is not None:
+                        hold(i, agent, item)
+                elif code == Script.PUTDOWN:
+                    item = env._find_item(agent, script.targets[script.target[row]])
+                    if item is not None:
+                        agent.release(item)
+                elif code == Script.DONMASK:
+                    masks[:, i] = True
+                elif code == Script.DOFFMASK:
+                    masks[:, i] = False
+
+        positions = [bisect_left(agent.script.ticks, 0) for agent in agents]
+
+        # Threads of the tiles, stopped when the run ends, also by an exception
+        executor = ThreadPoolExecutor(max_workers=threads) if threads > 1 else None
+        try:
+            # main loop, in the same order as Model.run
+            for tick in range(0, model.ticks):
+                for i, agent in enumerate(agents):
+                    ticks = agent.script.ticks
+                    if positions[i] < len(ticks) and ticks[positions[i]] == tick:
+                        process(i, agent, positions[i])
+                        positions[i] += 1
+
+                for i, agent in enumerate(agents):
+                    if not agent.is_active:
+                        continue
+                    position = env.agent_lookup.get(agent)
+                    if position is not None:
+                        x, y = air.convert_coordinates(*position)
+                        picked_up = aerosols[:, x, y] * agent.pick_up_air * dt
+                        air_loads[:, i] = np.where(masks[:, i], picked_up * protection_aerosol, picked_up)
+                        aerosols[:, x, y] = aerosols[:, x, y] - air_loads[:, i]
+                        picked_up = droplets[:, x, y] * agent.pick_up_droplet * dt
+                        droplet_loads[:, i] = np.where(masks[:, i], picked_up * protection_droplet, picked_up)
+                        droplets[:, x, y] = droplets[:, x, y] - droplet_loads[:, i]
+
+                        # Susceptible Agents pick up from Fixtures, infected Agents contaminate them
+                        for s in reachable_fixtures(*position):
+                            transferred = np.where(infected[:, i], 0.0, loads[:, s] * surfaces[s].transfer_rate * dt)
+                            accumulation[:, i] += transferred
+                            loads[:, s] -= transferred
+                        for s in reachable_fixtures(*position):
+                            loads[:, s] += np.where(infected[:, i], accumulation[:, i] * surfaces[s].transfer_rate * dt,
+                                                    0.0)
+
+                    # Coughing effect
+                    rows = coughing[i]
+                    if rows.size:
+                        ticks_to_cough[rows, i] -= 1
+                        for replicate in rows[ticks_to_cough[rows, i] <= 0]:
+                            queued[replicate, i] = True
+                            ticks_to_cough[replicate, i] = draw_ticks_to_cough(streams[replicate, i],
+                                                                               float(p[replicate]))
+
+                if tick % cleaning_interval == 0:
+                    loads[:, fixtures] = 0
+                if executor is None:
+                    step(tiles[0])
+                else:
+                    list(executor.map(step, tiles))  # Waits for all tiles
+                aerosols, aerosol_buffer = aerosol_buffer, aerosols
+                droplets, droplet_buffer = droplet_buffer, droplets
+                self.aerosols, self.droplets = aerosols, droplets
+                loads[:, fixture_index] += fixture_droplets / (air.mobility_ratio ** 2) * transfer_rate * dt
+                loads *= surface_decay
+
+                for i, agent in enumerate(agents):
+                    if not agent.is_active:
+                        continue
+                    position = env.agent_lookup.get(agent)
+                    if position is None:
+                        continue
+                    x, y = air.convert_coordinates(*position)
+                    cough = queued[:, i]
+                    emission = viral_loads[:, i] * agent.emission_rate_air * dt
+                    aerosol = np.where(cough, emission * coughing_factor * coughing_aerosol, emission)
+                    droplet = np.where(cough, emission * coughing_factor * coughing_droplet,
+                                       viral_loads[:, i] * agent.emission_rate_droplet * dt)
+                    aerosol = np.where(masks[:, i], aerosol * emission_aerosol, aerosol)
+                    droplet = np.where(masks[:, i], droplet * emission_droplet, droplet)
+                    aerosols[:, x, y] += np.where(cough, 0.0, aerosol)
+                    droplets[:, x, y] += np.where(cough, 0.0, droplet)
+                    if cough.any():
+                        rows = np.nonzero(cough)[0]
+                        direction = Facing(agent.facing.value)
+                        for cx, cy, fraction in footprint(*position, direction, Air.Layer.AEROSOLS, aerosol_cough):
+                            aerosols[rows, cx, cy] += aerosol[rows] * fraction
+                        for cx, cy, fraction in footprint(*position, direction, Air.Layer.DROPLETS, droplet_cough):
+                            droplets[rows, cx, cy] += droplet[rows] * fraction
+                        queued[:, i] = False
+
+                # Exposure over time, as the sum of the exposures that Model.run writes for the active Agents every tick
+                active = [i for i, agent in enumerate(agents) if agent.is_active]
+                self.air_totals[:, active] += air_loads[:, active]
+                self.droplet_totals[:, active] += droplet_loads[:, active]
+                self.surface_totals[:, active] += accumulation[:, active]
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return self.exposures(seeds)
+
+    def exposures(self, seeds=None) -> List[Dict]:
+        names = [agent.name for agent in self.model.agents]
+        return [{
+            'seed': None if seeds is None else seeds[replicate],
+            'air': dict(zip(names, self.air_loads[replicate].tolist())),
+            'droplet': dict(zip(names, self.droplet_loads[replicate].tolist())),
+            'surface': dict(zip(names, self.surface_accumulation[replicate].tolist())),
+        } for replicate in range(self.k)]
+
+    @staticmethod
+    def _kernel(conductance, open_cells, absorbing):
+        """
+        Which neighbours each cell exchanges with, per direction of Air.NEIGHBOURS, and the coefficient of the cell
+        itself, per replicate if absorbing is a K x 1 x 1 array
+        """
+        width, height = open_cells.shape
+        bits = np.array([np.frombuffer(column, dtype=np.uint8) for column in conductance]).reshape(width, height)
+        present = np.array([(bits >> d) & 1 for d in range(len(Air.NEIGHBOURS))], dtype=bool)
+        count = present.sum(axis=0).astype(float)
+        return present, np.where(open_cells, count + ((4 - count) * absorbing), 0.0)
+
+    @staticmethod
+    def _diffuse(grid, out, kernel, diffusivity, dt, x0, x1, total):
+        """
+        Air._diffuse_layer for all replicates at once on the columns x0 to x1 of the grid, adding the neighbours in the
+        same order. Reads the grid, also just outside the tile, and writes the tile of out.
+
+        :param total: K x (x1 - x0) x H scratch space for the sums of the neighbours
+        """
+        present, coefficient = kernel
+        width, height = grid.shape[1:]
+        total[...] = 0.0
+        for d, (dx, dy) in enumerate(Air.NEIGHBOURS):
+            # Cells of the tile of which the neighbour at (x + dx, y + dy) is within the grid
+            a, b = max(x0, -dx), min(x1, width - dx)
+            c, e = max(0, -dy), height - max(0, dy)
+            tile = total[:, a - x0:b - x0, c:e]
+            np.add(tile, grid[:, a + dx:b + dx, c + dy:e + dy], out=tile, where=present[d, a:b, c:e])
+        tile = grid[:, x0:x1]
+        out[:, x0:x1] = tile + diffusivity * (total - coefficient[..., x0:x1, :] * tile) * dt
@@ -0,0 +1,209 @@
+import json
+import struct
+from array import array
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.environment import Environment
+from corona_model.air import Void
+from corona_model.barriers import Wall, Shield
+from corona_model.surfaces import Item, Fixture
+from corona_model.script import Script
+
+# Compact binary format of a Model, next to the JSON of Model.serialize.
+#
+# A file consists of MAGIC, the VERSION and the length of a JSON header as two little-endian uint32, the JSON header
+# itself and a payload of typed arrays, each aligned to 8 bytes. The header contains the scalars and names of the Model
+# and a table of the arrays in the payload with their offset, typecode and length. The scripts of all Agents are stored
+# as the concatenated columns of their Scripts, so loading them comes down to slicing arrays.
+
+MAGIC = b'QVEMODB\x00'
+VERSION = 1
+_PREAMBLE = struct.Struct('<8sII')
+_ALIGNMENT = 8
+
+# Floats of an Agent, in the order of its constructor, and the attributes that they are stored in
+_AGENT_FLOATS = ('viral_load', 'contamination_load_air', 'contamination_load_droplet', 'contamination_load_surface',
+                 'emission_rate_air', 'emission_rate_droplet', 'pick_up_air', 'pick_up_droplet')
+_AGENT_ATTRIBUTES = dict(zip(_AGENT_FLOATS, _AGENT_FLOATS),
+                         contamination_load_surface='contamination_load_surface_accumulation')
+_SCRIPT_COLUMNS = (('ticks', 'q'), ('codes', 'b'), ('x', 'q'), ('y', 'q'), ('facing', 'b'), ('target', 'q'))
+_BARRIERS = (Wall, Shield)
+
+
+class BinaryFormatError(Exception):
+    pass
+
+
+def is_binary(path: str) -> bool:
+    """Whether the file at path starts with the MAGIC of the binary format"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def dump(model, path: str) -> None:
+    """Write the Model to path in the binary format"""
+    arrays = {}
+
+    # Agents, with the targets of all Scripts interned in one list
+    agents = model.agents
+    for name in _AGENT_FLOATS:
+        arrays['agent_' + name] = array('d', [float(getattr(agent, _AGENT_ATTRIBUTES[name])) for agent in agents])
+    arrays['agent_is_active'] = array('b', [bool(agent.is_active) for agent in agents])
+    arrays['agent_wearing_mask'] = array('b', [agent.under_effect('wearing_mask') for agent in agents])
+
+    targets, lookup, remaps = [], {}, {}
+    offsets = array('q', [0])
+    columns = {name: array(typecode) for name, typecode in _SCRIPT_COLUMNS}
+    for agent in agents:
+        script = agent.own_script
+        if id(script.targets) not in remaps:
+            remap = remaps[id(script.targets)] = []
+            for target in script.targets:
+                if target not in lookup:
+                    lookup[target] = len(targets)
+                    targets.append(target)
+                remap.append(lookup[target])
+        remap = remaps[id(script.targets)]
+        for name, _ in _SCRIPT_COLUMNS:
+            columns[name].extend(getattr(script, name))
+        if script.targets:
+            start = offsets[-1]
+            target = columns['target']
+            for i in range(start, len(target)):
+                if target[i] >= 0:
+                    target[i] = remap[target[i]]
+        offsets.append(len(columns['ticks']))
+    arrays['script_offsets'] = offsets
+    for name, _ in _SCRIPT_COLUMNS:
+        arrays['script_' + name] = columns[name]
+
+    # Environment
+    env = model.env
+    arrays['barrier_types'] = array('b', [_BARRIERS.index(type(b)) for b in env.barriers])
+    arrays['barrier_coordinates'] = array('q', [int(c) for b in env.barriers for c in (b.x1, b.y1, b.x2, b.y2)])
+    arrays['void_coordinates'] = array('q', [int(c) for v in env.walls for c in (v.x, v.y)])
+
+    # Surfaces
+    items = [s for s in model.surfaces if isinstance(s, Item)]
+    fixtures = [s for s in model.surfaces if isinstance(s, Fixture)]
+    for prefix, surfaces, names in (('item_', items, ('transfer_efficiency', 'surface_ratio', 'surface_decay_rate')),
+                                    ('fixture_', fixtures, ('transfer_efficiency', 'surface_ratio', 'touch_frequency',
+                                                            'surface_decay_rate'))):
+        serials = [s.serialize() for s in surfaces]
+        arrays[prefix + 'coordinates'] = array('q', [int(c) for s in serials for c in (s['x'], s['y'])])
+        for name in names:
+            arrays[prefix + name] = array('d', [float(s[name]) for s in serials])
+
+    # Lay out the payload
+    table, offset = {}, 0
+    for name, values in arrays.items():
+        table[name] = [offset, values.typecode, len(values)]
+        offset += -(-len(values) * values.itemsize // _ALIGNMENT) * _ALIGNMENT
+
+    header = json.dumps({
+        'name': model.name,
+        'ticks': model.ticks,
+        'byteorder': sys.byteorder,
+        'env': {k: v for k, v in env.serialize().items() if k not in ('barriers', 'walls')},
+        'agents': [agent.name for agent in agents],
+        'targets': targets,
+        'items': [s.name for s in items],
+        'fixtures': [s.name for s in fixtures],
+        'arrays': table,
+    }, default=float).encode('utf-8')
+    header += b' ' * (-(_PREAMBLE.size + len(header)) % _ALIGNMENT)
+
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+    with open(temporary, 'wb') as f:
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, values in arrays.items():
+            data = values.tobytes()
+            f.write(data)
+            f.write(b'\x00' * (-len(data) % _ALIGNMENT))
+    os.replace(temporary, path)
+
+
+def load(path: str):
+    """
+    Read a Model from a file in the binary format.
+
+    The file is read at once rather than memory mapped. The columns of the Scripts have to be arrays of their own: they
+    are pickled for worker processes and changed in place by Script.__setitem__ and __delitem__, which neither a view
+    of a mapped file nor a memoryview allows. A memory map would therefore still copy every array, so it would only add
+    the cost of mapping the file. The file is read once and each array is copied out of it, so loading briefly holds
+    the model twice, the file and the arrays.
+    """
+    from corona_model.model import Model  # The Model imports this module
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        buffer = memoryview(data)
+        if len(buffer) < _PREAMBLE.size:
+            raise BinaryFormatError('{} is not a binary model'.format(path))
+        magic, version, length = _PREAMBLE.unpack_from(buffer)
+        if magic != MAGIC:
+            raise BinaryFormatError('{} is not a binary model'.format(path))
+        if version != VERSION:
+            raise BinaryFormatError('Unsupported version {} of the binary model format'.format(version))
+        header = json.loads(bytes(buffer[_PREAMBLE.size:_PREAMBLE.size + length]).decode('utf-8'))
+        start = _PREAMBLE.size + length
+        swap = header['byteorder'] != sys.byteorder
+
+        def read(name):
+            offset, typecode, n = header['arrays'][name]
+            values = array(typecode)
+            values.frombytes(buffer[start + offset:start + offset + n * values.itemsize])
+            if swap:
+                values.byteswap()
+            return values
+
+        # Agents
+        targets = header['targets']
+        offsets = read('script_offsets')
+        columns = [read('script_' + name) for name, _ in _SCRIPT_COLUMNS]
+        floats = [read('agent_' + name).tolist() for name in _AGENT_FLOATS]
+        is_active = read('agent_is_active')
+        wearing_mask = read('agent_wearing_mask')
+        agents = []
+        for i, name in enumerate(header['agents']):
+            a, b = offsets[i], offsets[i + 1]
+            script = Script.from_columns(*[column[a:b] for column in columns], targets)
+            agents.append(Agent(name, *[values[i] for values in floats], script,
+                                is_active=bool(is_active[i]), wearing_mask=bool(wearing_mask[i])))
+
+        # Environment
+        types = read('barrier_types')
+        coordinates = read('barrier_coordinates').tolist()
+        barriers = [_BARRIERS[t](*coordinates[4 * i:4 * i + 4]) for i, t in enumerate(types)]
+        coordinates = read('void_coordinates').tolist()
+        voids = [Void(coordinates[i], coordinates[i + 1]) for i in range(0, len(coordinates), 2)]
+        env = Environment(barriers=barriers, walls=voids, **header['env'])
+
+        # Surfaces
+        surfaces = []
+        for prefix, cls, names in (('item_', Item, ('transfer_efficiency', 'surface_ratio', 'surface_decay_rate')),
+                                   ('fixture_', Fixture, ('transfer_efficiency', 'surface_ratio', 'touch_frequency',
+                                                          'surface_decay_rate'))):
+            coordinates = read(prefix + 'coordinates').tolist()
+            values = [read(prefix + name).tolist() for name in names]
+            for i, name in enumerate(header[prefix[:-1] + 's']):
+                surfaces.append(cls(name, coordinates[2 * i], coordinates[2 * i + 1], *[v[i] for v in values]))
+    finally:
+        buffer.release()
+
+    return Model(header['ticks'], env, agents, surfaces=surfaces, name=header['name'])
@@ -0,0 +1,261 @@
+import math
+import multiprocessing
+import weakref
+from array import array
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Tuple
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.air import Air
+
+# Domain decomposition of the Air over processes.
+#
+# The layers of a DecomposedAir live in one shared memory segment of four width x height blocks of doubles, column
+# after column: the aerosols and the droplets, each twice for double buffering. Void cells hold NaN. The grid is split
+# into rectangles, one per worker process. A worker diffuses its rectangle from the current into the next buffer of
+# both layers. The cells just outside its rectangle, its halo, it reads from the current buffer as written by its
+# neighbours in the previous step. The parent waits for all workers before the buffers are swapped, so every step sees
+# the halo of the previous one. Decay needs no neighbours and is applied in place. Barriers need no special care at
+# the edges of the rectangles: whether a cell exchanges contaminate with a neighbour is part of the conductance of the
+# cell itself, wherever that neighbour is.
+
+_DIFFUSE, _DECAY = 'diffuse', 'decay'
+
+
+def tiles(width: int, height: int, processes: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Split a grid into processes rectangles (x0, x1, y0, y1), in columns and rows of rectangles chosen to keep the
+    halos, and so the edges between rectangles, short. On a tie the grid is rather split in columns, which are
+    contiguous in the layers.
+    """
+    columns = min((c for c in range(1, processes + 1) if processes % c == 0),
+                  key=lambda c: ((c - 1) * height + (processes // c - 1) * width, -c))
+    rows = processes // columns
+    xs = [round(i * width / columns) for i in range(columns + 1)]
+    ys = [round(j * height / rows) for j in range(rows + 1)]
+    return [(xs[i], xs[i + 1], ys[j], ys[j + 1]) for i in range(columns) for j in range(rows)
+            if xs[i] < xs[i + 1] and ys[j] < ys[j + 1]]
+
+
+def _diffuse(current, following, conductance, height, tile, diffusivity, absorbing, dt):
+    """Air._diffuse_layer on a rectangle of a flat layer"""
+    x0, x1, y0, y1 = tile
+    for x in range(x0, x1):
+        bits = conductance[x - x0]
+        offset = x * height
+        for y in range(y0, y1):
+            i = offset + y
+            value = current[i]
+            if value != value:  # Is this a void cell?
+                following[i] = value
+                continue
+            b = bits[y]
+            if b == 15:
+                following[i] = value + diffusivity * (current[i + 1] + current[i - 1] + current[i + height] +
+                                                      current[i - height] - 4 * value) * dt
+                continue
+            total, n = 0, 0
+            if b & 1:
+                total, n = total + current[i + 1], n + 1
+            if b & 2:
+                total, n = total + current[i - 1], n + 1
+            if b & 4:
+                total, n = total + current[i + height], n + 1
+            if b & 8:
+                total, n = total + current[i - height], n + 1
+            following[i] = value + diffusivity * (total - (n + ((4 - n) * absorbing)) * value) * dt
+
+
+def _serve(connection, buffer: memoryview, width: int, height: int, tile, conductances):
+    """Diffuse and decay one rectangle on command of the DecomposedAir, until it sends None"""
+    values = buffer.cast('d')
+    n = width * height
+    layers = [(values[0:n], values[n:2 * n]), (values[2 * n:3 * n], values[3 * n:4 * n])]
+    x0, x1, y0, y1 = tile
+    while True:
+        command = connection.recv()
+        if command is None:
+            break
+        kind, parity, parameters = command
+        if kind == _DIFFUSE:
+            for (buffers, conductance) in zip(layers, conductances):
+                _diffuse(buffers[parity], buffers[1 - parity], conductance, height, tile, *parameters)
+        elif kind == _DECAY:
+            aerosol_factor, droplet_rate, dt = parameters
+            aerosols, droplets = layers[0][parity], layers[1][parity]
+            for x in range(x0, x1):
+                for i in range(x * height + y0, x * height + y1):
+                    value = aerosols[i]
+                    if value == value:
+                        aerosols[i] = value * aerosol_factor
+                    value = droplets[i]
+                    if value == value:
+                        droplets[i] = value - (value * droplet_rate * dt)
+        connection.send(True)
+
+
+def _work(connection, name: str, width: int, height: int, tile, conductances):
+    """Main function of a worker process. The views of the segment are released by _serve before it is closed."""
+    memory = SharedMemory(name=name)
+    _serve(connection, memory.buf, width, height, tile, conductances)
+    memory.close()
+
+
+def _shutdown(connections, processes, memory):
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for process in processes:
+        process.join()
+    memory.unlink()
+
+
+class _Column:
+    """A column of a layer in shared memory, with None for the void cells as in the columns of a plain Air"""
+
+    __slots__ = ('values',)
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, y):
+        if isinstance(y, slice):
+            return [self[i] for i in range(*y.indices(len(self.values)))]
+        value = self.values[y]
+        return None if value != value else value
+
+    def __setitem__(self, y, value):
+        self.values[y] = math.nan if value is None else value
+
+    def __iter__(self):
+        for value in self.values:
+            yield None if value != value else value
+
+
+class DecomposedAir(Air):
+    """
+    Air of which diffusion and decay are split over a number of worker processes, with the same results as a plain Air.
+
+    The workers are started on the first diffusion or decay and keep running until close is called, after which the
+    layers are plain lists again. Everything else, such as emission and pickup by the Agents, happens in this process
+    on the shared layers.
+    """
+
+    def __init__(self, *args, processes: int = 2, **kwargs):
+        """
+        :param processes: Number of worker processes, each of which diffuses and decays its own rectangle of the grid
+        """
+        super().__init__(*args, **kwargs)
+        self.processes = processes
+        self._parity = 0
+        # Set while the workers run. The segment comes last, so that the views of it are released before it is closed
+        # when the Air is collected.
+        self._workers = None
+        self._columns = None  # Shared columns of the aerosols and droplets, twice each
+        self._views = None
+        self._memory = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_columns=None, _views=None, _memory=None, _workers=None, _parity=0,
+                     _aerosols=[list(column) for column in self._aerosols],
+                     _droplets=[list(column) for column in self._droplets])
+        return state
+
+    def _start(self):
+        """Move the layers to shared memory and start the workers"""
+        width, height = self._width, self._height
+        n = width * height
+        memory = SharedMemory(create=True, size=max(4 * n * 8, 8))
+        views = memory.buf.cast('d')
+        self._views = views
+        self._columns = []
+        for layer, grid in enumerate((self._aerosols, self._droplets)):
+            for buffer in range(2):
+                start = (2 * layer + buffer) * n
+                columns = [_Column(views[start + x * height:start + (x + 1) * height]) for x in range(width)]
+                if buffer == 0:
+                    for column, values in zip(columns, grid):
+                        column.values[:] = memoryview(array('d', [math.nan if value is None else value
+                                                                  for value in values]))
+                self._columns.append(columns)
+        self._memory = memory
+        self._parity = 0
+        self._aerosols, self._droplets = self._columns[0], self._columns[2]
+
+        context = multiprocessing.get_context()
+        connections, processes = [], []
+        for tile in tiles(width, height, self.processes):
+            x0, x1 = tile[:2]
+            conductances = [[bytes(conductance[x]) for x in range(x0, x1)]
+                            for conductance in (self._aerosol_conductance, self._droplet_conductance)]
+            parent, child = context.Pipe()
+            process = context.Process(target=_work, args=(child, memory.name, width, height, tile, conductances),
+                                      daemon=True)
+            process.start()
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+        self._workers = (connections, weakref.finalize(self, _shutdown, connections, processes, memory))
+
+    def _command(self, kind: str, parameters: tuple):
+        if self._workers is None:
+            self._start()
+        connections = self._workers[0]
+        for connection in connections:
+            connection.send((kind, self._parity, parameters))
+        for connection in connections:
+            try:
+                connection.recv()
+            except EOFError:
+                self.close()
+                raise RuntimeError('A worker process of the DecomposedAir stopped')
+
+    def diffuse(self) -> None:
+        env = self.config['env']
+        self._command(_DIFFUSE, (env['Diffusivity'], env['WallAbsorbingProportion'], env['SimulationTimeStep']))
+        self._parity = 1 - self._parity
+        self._aerosols, self._droplets = self._columns[self._parity], self._columns[2 + self._parity]
+
+    def decay(self) -> None:
+        dt = self.config['env']['SimulationTimeStep']
+        self._command(_DECAY, (math.exp(-(self._aerosol_decay_rate + self._air_exchange_rate) * dt),
+                               self._droplet_decay_rate, dt))
+
+    def set_barriers(self, barriers):
+        super().set_barriers(barriers)
+        self.close()  # The workers hold the conductance of the old barriers
+
+    def close(self) -> None:
+        """Stop the workers and copy the layers back from shared memory"""
+        if self._workers is None:
+            return
+        self._aerosols = [list(column) for column in self._aerosols]
+        self._droplets = [list(column) for column in self._droplets]
+        connections, finalizer = self._workers
+        self._workers = None
+        finalizer()
+        for connection in connections:
+            connection.close()
+        self._columns = None
+        self._views.release()
+        self._views = None
+        self._memory.close()
+        self._memory = None
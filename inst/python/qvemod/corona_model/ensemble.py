@@ -0,0 +1,82 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from typing import Dict, List, Sequence
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.shared import shared_geometry
+from corona_model.streams import derive_seed
+
+# Model and config of a worker process, set once by _initialize
+_model = None
+_config = None
+
+
+def _initialize(state: bytes):
+    global _model, _config
+    _model, _config = pickle.loads(state)
+
+
+def _replicate(seed) -> Dict:
+    """Run the Model of this process once with the given seed and return the exposures of its Agents"""
+    _config['env']['Seed'] = seed
+    _model.run(_config)
+    return {
+        'seed': seed,
+        'air': _model.air_exposure(),
+        'droplet': _model.droplet_exposure(),
+        'surface': _model.surface_exposure(),
+    }
+
+
+def run_ensemble(model, config: dict, n: int, seeds: Sequence = None, workers: int = None) -> List[Dict]:
+    """
+    Run n replicates of the Model, each with its own seed, in a pool of processes.
+
+    The seed of a replicate is used as the Seed of its run, from which the random stream of every Agent is derived. A
+    replicate therefore gives the same result whichever process runs it.
+
+    The Model and config are pickled once and shipped to every worker when it starts, after which a replicate only
+    sends its seed and receives the exposures. As every run starts with Model.reset, a worker reuses its Model for all
+    of its replicates. Output files are suppressed, since the replicates would overwrite each other's.
+
+    :param seeds: Seed of each replicate, defaults to seeds derived from the Seed in the config (0 if not given) and the
+                  number of the replicate
+    :param workers: Number of processes, defaults to the number of cores. With 1 worker the replicates are run in this
+                    process.
+    :return: For each replicate in the order of the seeds, a dictionary with its seed and the air, droplet and surface
+             exposure per Agent name, as returned by Model.air_exposure, droplet_exposure and surface_exposure
+    """
+    if seeds is None:
+        seeds = [derive_seed(config['env'].get('Seed') or 0, 'replicate', i) for i in range(n)]
+    seeds = list(seeds)
+    assert len(seeds) == n, "Expected {} seeds, got {}".format(n, len(seeds))
+    workers = os.cpu_count() if workers is None else workers
+    workers = max(1, min(workers, n))
+
+    config = deepcopy(config)
+    config['output']['Suppress'] = True
+    config['output']['CheckpointInterval'] = 0
+
+    if workers == 1:
+        _initialize(pickle.dumps((model, config), protocol=pickle.HIGHEST_PROTOCOL))
+        return [_replicate(seed) for seed in seeds]
+
+    # Hand out the replicates in chunks to keep the overhead per replicate low while balancing the load
+    chunksize = max(1, n // (4 * workers))
+    with shared_geometry(model.env, config):
+        state = pickle.dumps((model, config), protocol=pickle.HIGHEST_PROTOCOL)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_initialize, initargs=(state,)) as executor:
+            return list(executor.map(_replicate, seeds, chunksize=chunksize))
@@ -20,8 +20,10 @@ from corona_model.agent import Agent
 from corona_model.barriers import Wall, Shield
 from corona_model.emissionpatterns import droplet_cough, aerosol_cough
 from corona_model.air import Air, Void
+from corona_model.decomposition import DecomposedAir
 from corona_model.facing import Facing
 from corona_model.surfaces import Surface, Item, Fixture
+from corona_model.script import Script
 
 
 
@@ -48,6 +50,8 @@ class Environment:
         self.mobility_space: List[List[Union[Agent, None]]] = [[None for _ in range(0, height)] for _ in range(0, width)]
         self.surfaces: List[List[List[Surface]]] = [[[] for _ in range(0, height)] for _ in range(0, width)]
         self.agent_lookup: Dict[Agent, Tuple[int, int]] = {}
+        self.validated = False  # Whether all positions have been checked before the run, see validate_scripts
+        self._compiled = {}  # Compiled geometry of the Air per cell sizes, reused by every set_config
 
         self.config = None
         self.reach = None
@@ -56,7 +60,55 @@ class Environment:
         self.config = config
         self.reach = int(config['env']['AgentReach'] / config['env']['MobilityCellSize'])
         self.mobility_ratio = config['env']['MobilityCellSize'] / config['env']['AirCellSize']
-        self.air = Air(config, self.width, self.height, self.decay_rate_air, self.decay_rate_droplet, self.air_exchange_rate, self.barriers, self.walls)
+        key = (config['env']['AirCellSize'], config['env']['MobilityCellSize'])
+        if self.air is not None:
+            self.air.close()
+        processes = int(config['env'].get('AirProcesses', 1))
+        if processes > 1:
+            self.air = DecomposedAir(config, self.width, self.height, self.decay_rate_air, self.decay_rate_droplet,
+                                     self.air_exchange_rate, self.barriers, self.walls,
+                                     compiled=self._compiled.get(key), processes=processes)
+        else:
+            self.air = Air(config, self.width, self.height, self.decay_rate_air, self.decay_rate_droplet, self.air_exchange_rate, self.barriers, self.walls,
+                           compiled=self._compiled.get(key))
+        self._compiled[key] = self.air.compiled
+        self.validated = False
+
+    def set_barriers(self, barriers: List[Union[Wall, Shield]]):
+        """Replace the barriers of the Environment, keeping the contamination of the Air if it exists"""
+        self.barriers = barriers
+        self._compiled = {}
+        if self.air is not None:
+            self.air.set_barriers(barriers)
+
+    def reset(self):
+        """Remove all Agents, Surfaces and contamination, keeping the geometry"""
+        if self.air is not None:
+            self.air.close()
+        self.air = None
+        self.mobility_space = [[None for _ in range(0, self.height)] for _ in range(0, self.width)]
+        self.surfaces = [[[] for _ in range(0, self.height)] for _ in range(0, self.width)]
+        self.agent_lookup = {}
+        self.validated = False
+
+    def __getstate__(self):
+        # The grids of Agents and Surfaces are mostly empty, so only their occupied cells are pickled
+        state = self.__dict__.copy()
+        state['mobility_space'] = [(x, y, agent) for x, column in enumerate(self.mobility_space) if any(column)
+                                   for y, agent in enumerate(column) if agent is not None]
+        state['surfaces'] = [(x, y, surfaces) for x, column in enumerate(self.surfaces) if any(column)
+                             for y, surfaces in enumerate(column) if surfaces]
+        return state
+
+    def __setstate__(self, state):
+        mobility_space, surfaces = state.pop('mobility_space'), state.pop('surfaces')
+        self.__dict__.update(state)
+        self.mobility_space = [[None for _ in range(0, self.height)] for _ in range(0, self.width)]
+        self.surfaces = [[[] for _ in range(0, self.height)] for _ in range(0, self.width)]
+        for x, y, agent in mobility_space:
+            self.mobility_space[x][y] = agent
+        for x, y, cell in surfaces:
+            self.surfaces[x][y] = cell
 
     def serialize(self):
         return {
@@ -87,11 +139,14 @@ class Environment:
                 self.surfaces[surface.init_x][surface.init_y].append(surface)
 
     def apply_entry(self, agent: Agent, entry):
-        if self.air.is_void(entry.x, entry.y):
+        self._enter(agent, entry.x, entry.y, entry.facing)
+
+    def _enter(self, agent: Agent, x: int, y: int, facing: str):
+        if not self.validated and self.air.is_void(x, y):
             raise IllegalAgentPosition
-        self.mobility_space[entry.x][entry.y] = agent
-        self.agent_lookup[agent] = entry.x, entry.y  # x and y using surface coordinate
-        agent.set_facing(entry.facing)
+        self.mobility_space[x][y] = agent
+        self.agent_lookup[agent] = x, y  # x and y using surface coordinate
+        agent.set_facing(facing)
         agent.is_active = True
 
     @staticmethod
@@ -109,43 +164,16 @@ class Environment:
 
     def process_agent_action(self, agent: Agent, action):
         if action.type == 'enter':
-            self.apply_entry(agent, action)
+            self._enter(agent, action.x, action.y, action.facing)
         elif agent.is_active:
-            cur_x, cur_y = self.agent_lookup[agent]
             if action.type == 'move':
-                new_x = cur_x + action.x
-                new_y = cur_y + action.y  
-                if self.air.is_void(new_x, new_y):
-                    raise IllegalAgentPosition
-                agent.set_facing(action.facing or Environment.get_direction(cur_x, cur_y, new_x, new_y))
-                # Move self
-                self.mobility_space[cur_x][cur_y] = None
-                self.mobility_space[new_x][new_y] = agent
-                self.agent_lookup[agent] = new_x, new_y
-                # Move held Items
-                for item in agent.held:
-                    self.surfaces[cur_x][cur_y].remove(item)
-                    self.surfaces[new_x][new_y].append(item)
+                self._move(agent, action.x, action.y, action.facing)
             elif action.type == 'leave':
-                self.mobility_space[cur_x][cur_y] = None
-                del self.agent_lookup[agent]  # Remove agent from environment
-                for item in agent.held:  # Also remove all items agent had
-                    self.surfaces[cur_x][cur_y].remove(item)
-                agent.is_active = False
-            elif action.type == 'pickup' or action.type == 'putdown':
-                # TODO: Pickup and Putdown do not use AgentReach and are currently limited to their own cell
-                items = [i for i in self.surfaces[cur_x][cur_y]
-                         if isinstance(i, Item) and i.name == action.target]
-                if len(items) > 1:
-                    warnings.warn("Too many Items found with target name: {}".format(action.target))
-                elif len(items) < 1:
-                    warnings.warn("No Items found with target name: {}". format(action.target))
-                else:
-                    item = items.pop()
-                    if action.type == 'pickup':
-                        agent.hold(item)
-                    elif action.type == 'putdown':
-                        agent.release(item)
+                self._leave(agent)
+            elif action.type == 'pickup':
+                self._pickup(agent, action.target)
+            elif action.type == 'putdown':
+                self._putdown(agent, action.target)
             elif action.type == 'handwash':
                 agent.start_handwash_effect()
             elif action.type == 'donmask':
@@ -155,6 +183,78 @@ class Environment:
             elif action.type == 'face':
                 agent.set_facing(action.direction)
 
+    def process_script_action(self, agent: Agent, i: int):
+        """Process row i of the Script of the Agent without creating an Action"""
+        script = agent.script
+        code = script.codes[i]
+        if code == Script.ENTER:
+            self._enter(agent, script.x[i], script.y[i], Script.FACINGS[script.facing[i]])
+        elif agent.is_active:
+            if code == Script.MOVE:
+                self._move(agent, script.x[i], script.y[i],
+                           Script.FACINGS[script.facing[i]] if script.facing[i] >= 0 else None)
+            elif code == Script.FACE:
+                agent.set_facing(Script.FACINGS[script.facing[i]])
+            elif code == Script.LEAVE:
+                self._leave(agent)
+            elif code == Script.PICKUP:
+                self._pickup(agent, script.targets[script.target[i]])
+            elif code == Script.PUTDOWN:
+                self._putdown(agent, script.targets[script.target[i]])
+            elif code == Script.HANDWASH:
+                agent.start_handwash_effect()
+            elif code == Script.DONMASK:
+                agent.don_mask()
+            elif code == Script.DOFFMASK:
+                agent.doff_mask()
+
+    def _move(self, agent: Agent, x: int, y: int, facing: Union[str, None]):
+        cur_x, cur_y = self.agent_lookup[agent]
+        new_x = cur_x + x
+        new_y = cur_y + y
+        if not self.validated and self.air.is_void(new_x, new_y):
+            raise IllegalAgentPosition
+        agent.set_facing(facing or Environment.get_direction(cur_x, cur_y, new_x, new_y))
+        # Move self
+        self.mobility_space[cur_x][cur_y] = None
+        self.mobility_space[new_x][new_y] = agent
+        self.agent_lookup[agent] = new_x, new_y
+        # Move held Items
+        for item in agent.held:
+            self.surfaces[cur_x][cur_y].remove(item)
+            self.surfaces[new_x][new_y].append(item)
+
+    def _leave(self, agent: Agent):
+        cur_x, cur_y = self.agent_lookup[agent]
+        self.mobility_space[cur_x][cur_y] = None
+        del self.agent_lookup[agent]  # Remove agent from environment
+        for item in agent.held:  # Also remove all items agent had
+            self.surfaces[cur_x][cur_y].remove(item)
+        agent.is_active = False
+
+    def _find_item(self, agent: Agent, target) -> Union[Item, None]:
+        # TODO: Pickup and Putdown do not use AgentReach and are currently limited to their own cell
+        cur_x, cur_y = self.agent_lookup[agent]
+        items = [i for i in self.surfaces[cur_x][cur_y]
+                 if isinstance(i, Item) and i.name == target]
+        if len(items) > 1:
+            warnings.warn("Too many Items found with target name: {}".format(target))
+        elif len(items) < 1:
+            warnings.warn("No Items found with target name: {}". format(target))
+        else:
+            return items.pop()
+        return None
+
+    def _pickup(self, agent: Agent, target):
+        item = self._find_item(agent, target)
+        if item is not None:
+            agent.hold(item)
+
+    def _putdown(self, agent: Agent, target):
+        item = self._find_item(agent, target)
+        if item is not None:
+            agent.release(item)
+
     def add_load_air(self, agent: Agent):
         if self.agent_lookup.get(agent) is not None:
             x, y = self.agent_lookup[agent]
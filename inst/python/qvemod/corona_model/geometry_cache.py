@@ -0,0 +1,105 @@
+import hashlib
+import json
+import pickle
+from typing import Union
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+
+class GeometryCache:
+    """
+    Content-addressed on-disk cache of compiled Air geometries.
+
+    An entry is keyed by a hash of everything that determines the geometry: the size of the grid, the cell sizes and
+    the type and coordinates of every barrier and void. Entries are pickled dictionaries as produced by Air.compile.
+    Every entry carries VERSION, so that entries written by an incompatible version of the model are ignored. When the
+    cache grows beyond its maximum size, the least recently used entries are removed.
+    """
+
+    VERSION = 2
+    SUFFIX = '.geometry'
+
+    def __init__(self, path: str, max_size: int = 256 * 2 ** 20):
+        """
+        :param path: Directory in which the entries are stored, created if needed
+        :param max_size: Maximum total size of the entries in bytes
+        """
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config: dict) -> Union['GeometryCache', None]:
+        """Create the cache configured by GeometryCachePath and GeometryCacheSize (in MB), None if there is no path"""
+        path = config['env'].get('GeometryCachePath')
+        if not path:
+            return None
+        return cls(path, int(config['env'].get('GeometryCacheSize', 256) * 2 ** 20))
+
+    @classmethod
+    def key(cls, width: int, height: int, config: dict, barriers, voids) -> str:
+        """Hash of the geometry, independent of the order of the barriers and voids"""
+        content = {
+            'version': cls.VERSION,
+            'width': width,
+            'height': height,
+            'air_cell_size': config['env']['AirCellSize'],
+            'mobility_cell_size': config['env']['MobilityCellSize'],
+            'barriers': sorted([type(b).__name__, b.x1, b.y1, b.x2, b.y2] for b in barriers),
+            'voids': sorted([v.x, v.y] for v in voids),
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + GeometryCache.SUFFIX)
+
+    def load(self, key: str) -> Union[dict, None]:
+        """The compiled geometry stored under key, None if there is no usable entry"""
+        file = self._file(key)
+        try:
+            with open(file, 'rb') as f:
+                compiled = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if not isinstance(compiled, dict) or compiled.get('version') != GeometryCache.VERSION:
+            return None
+        os.utime(file)  # Mark as recently used
+        return compiled
+
+    def store(self, key: str, compiled: dict) -> None:
+        """Store the compiled geometry under key and evict the least recently used entries if needed"""
+        file = self._file(key)
+        temporary = '{}.{}.tmp'.format(file, os.getpid())
+        with open(temporary, 'wb') as f:
+            pickle.dump(dict(compiled, version=GeometryCache.VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, file)  # Atomic, so concurrent runs never read a partial entry
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(GeometryCache.SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            try:
+                os.remove(os.path.join(self.path, name))
+            except OSError:
+                pass
+            total -= size
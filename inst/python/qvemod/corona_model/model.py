@@ -1,4 +1,8 @@
 import math
+import pickle
+import random
+import warnings
+from bisect import bisect_left
 
 # Add the QVEmod package to the system path. Needed to import corona_model as 
 # a module
@@ -16,10 +20,18 @@ if not filename in sys.path:
 from corona_model.agent import Agent
 from corona_model.environment import Environment
 from corona_model.surfaces import Item, Fixture
+from corona_model import binary
+from corona_model.validation import validate_scripts, RAISE
+from corona_model.streams import agent_seeds
+from corona_model.scenarios import Snapshot
 from corona_model.writers import (
-    AgentExposureWriter, AerosolContaminationWriter, DropletContaminationWriter, SurfaceContaminationWriter
+    AgentExposureWriter, AerosolContaminationWriter, DropletContaminationWriter, SurfaceContaminationWriter,
+    ContaminationSummaryWriter, BinnedAerosolContaminationWriter, BinnedDropletContaminationWriter
 )
 
+# Version of the checkpoints written by Model.checkpoint, checked by Model.resume
+CHECKPOINT_VERSION = 1
+
 
 class Model:
     def __init__(self, ticks, env, agents, surfaces=(), name=''):
@@ -58,34 +70,172 @@ class Model:
             'fixtures': [s.serialize() for s in self.surfaces if isinstance(s, Fixture)],
         }
 
+    def save(self, path):
+        """Write the Model to path in the compact binary format of corona_model.binary"""
+        binary.dump(self, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a Model written by Model.save"""
+        return binary.load(path)
+
+    def reset(self):
+        """Return the Model to the state it was created in, so that it can be run again"""
+        self.termination_routines = []
+        self.env.reset()
+        for agent in self.agents:
+            agent.reset()
+        for surface in self.surfaces:
+            surface.reset()
+
     def run(self, config, callback=None):
+        positions, writers = self._start(config)
+        self._run_ticks(config, 0, positions, writers, callback)
+
+    def snapshot(self, config, tick, callback=None):
+        """
+        Run the Model up to the given tick and keep the state at that point, from which any number of variants of the
+        scenario can be continued with Snapshot.fork. Output is written up to the tick, to be continued by each fork.
+
+        :return: Snapshot of the run before the given tick
+        """
+        positions, writers = self._start(config)
+        self._run_ticks(config, 0, positions, writers, callback, stop=tick)
+        snapshot = Snapshot(pickle.dumps(self._state(config, tick, positions, writers), protocol=pickle.HIGHEST_PROTOCOL),
+                            tick)
+        for writer in writers.values():
+            writer.close()
+        self.termination_routines = []
+        return snapshot
+
+    def _start(self, config):
+        """Set up a run of the Model from its initial state"""
+        # Every run starts from the initial state of the Model
+        self.reset()
+
         # setup writers
-        agent_exposure_writer = None
-        aerosol_contamination_writer = None
-        droplet_contamination_writer = None
-        surface_contamination_writer = None
-        if not config['output']['Suppress']:
-            agent_exposure_writer = AgentExposureWriter(config)
-            self.termination_routines.append(lambda: agent_exposure_writer.close())
-            aerosol_contamination_writer = AerosolContaminationWriter(config)
-            self.termination_routines.append(lambda: aerosol_contamination_writer.close())
-            droplet_contamination_writer = DropletContaminationWriter(config)
-            self.termination_routines.append(lambda: droplet_contamination_writer.close())
-            surface_contamination_writer = SurfaceContaminationWriter(config)
-            self.termination_routines.append(lambda: surface_contamination_writer.close())
+        writers = self._open_writers(config)
+        self._add_termination_routines(writers)
 
         # setup environment
         self.env.place_surfaces(self.surfaces)
         self.env.set_config(config)
+        if int(config['env'].get('AirThreads', 1)) > 1:
+            warnings.warn('AirThreads only applies to the BatchedModel, a Model diffuses its Air in a single thread')
 
-        for agent in self.agents:
-            agent.set_config(config)
+        # The streams of the Agents are derived from the Seed, or from one seed per run drawn from the global random
+        # state without one, so that they do not depend on the order of the Agents either way
+        seed = config['env'].get('Seed')
+        if seed is None:
+            seed = random.getrandbits(64)
+        for agent, agent_seed in zip(self.agents, agent_seeds(seed, [agent.name for agent in self.agents])):
+            agent.set_config(config, agent_seed)
+
+        # Check all positions of the Agents at once, so that the main loop does not need to
+        validate_scripts(self.env, self.agents, config['env'].get('ScriptViolations', RAISE),
+                     self.ticks)
+        self.env.validated = True
+
+        # Position of each Agent in their Script. Scripts are sorted by tick, so the position only moves forward.
+        positions = [bisect_left(agent.script.ticks, 0) for agent in self.agents]
+        return positions, writers
+
+    @classmethod
+    def resume(cls, path, callback=None):
+        """
+        Continue a run from the checkpoint at path, as written when CheckpointInterval is set. The output files are
+        truncated to their state at the checkpoint, so that they end up identical to those of an uninterrupted run.
+
+        :return: The Model after the run
+        """
+        with open(path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        if checkpoint.get('version') != CHECKPOINT_VERSION:
+            raise ValueError('Unsupported version {} of the checkpoint {}'.format(checkpoint.get('version'), path))
+        model = checkpoint['model']
+        model._continue(checkpoint, callback)
+        return model
+
+    def checkpoint(self, path, config, tick, positions, writers):
+        """Atomically write the state of the run before the given tick to path"""
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary, 'wb') as f:
+            pickle.dump(self._state(config, tick, positions, writers), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)  # A run killed while writing leaves the previous checkpoint intact
+
+    def _state(self, config, tick, positions, writers):
+        """Everything needed to continue the run before the given tick, as pickled by checkpoint and snapshot"""
+        return {
+            'version': CHECKPOINT_VERSION,
+            'tick': tick,
+            'positions': positions,
+            'random': random.getstate(),
+            'config': config,
+            'model': self,
+            'writers': writers,
+        }
+
+    def _continue(self, state, callback=None, source=None):
+        """
+        Continue the run from an unpickled state of _state.
+
+        :param source: Output path the writers wrote to before the state was taken, if it differs from the current one
+        """
+        random.setstate(state['random'])
+        for writer in state['writers'].values():
+            writer.restore(source)
+        self._add_termination_routines(state['writers'])
+        self._run_ticks(state['config'], state['tick'], state['positions'], state['writers'], callback)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['termination_routines'] = []  # Restored from the writers on resume
+        return state
+
+    @staticmethod
+    def _open_writers(config):
+        writers = {}
+        if not config['output']['Suppress']:
+            writers['agent_exposure'] = AgentExposureWriter(config)
+            writers['aerosol_contamination'] = AerosolContaminationWriter(config)
+            writers['droplet_contamination'] = DropletContaminationWriter(config)
+            writers['surface_contamination'] = SurfaceContaminationWriter(config)
+            if config['output'].get('ContaminationIntegral', False) or \
+                    config['output'].get('ContaminationMaximum', False):
+                writers['contamination_summary'] = ContaminationSummaryWriter(config)
+            if BinnedAerosolContaminationWriter.enabled(config):
+                writers['binned_aerosol_contamination'] = BinnedAerosolContaminationWriter(config)
+            if BinnedDropletContaminationWriter.enabled(config):
+                writers['binned_droplet_contamination'] = BinnedDropletContaminationWriter(config)
+        return writers
+
+    def _add_termination_routines(self, writers):
+        for name, writer in writers.items():
+            if name == 'contamination_summary':
+                self.termination_routines.append(lambda writer=writer: self.write_contamination_summary(writer))
+            self.termination_routines.append(writer.close)
+
+    def _run_ticks(self, config, start, positions, writers, callback, stop=None):
+        agent_exposure_writer = writers.get('agent_exposure')
+        aerosol_contamination_writer = writers.get('aerosol_contamination')
+        droplet_contamination_writer = writers.get('droplet_contamination')
+        surface_contamination_writer = writers.get('surface_contamination')
+        binned_aerosol_contamination_writer = writers.get('binned_aerosol_contamination')
+        binned_droplet_contamination_writer = writers.get('binned_droplet_contamination')
+
+        checkpoint_interval = config['output'].get('CheckpointInterval', 0)
+        checkpoint_path = config['output'].get('CheckpointPath') or \
+            os.path.join(config['output']['Path'], 'checkpoint.pickle')
+        if checkpoint_interval > 0:
+            os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
 
         # main loop
-        for tick in range(0, self.ticks):
-            for agent in self.agents:
-                if tick in agent.script:
-                    self.env.process_agent_action(agent, agent.script[tick])
+        for tick in range(start, self.ticks if stop is None else stop):
+            for i, agent in enumerate(self.agents):
+                ticks = agent.script.ticks
+                if positions[i] < len(ticks) and ticks[positions[i]] == tick:
+                    self.env.process_script_action(agent, positions[i])
+                    positions[i] += 1
 
             for agent in self.agents:
                 if agent.is_active:
@@ -107,6 +257,7 @@ class Model:
             for agent in self.agents:
                 if agent.is_active:
                     self.env.add_load_air(agent)
+            self.env.air.accumulate()
 
             if agent_exposure_writer:
                 for agent in self.agents:
@@ -129,11 +280,20 @@ class Model:
                 for surface in self.surfaces:
                     surface_contamination_writer.write(surface.name, surface.__class__.__name__, tick,
                                                        *self.env.surface_lookup(surface), surface.contamination_load)
+            if binned_aerosol_contamination_writer:
+                binned_aerosol_contamination_writer.update(tick, self.env.air._aerosols)
+            if binned_droplet_contamination_writer:
+                binned_droplet_contamination_writer.update(tick, self.env.air._droplets)
 
             if callback is not None:
                 callback(model=self, tick=tick)
 
-        self.terminate(condition=0)
+            if checkpoint_interval > 0 and (tick + 1) % checkpoint_interval == 0 and tick + 1 < self.ticks:
+                self.checkpoint(checkpoint_path, config, tick + 1, positions, writers)
+
+        self.env.air.close()  # Stop the worker processes of a DecomposedAir
+        if stop is None:
+            self.terminate(condition=0)
 
     def terminate(self, condition=99):
         for routine in self.termination_routines:
@@ -141,6 +301,28 @@ class Model:
         if condition != 0:  # Skip exit call on clean termination for tests or wrappers
             exit(condition)  # Condition defaults to a unique 99 to indicate early termination
 
+    def write_contamination_summary(self, writer):
+        air = self.env.air
+        for x in range(air._width):
+            for y in range(air._height):
+                if air._get_aerosol(x, y) is not None:
+                    writer.write(x, y,
+                                 *[grid[x][y] if grid is not None else None
+                                   for grid in (air.aerosol_integral, air.droplet_integral,
+                                                air.aerosol_maximum, air.droplet_maximum)])
+
+    def aerosol_integral(self):
+        return self.env.air.aerosol_integral
+
+    def droplet_integral(self):
+        return self.env.air.droplet_integral
+
+    def aerosol_maximum(self):
+        return self.env.air.aerosol_maximum
+
+    def droplet_maximum(self):
+        return self.env.air.droplet_maximum
+
     def air_exposure(self):
         return {agent.name: agent.contamination_load_air for agent in self.agents}
 
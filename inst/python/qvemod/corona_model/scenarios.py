@@ -0,0 +1,50 @@
+import pickle
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+
+class Snapshot:
+    """
+    State of a run of a Model before a tick, as taken by Model.snapshot.
+
+    Variants of a scenario that share their history up to the tick, such as interventions starting at that tick, can
+    each be continued from the Snapshot with fork instead of simulating the shared history again. The state is kept
+    pickled, so every fork continues its own copy and forks do not influence each other. All forks start from the same
+    random state.
+    """
+
+    def __init__(self, state: bytes, tick: int):
+        self._state = state
+        self.tick = tick
+
+    def fork(self, modify=None, path: str = None, callback=None):
+        """
+        Continue a copy of the run to the end.
+
+        :param modify: Called with the Model and its config before continuing, to apply the variant, e.g.
+                       lambda model, config: [agent.don_mask() for agent in model.agents]
+        :param path: Output path of the variant, to which the output before the Snapshot is copied. Forks without a path
+                     continue the output of the Snapshot itself and overwrite each other.
+        :param callback: Post tick callback, as for Model.run
+        :return: The Model after the run
+        """
+        state = pickle.loads(self._state)
+        model, config = state['model'], state['config']
+        source = None
+        if path is not None:
+            source = config['output']['Path']
+            config['output']['Path'] = path
+        if modify is not None:
+            modify(model, config)
+        model._continue(state, callback, source)
+        return model
@@ -0,0 +1,255 @@
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Union
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.actions import *
+
+
+class Script:
+    """
+    Compact script of an Agent, stored as parallel arrays sorted by tick.
+
+    Every entry is one row of the arrays: the tick at which it happens, an action code, the x and y of an Enter
+    (absolute) or Move (relative), a facing code and the index of the target of a Pickup or Putdown in a list of
+    interned target names. The Environment dispatches directly from these arrays. For convenience the Script also
+    behaves as a mapping of tick to Action, creating the Action objects on access.
+    """
+
+    # Action codes, in the order of TYPES
+    ENTER, MOVE, LEAVE, PICKUP, PUTDOWN, HANDWASH, DONMASK, DOFFMASK, FACE = range(9)
+    TYPES = ('enter', 'move', 'leave', 'pickup', 'putdown', 'handwash', 'donmask', 'doffmask', 'face')
+    CODES = {t: i for i, t in enumerate(TYPES)}
+
+    # Facing codes, -1 denoting no facing
+    FACINGS = ('N', 'S', 'E', 'W')
+
+    # Flyweights: Actions without state and Faces are shared instead of created for every row
+    _SHARED = {LEAVE: Leave(), HANDWASH: Handwash(), DONMASK: DonMask(), DOFFMASK: DoffMask()}
+    _FACES = tuple(Face(direction) for direction in FACINGS)
+
+    def __init__(self, actions: Union[Dict[int, object], None] = None):
+        """
+        Creates a Script out of a dictionary of tick to Action.
+
+        :param actions: Dictionary with the ticks as keys and instances of the Action classes as values
+        """
+        self.ticks = array('q')
+        self.codes = array('b')
+        self.x = array('q')
+        self.y = array('q')
+        self.facing = array('b')
+        self.target = array('q')
+        self.targets: List[str] = []
+        self._target_lookup: Union[Dict[str, int], None] = None  # Built on first use
+
+        if actions:
+            for tick in sorted(actions):
+                self._append(tick, actions[tick])
+
+    @classmethod
+    def from_arrays(cls, ticks: Iterable[int], codes: Iterable[int], x: Iterable[int], y: Iterable[int],
+                    facing: Iterable[int], target: Iterable[int], targets: List[str]) -> 'Script':
+        """
+        Creates a Script out of parallel sequences of the rows. If a tick occurs more than once, the last row with
+        that tick is kept, like it would in a dictionary.
+
+        :param targets: List of target names that target indexes into. May be shared between Scripts.
+        """
+        script = cls()
+        script.ticks = array('q', ticks)
+        script.codes = array('b', codes)
+        script.x = array('q', x)
+        script.y = array('q', y)
+        script.facing = array('b', facing)
+        script.target = array('q', target)
+        script.targets = targets
+
+        n = len(script.ticks)
+        assert all(len(a) == n for a in (script.codes, script.x, script.y, script.facing, script.target)), \
+            "All arrays of a Script should have the same length"
+        if any(script.ticks[i] >= script.ticks[i + 1] for i in range(n - 1)):
+            rows = {tick: i for i, tick in enumerate(script.ticks)}  # Last row of each tick
+            script._take([rows[tick] for tick in sorted(rows)])
+        return script
+
+    @classmethod
+    def from_columns(cls, ticks: array, codes: array, x: array, y: array, facing: array, target: array,
+                     targets: List[str]) -> 'Script':
+        """
+        Creates a Script that takes ownership of the given arrays without copying or checking them. The arrays should
+        have the typecodes of a Script and the ticks should be strictly increasing, as in the arrays of another Script.
+        """
+        script = cls()
+        script.ticks, script.codes, script.x, script.y, script.facing, script.target = ticks, codes, x, y, facing, target
+        script.targets = targets
+        return script
+
+    def copy(self) -> 'Script':
+        """A Script with copies of the arrays of this one, which can be changed without changing this one"""
+        return Script.from_columns(*(array(values.typecode, values) for values in
+                                     (self.ticks, self.codes, self.x, self.y, self.facing, self.target)),
+                                   list(self.targets))
+
+    def _take(self, rows: List[int]) -> None:
+        """Keep only the given rows, in the given order"""
+        for name in ('ticks', 'codes', 'x', 'y', 'facing', 'target'):
+            values = getattr(self, name)
+            setattr(self, name, array(values.typecode, [values[i] for i in rows]))
+
+    def _intern(self, name) -> int:
+        if self._target_lookup is None:
+            self._target_lookup = {target: i for i, target in enumerate(self.targets)}
+        if name not in self._target_lookup:
+            self._target_lookup[name] = len(self.targets)
+            self.targets.append(name)
+        return self._target_lookup[name]
+
+    @classmethod
+    def _row(cls, action) -> tuple:
+        """Translate an Action to the values of a row, excluding its tick and target"""
+        code = cls.CODES[action.type]
+        x, y, facing = 0, 0, -1
+        if code == cls.ENTER or code == cls.MOVE:
+            x, y = int(action.x), int(action.y)
+            if action.facing is not None:
+                facing = cls.FACINGS.index(action.facing)
+        elif code == cls.FACE:
+            facing = cls.FACINGS.index(action.direction)
+        return code, x, y, facing
+
+    def _append(self, tick: int, action) -> None:
+        code, x, y, facing = Script._row(action)
+        self.ticks.append(tick)
+        self.codes.append(code)
+        self.x.append(x)
+        self.y.append(y)
+        self.facing.append(facing)
+        self.target.append(self._intern(action.target) if code in (Script.PICKUP, Script.PUTDOWN) else -1)
+
+    @classmethod
+    def intern(cls, action):
+        """The shared instance of an Action without state or of a Face, the Action itself otherwise"""
+        code = cls.CODES[action.type]
+        if code in cls._SHARED:
+            return cls._SHARED[code]
+        elif code == cls.FACE:
+            return cls._FACES[cls.FACINGS.index(action.direction)]
+        return action
+
+    def index(self, tick: int) -> int:
+        """Row of the given tick, -1 if there is no action at this tick"""
+        i = bisect_left(self.ticks, tick)
+        if i < len(self.ticks) and self.ticks[i] == tick:
+            return i
+        return -1
+
+    def action(self, i: int):
+        """The Action of the given row, shared between rows if it has no state of its own"""
+        code = self.codes[i]
+        if code in Script._SHARED:
+            return Script._SHARED[code]
+        elif code == Script.FACE:
+            return Script._FACES[self.facing[i]]
+        facing = Script.FACINGS[self.facing[i]] if self.facing[i] >= 0 else None
+        if code == Script.ENTER:
+            return Enter(self.x[i], self.y[i], facing)
+        elif code == Script.MOVE:
+            return Move(self.x[i], self.y[i], facing=facing)
+        elif code == Script.PICKUP:
+            return Pickup(self.targets[self.target[i]])
+        elif code == Script.PUTDOWN:
+            return Putdown(self.targets[self.target[i]])
+        raise ValueError('Unknown action code {}'.format(code))
+
+    def __len__(self):
+        return len(self.ticks)
+
+    def __iter__(self):
+        return iter(self.ticks)
+
+    def __contains__(self, tick):
+        return self.index(tick) >= 0
+
+    def __getitem__(self, tick):
+        i = self.index(tick)
+        if i < 0:
+            raise KeyError(tick)
+        return self.action(i)
+
+    def __setitem__(self, tick, action):
+        i = self.index(tick)
+        code, x, y, facing = Script._row(action)
+        target = self._intern(action.target) if code in (Script.PICKUP, Script.PUTDOWN) else -1
+        if i < 0:  # Insert a new row, keeping the rows sorted
+            i = bisect_left(self.ticks, tick)
+            for values, value in zip((self.ticks, self.codes, self.x, self.y, self.facing, self.target),
+                                     (tick, code, x, y, facing, target)):
+                values.insert(i, value)
+        else:
+            self.codes[i], self.x[i], self.y[i], self.facing[i], self.target[i] = code, x, y, facing, target
+
+    def __delitem__(self, tick):
+        i = self.index(tick)
+        if i < 0:
+            raise KeyError(tick)
+        for values in (self.ticks, self.codes, self.x, self.y, self.facing, self.target):
+            del values[i]
+
+    def get(self, tick, default=None):
+        i = self.index(tick)
+        return self.action(i) if i >= 0 else default
+
+    def keys(self):
+        return list(self.ticks)
+
+    def values(self):
+        return [self.action(i) for i in range(len(self))]
+
+    def items(self):
+        return [(tick, self.action(i)) for i, tick in enumerate(self.ticks)]
+
+    def serialize(self):
+        # Only keep the targets that are used, as the list of targets may be shared with other Scripts
+        used = sorted(set(t for t in self.target if t >= 0))
+        remap = {t: i for i, t in enumerate(used)}
+        return {
+            'ticks': self.ticks.tolist(),
+            'codes': self.codes.tolist(),
+            'x': self.x.tolist(),
+            'y': self.y.tolist(),
+            'facing': self.facing.tolist(),
+            'target': [remap[t] if t >= 0 else -1 for t in self.target],
+            'targets': [self.targets[t] for t in used],
+        }
+
+    @classmethod
+    def deserialize(cls, serial):
+        assert 'ticks' in serial
+        assert 'codes' in serial
+        assert 'x' in serial
+        assert 'y' in serial
+        assert 'facing' in serial
+        assert 'target' in serial
+        assert 'targets' in serial
+        return cls.from_arrays(
+            serial['ticks'],
+            serial['codes'],
+            serial['x'],
+            serial['y'],
+            serial['facing'],
+            serial['target'],
+            serial['targets']
+        )
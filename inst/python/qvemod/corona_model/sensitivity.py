@@ -0,0 +1,227 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.batched import BatchedModel, ENVIRONMENT_PARAMETERS, CONFIG_PARAMETERS
+from corona_model.shared import shared_geometry
+
+# Global sensitivity analysis of the infection risk with respect to the parameters that a BatchedModel can vary per
+# replicate. Every point of the sampling design is a replicate, so that a batch of points is run at once, and batches
+# are run in a pool of processes. All points share the seed of the coughs, so that the indices reflect the parameters
+# rather than the coughs.
+
+CHECKPOINT_VERSION = 1
+
+# Model, config and outcome of a worker process, set once by _initialize
+_model = None
+_config = None
+_outcome = None
+
+
+def hill_function(exposure, alpha: float = 0.332, half: float = 10 ** 6.8):
+    """Risk of infection for an exposure, as the hill_function of the R package"""
+    return exposure ** alpha / (half ** alpha + exposure ** alpha)
+
+
+def infection_risk(batched: BatchedModel, average_emission: float = 10 ** 6) -> np.ndarray:
+    """
+    Mean risk of infection of the susceptible Agents in every replicate, as infection_risk of the R package computes it
+    from the exposure over time to aerosols and droplets
+
+    :return: K risks
+    """
+    risks = hill_function((batched.air_totals + batched.droplet_totals) * average_emission)
+    susceptible = ~batched.infected
+    return np.where(susceptible, risks, 0).sum(axis=1) / np.maximum(susceptible.sum(axis=1), 1)
+
+
+def _initialize(state: bytes):
+    global _model, _config, _outcome
+    _model, _config, _outcome = pickle.loads(state)
+
+
+def _batch(names: List[str], values: np.ndarray, seed: int) -> np.ndarray:
+    """Outcome of every point of a batch, as the replicates of one BatchedModel"""
+    k = len(values)
+    batched = BatchedModel(_model, k, seeds=[seed] * k,
+                           parameters={name: values[:, j] for j, name in enumerate(names)})
+    batched.run(_config)
+    return np.asarray(_outcome(batched), dtype=float)
+
+
+def evaluate(model, config: dict, names: List[str], values: np.ndarray, seed: int = None, outcome: Callable = None,
+             batch: int = 64, workers: int = 1, path: str = None) -> np.ndarray:
+    """
+    Outcome of the Model for every point of a design.
+
+    :param names: Names of the parameters, in ENVIRONMENT_PARAMETERS or CONFIG_PARAMETERS of the BatchedModel
+    :param values: M x P values of the parameters, a row per point
+    :param seed: Seed of the coughs of all points, defaults to the Seed in the config or 0
+    :param outcome: Function of a BatchedModel after its run to the K outcomes of its replicates, infection_risk by
+                    default. Must be picklable to use more than one worker.
+    :param batch: Number of points per BatchedModel
+    :param workers: Number of processes that run batches
+    :param path: File to which the outcomes are checkpointed after every batch. If it exists and belongs to the same
+                 design, only the points that it does not contain are run.
+    :return: M outcomes
+    """
+    unknown = [name for name in names if name not in ENVIRONMENT_PARAMETERS + CONFIG_PARAMETERS]
+    if unknown:
+        raise KeyError('Parameters {} can not differ between replicates'.format(unknown))
+    values = np.asarray(values, dtype=float)
+    seed = config['env'].get('Seed', 0) if seed is None else seed
+    outcome = infection_risk if outcome is None else outcome
+
+    outcomes = []
+    if path is not None and os.path.exists(path):
+        with open(path, 'rb') as f:
+            checkpoint = pickle.load(f)
+        if checkpoint['version'] != CHECKPOINT_VERSION or checkpoint['names'] != list(names) or \
+                checkpoint['seed'] != seed or not np.array_equal(checkpoint['values'], values):
+            raise ValueError('{} is the checkpoint of another design'.format(path))
+        outcomes = list(checkpoint['outcomes'])
+
+    def save():
+        if path is None:
+            return
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary, 'wb') as f:
+            pickle.dump({'version': CHECKPOINT_VERSION, 'names': list(names), 'seed': seed, 'values': values,
+                         'outcomes': np.array(outcomes)}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    config = deepcopy(config)
+    config['output']['Suppress'] = True
+    config['output']['CheckpointInterval'] = 0
+    batches = [values[start:start + batch] for start in range(len(outcomes), len(values), batch)]
+
+    if workers == 1 or len(batches) <= 1:
+        _initialize(pickle.dumps((model, config, outcome), protocol=pickle.HIGHEST_PROTOCOL))
+        for chunk in batches:
+            outcomes.extend(_batch(names, chunk, seed))
+            save()
+    else:
+        with shared_geometry(model.env, config):
+            state = pickle.dumps((model, config, outcome), protocol=pickle.HIGHEST_PROTOCOL)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_initialize, initargs=(state,)) as executor:
+                for result in executor.map(_batch, [names] * len(batches), batches, [seed] * len(batches)):
+                    outcomes.extend(result)
+                    save()
+    return np.array(outcomes)
+
+
+def _scale(unit: np.ndarray, bounds: List[Tuple[float, float]]) -> np.ndarray:
+    lower = np.array([low for low, _ in bounds])
+    upper = np.array([high for _, high in bounds])
+    return lower + unit * (upper - lower)
+
+
+def _interval(estimates: np.ndarray, confidence: float) -> Tuple[float, float]:
+    """Percentile interval of bootstrap estimates"""
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(estimates, [tail, 100 - tail])
+    return float(low), float(high)
+
+
+def sobol(model, config: dict, bounds: Dict[str, Tuple[float, float]], n: int = 256, seed: int = None,
+          bootstrap: int = 1000, confidence: float = 0.95, **kwargs) -> Dict[str, Dict]:
+    """
+    First order and total Sobol indices of the outcome, estimated from n x (P + 2) runs with the estimators of Saltelli
+    (first order) and Jansen (total), with bootstrap confidence intervals.
+
+    :param bounds: Lower and upper bound of the uniform distribution of every parameter, by name
+    :param seed: Seed of the sampling design and the bootstrap, and of the coughs unless given in kwargs
+    :param kwargs: Passed to evaluate, e.g. outcome, batch, workers and path
+    :return: Per parameter, a dictionary with the first order index S1 and total index ST, and their intervals S1_conf
+             and ST_conf
+    """
+    names = list(bounds)
+    p = len(names)
+    rng = np.random.default_rng(seed)
+    a, b = rng.random((n, p)), rng.random((n, p))
+    ab = np.repeat(a[np.newaxis], p, axis=0)
+    for j in range(p):
+        ab[j, :, j] = b[:, j]
+    unit = np.concatenate([a, b, ab.reshape(p * n, p)])
+    kwargs.setdefault('seed', seed)
+    outcomes = evaluate(model, config, names, _scale(unit, [bounds[name] for name in names]), **kwargs)
+    f_a, f_b, f_ab = outcomes[:n], outcomes[n:2 * n], outcomes[2 * n:].reshape(p, n)
+
+    def indices(rows):
+        variance = np.var(np.concatenate([f_a[rows], f_b[rows]]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            first = np.mean(f_b[rows] * (f_ab[:, rows] - f_a[rows]), axis=1) / variance
+            total = 0.5 * np.mean((f_a[rows] - f_ab[:, rows]) ** 2, axis=1) / variance
+        return first, total
+
+    first, total = indices(np.arange(n))
+    samples = [indices(rng.integers(0, n, n)) for _ in range(bootstrap)]
+    firsts = np.array([s[0] for s in samples])
+    totals = np.array([s[1] for s in samples])
+    return {name: {'S1': float(first[j]), 'S1_conf': _interval(firsts[:, j], confidence),
+                   'ST': float(total[j]), 'ST_conf': _interval(totals[:, j], confidence)}
+            for j, name in enumerate(names)}
+
+
+def morris(model, config: dict, bounds: Dict[str, Tuple[float, float]], trajectories: int = 20, levels: int = 4,
+           seed: int = None, bootstrap: int = 1000, confidence: float = 0.95, **kwargs) -> Dict[str, Dict]:
+    """
+    Elementary effects of Morris, from trajectories x (P + 1) runs. Every trajectory starts at a random point of a grid
+    of levels per parameter and changes the parameters one at a time, in random order, by half the range of the grid.
+    Effects are taken on the parameters scaled to [0, 1].
+
+    :param bounds: Lower and upper bound of every parameter, by name
+    :param levels: Number of levels of the grid, even
+    :param seed: Seed of the sampling design and the bootstrap, and of the coughs unless given in kwargs
+    :param kwargs: Passed to evaluate, e.g. outcome, batch, workers and path
+    :return: Per parameter, a dictionary with the mean effect mu, mean absolute effect mu_star with its bootstrap
+             interval mu_star_conf, and the standard deviation sigma of the effects
+    """
+    assert levels >= 2 and levels % 2 == 0, "Expected an even number of levels, got {}".format(levels)
+    names = list(bounds)
+    p = len(names)
+    rng = np.random.default_rng(seed)
+    jump = levels // 2
+    delta = jump / (levels - 1)
+
+    unit = np.zeros((trajectories, p + 1, p))
+    orders = np.zeros((trajectories, p), dtype=int)
+    steps = np.zeros((trajectories, p))
+    for t in range(trajectories):
+        level = rng.integers(0, levels, p)
+        unit[t, 0] = level / (levels - 1)
+        orders[t] = rng.permutation(p)
+        for i, j in enumerate(orders[t]):
+            sign = 1 if level[j] + jump <= levels - 1 else -1
+            level[j] += sign * jump
+            steps[t, i] = sign * delta
+            unit[t, i + 1] = level / (levels - 1)
+    kwargs.setdefault('seed', seed)
+    outcomes = evaluate(model, config, names, _scale(unit.reshape(-1, p), [bounds[name] for name in names]),
+                        **kwargs).reshape(trajectories, p + 1)
+
+    effects = np.zeros((trajectories, p))
+    for t in range(trajectories):
+        effects[t, orders[t]] = (outcomes[t, 1:] - outcomes[t, :-1]) / steps[t]
+    stars = np.array([np.abs(effects[rng.integers(0, trajectories, trajectories)]).mean(axis=0)
+                      for _ in range(bootstrap)])
+    return {name: {'mu': float(effects[:, j].mean()), 'mu_star': float(np.abs(effects[:, j]).mean()),
+                   'mu_star_conf': _interval(stars[:, j], confidence), 'sigma': float(effects[:, j].std(ddof=1))
+                   if trajectories > 1 else float('nan')}
+            for j, name in enumerate(names)}
@@ -0,0 +1,133 @@
+from array import array
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Tuple
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Compiled geometries of an Air in shared memory, so that the worker processes of a pool attach to one copy instead of
+# each unpickling their own.
+#
+# A segment holds the conductance grids of both layers as width x height bytes, column after column, followed by the
+# coordinates of the voids and the blocked edges of both layers as int64. A worker reads the conductance grids in place
+# through read-only memoryviews of the segment. Only the voids and edges, which are few compared to the cells, are
+# copied into lists.
+
+_GRIDS = ('aerosol_conductance', 'droplet_conductance')
+_COORDINATES = (('voids', 2), ('aerosol_barriers', 4), ('droplet_barriers', 4))
+
+# Segments attached by this process, by name. Kept open for the lifetime of the process, as the Air reads from them.
+_attached: Dict[str, SharedMemory] = {}
+
+
+class SharedCompiled(dict):
+    """Compiled geometry as returned by Air.compile, read from a shared memory segment. Pickled as the segment only."""
+
+    def __init__(self, name: str, layout: Tuple, compiled: dict):
+        super().__init__(compiled)
+        self.name = name
+        self.layout = layout
+
+    def __reduce__(self):
+        return attach, (self.name, self.layout)
+
+
+def _unpack(buffer: memoryview, name: str, layout: Tuple) -> SharedCompiled:
+    width, height, counts = layout
+    buffer = buffer.toreadonly()
+    compiled, offset = {}, 0
+    for grid in _GRIDS:
+        compiled[grid] = [buffer[offset + x * height:offset + (x + 1) * height] for x in range(width)]
+        offset += width * height
+    offset += -offset % 8
+    for (key, size), count in zip(_COORDINATES, counts):
+        values = array('q')
+        values.frombytes(buffer[offset:offset + count * size * values.itemsize])
+        compiled[key] = [tuple(values[i:i + size]) for i in range(0, len(values), size)]
+        offset += count * size * values.itemsize
+    return SharedCompiled(name, layout, compiled)
+
+
+def attach(name: str, layout: Tuple) -> SharedCompiled:
+    """The compiled geometry in the shared memory segment of the given name, without copying its grids"""
+    if name not in _attached:
+        _attached[name] = SharedMemory(name=name)
+    return _unpack(_attached[name].buf, name, layout)
+
+
+class SharedGeometry:
+    """A compiled geometry published to a shared memory segment that this process owns"""
+
+    def __init__(self, compiled: dict):
+        """
+        :param compiled: Result of Air.compile, copied into a new segment
+        """
+        grids = [compiled[grid] for grid in _GRIDS]
+        width, height = len(grids[0]), len(grids[0][0])
+        coordinates = [array('q', [c for item in compiled[key] for c in item]) for key, _ in _COORDINATES]
+        size = 2 * width * height
+        size += -size % 8 + sum(len(values) * values.itemsize for values in coordinates)
+
+        self.memory = SharedMemory(create=True, size=max(size, 1))
+        offset = 0
+        for grid in grids:
+            for column in grid:
+                self.memory.buf[offset:offset + height] = bytes(column)
+                offset += height
+        offset += -offset % 8
+        for values in coordinates:
+            data = values.tobytes()
+            self.memory.buf[offset:offset + len(data)] = data
+            offset += len(data)
+        counts = tuple(len(values) // length for values, (_, length) in zip(coordinates, _COORDINATES))
+        self.layout = (width, height, counts)
+        self.compiled = _unpack(self.memory.buf, self.memory.name, self.layout)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def close(self) -> None:
+        """Release the segment. Workers that are still attached keep their view of it until they exit."""
+        self.compiled = None
+        try:
+            self.memory.close()
+        except BufferError:  # Grids are still read by an Air of this process
+            pass
+        self.memory.unlink()
+
+
+@contextmanager
+def shared_geometry(env, config: dict):
+    """
+    Publish the compiled geometry of the Environment for the cell sizes of the config for the duration of the block.
+    Within the block, pickling the Environment pickles the name of the segment instead of the geometry, so that worker
+    processes that unpickle it attach to the segment. Afterwards the Environment has its own copy of the geometry again.
+    """
+    key = (config['env']['AirCellSize'], config['env']['MobilityCellSize'])
+    if key not in env._compiled:
+        env.set_config(config)
+    if env.air is not None:
+        env.air.close()  # Stops the workers of a DecomposedAir
+    env.air = None
+    compiled = env._compiled[key]
+    geometry = SharedGeometry(compiled)
+    env._compiled[key] = geometry.compiled
+    try:
+        yield geometry
+    finally:
+        env._compiled[key] = compiled
+        if env.air is not None:
+            env.air.close()
+        env.air = None
+        geometry.close()
@@ -0,0 +1,59 @@
+import hashlib
+import json
+import math
+import random
+from typing import List
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+
+def derive_seed(seed, *keys) -> int:
+    """
+    Seed of an independent random stream, derived from a seed and the keys that identify the stream, e.g. the name of
+    an Agent or the number of a replicate. The same seed and keys always give the same stream, regardless of the order
+    in which streams are derived or the process in which this happens.
+
+    :return: 64-bit seed for random.Random
+    """
+    data = json.dumps([seed] + list(keys)).encode('utf-8')
+    return int.from_bytes(hashlib.sha256(data).digest()[:8], 'little')
+
+
+def agent_seeds(seed, names: List[str]) -> List[int]:
+    """
+    Seeds of the random streams of Agents with the given names, derived from a seed, the name of each Agent and the
+    number of Agents before it with the same name. The stream of an Agent therefore does not depend on the order of the
+    Agents with other names, and Agents that share a name still have streams of their own.
+    """
+    seen = {}
+    seeds = []
+    for name in names:
+        seeds.append(derive_seed(seed, name, seen.get(name, 0)))
+        seen[name] = seen.get(name, 0) + 1
+    return seeds
+
+
+def draw_ticks_to_cough(rng: random.Random, p: float):
+    """
+    Number of ticks up to and including the next cough. An Agent coughs on each active tick with probability p, so the
+    ticks between coughs follow a geometric distribution and can be drawn at once by inversion instead of with a draw
+    on every tick.
+
+    :param p: Probability of a cough per tick, CoughingRate * SimulationTimeStep
+    :return: Number of ticks, math.inf if p is 0
+    """
+    if p >= 1:
+        return 1
+    if p <= 0:
+        return math.inf
+    return math.floor(math.log(1.0 - rng.random()) / math.log1p(-p)) + 1
@@ -0,0 +1,162 @@
+import random
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.batched import BatchedModel
+
+# Exposures that are kept per unit of viral load, in the order of the responses
+LAYERS = ('air', 'droplet', 'surface')
+
+
+class Superposition:
+    """
+    Exposures of all Agents per unit of viral load of each source, from one batched run.
+
+    Emission, diffusion, decay and pickup are linear in the viral loads, so once the response of every Agent to a unit
+    viral load of each source is known, the exposures for any viral loads of the sources are a weighted sum of the
+    responses. A source is an Agent or a group of Agents, such as all staff, that share one viral load.
+
+    Which Agents are infected changes more than their loads: only infected Agents cough, and they contaminate Fixtures
+    rather than pick up from them. By default each source is run as the only infected source, which is exact for
+    assignments of a single infected source (the index case studies) and exact for the air and droplet exposure of any
+    assignment. The surface exposure of several infected sources is then approximated, as the sources do not contaminate
+    the Fixtures that they touch in each other's runs. Given the infected Agents, all sources are run with those Agents
+    infected, which is exact for all exposures and any viral loads of those Agents.
+
+    The responses are taken relative to a baseline without any viral load, which carries the initial contamination.
+    Exposures are those over the whole run: the air and droplets picked up summed over the ticks that an Agent is
+    active, as infection_risk of the R package sums them, and the accumulated surface contamination. Needs numpy, as
+    the BatchedModel does.
+    """
+
+    def __init__(self, model, sources: Sequence = None, infected: Sequence[str] = None, seed: int = None):
+        """
+        :param model: Model of which to compute the responses
+        :param sources: Names of the Agents of each source, or a name per source. Defaults to every Agent on its own.
+        :param infected: Names of the infected Agents, to compute the exposures for these Agents only. All Agents of
+                         the sources must be infected.
+        :param seed: Seed of the coughs, defaults to the Seed in the config. Exposures are those of Model.run with this
+                     seed as Seed.
+        """
+        names = [agent.name for agent in model.agents]
+        if sources is None:
+            sources = names
+        self.model = model
+        self.sources = [[source] if isinstance(source, str) else list(source) for source in sources]
+        self.infected = None if infected is None else list(infected)
+        self.seed = seed
+
+        columns = {name: i for i, name in enumerate(names)}
+        unknown = [name for source in self.sources + [self.infected or []] for name in source if name not in columns]
+        if unknown:
+            raise KeyError('Unknown agents {}'.format(unknown))
+        if self.infected is not None:
+            healthy = [name for source in self.sources for name in source if name not in self.infected]
+            assert not healthy, "Sources {} are not infected".format(healthy)
+
+        # Channel 0 is the baseline, channel 1 + g carries a unit viral load for the Agents of source g
+        k = len(self.sources) + 1
+        self.viral_loads = np.zeros((k, len(names)))
+        for g, source in enumerate(self.sources):
+            self.viral_loads[g + 1, [columns[name] for name in source]] = 1.0
+        if self.infected is None:
+            self._infected = self.viral_loads > 0
+        else:
+            self._infected = np.zeros((k, len(names)), dtype=bool)
+            self._infected[:, [columns[name] for name in self.infected]] = True
+
+        # Set by run: the baseline exposures (A) and the exposures per unit viral load of each source (S x A) per layer
+        self.baseline = None
+        self.responses = None
+
+    def run(self, config) -> None:
+        """Compute the responses to all sources in one run of a BatchedModel"""
+        seed = self.seed
+        if seed is None:
+            seed = config['env'].get('Seed')
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+
+        k = len(self.sources) + 1
+        batched = BatchedModel(self.model, k, viral_loads=self.viral_loads, infected=self._infected, seeds=[seed] * k)
+        batched.run(config)
+        self.baseline, self.responses = {}, {}
+        for layer, loads in zip(LAYERS, (batched.air_totals, batched.droplet_totals, batched.surface_accumulation)):
+            self.baseline[layer] = loads[0].copy()
+            self.responses[layer] = loads[1:] - loads[0]
+
+    def exposures(self, viral_loads) -> Dict[str, np.ndarray]:
+        """
+        Exposures of all Agents for one or more assignments of viral loads to the sources.
+
+        :param viral_loads: M x S viral loads, a row per assignment and a column per source, or a single assignment of
+                            S viral loads
+        :return: The air, droplet and surface exposure per layer, as M x A arrays with a column per Agent in the order
+                 of model.agents (or A arrays for a single assignment)
+        """
+        assert self.responses is not None, "Call run first"
+        weights = np.asarray(viral_loads, dtype=float)
+        assert weights.shape[-1] == len(self.sources), \
+            "Expected {} viral loads per assignment, got {}".format(len(self.sources), weights.shape[-1])
+        return {layer: self.baseline[layer] + weights @ self.responses[layer] for layer in LAYERS}
+
+    def attribution(self, viral_loads) -> Dict[str, np.ndarray]:
+        """
+        Exposure of every Agent to every source, for one assignment of viral loads to the sources.
+
+        :param viral_loads: S viral loads, one per source
+        :return: The air, droplet and surface exposure per layer, as A x S arrays with a row per receiving Agent in the
+                 order of model.agents and a column per source. A row adds up to the exposure of the Agent, apart from
+                 the baseline.
+        """
+        assert self.responses is not None, "Call run first"
+        weights = np.asarray(viral_loads, dtype=float)
+        assert weights.shape == (len(self.sources),), \
+            "Expected {} viral loads, got {}".format(len(self.sources), weights.shape)
+        return {layer: (self.responses[layer] * weights[:, np.newaxis]).T for layer in LAYERS}
+
+    def index_cases(self, viral_load: float = 1) -> List[Dict]:
+        """
+        Exposures when each source in turn is the only infected one.
+
+        :return: For each source, a dictionary with its names and the air, droplet and surface exposure over the run per
+                 Agent name
+        """
+        names = [agent.name for agent in self.model.agents]
+        exposures = self.exposures(np.eye(len(self.sources)) * viral_load)
+        return [dict({'source': source}, **{layer: dict(zip(names, exposures[layer][g].tolist())) for layer in LAYERS})
+                for g, source in enumerate(self.sources)]
+
+
+def attribute_exposures(model, config, seed: int = None) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Who exposed whom: the exposure over the run of every Agent to each infected Agent, from one batched run with a
+    tracer channel per infected Agent, so that an Agent that left before the end keeps what it picked up. The infected
+    Agents are those with a positive viral load, all with their own viral load.
+
+    :param seed: Seed of the coughs, defaults to the Seed in the config
+    :return: The air, droplet and surface exposure per layer, as a dictionary of receiving Agent name to a dictionary
+             of infected Agent name to exposure
+    """
+    infected = [agent for agent in model.agents if agent.viral_load > 0]
+    names = [agent.name for agent in infected]
+    superposition = Superposition(model, sources=names, infected=names, seed=seed)
+    superposition.run(config)
+    matrices = superposition.attribution([agent.viral_load for agent in infected])
+    return {layer: {agent.name: dict(zip(names, matrices[layer][i].tolist())) for i, agent in enumerate(model.agents)}
+            for layer in LAYERS}
@@ -3,6 +3,7 @@ from .surface import Surface
 
 class Fixture(Surface):
     """A fixed surface in the environment"""
+    __slots__ = ('_touch_frequency',)
 
     def __init__(self, name, init_x, init_y, transfer_efficiency, surface_ratio,
                  touch_frequency, surface_decay_rate):
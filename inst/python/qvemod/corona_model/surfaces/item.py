@@ -3,6 +3,7 @@ from .surface import Surface
 
 class Item(Surface):
     """A movable surface"""
+    __slots__ = ()
 
     def serialize(self):
         return {
@@ -1,5 +1,8 @@
 class Surface:
     """Base Class for all Surfaces"""
+    __slots__ = ('name', 'init_x', 'init_y', 'contamination_load', '_transfer_efficiency', 'surface_decay_rate',
+                 '_surface_ratio', 'transfer_rate')
+
     def __init__(self, name, init_x, init_y, transfer_efficiency, surface_ratio, surface_decay_rate):
         self.name = name
         self.init_x = init_x
@@ -10,6 +13,10 @@ class Surface:
         self._surface_ratio = surface_ratio
         self.transfer_rate = transfer_efficiency * surface_ratio
 
+    def reset(self):
+        """Remove all contamination load"""
+        self.contamination_load = 0.0
+
     def __repr__(self):
         return '{name}({load})'.format(name=self.name, load=self.contamination_load)
 
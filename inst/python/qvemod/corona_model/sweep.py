@@ -0,0 +1,157 @@
+import csv
+import io
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from typing import Dict, List, Sequence
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.shared import shared_geometry
+
+# Parameters of the Environment that may be swept, next to the keys of config['env']. Not decay_rate_surface, which the
+# Surfaces do not read: they decay by their own surface_decay_rate.
+ENVIRONMENT_PARAMETERS = ('decay_rate_air', 'decay_rate_droplet', 'air_exchange_rate',
+                          'droplet_to_surface_transfer_rate')
+
+# Model and config of a worker process and the values of the Environment before any point, set once by _initialize
+_model = None
+_config = None
+_environment = None
+
+
+def _initialize(state: bytes):
+    global _model, _config, _environment
+    _model, _config = pickle.loads(state)
+    _environment = {name: getattr(_model.env, name) for name in ENVIRONMENT_PARAMETERS}
+
+
+def _point(number: int, point: Dict) -> List[List]:
+    """Run the Model of this process with the parameters of a point and return its rows of the table"""
+    config = deepcopy(_config)
+    for name, value in _environment.items():
+        setattr(_model.env, name, point.get(name, value))
+    for name, value in point.items():
+        if name not in ENVIRONMENT_PARAMETERS:
+            config['env'][name] = value
+    _model.run(config)
+    # A row per Agent rather than per name, so that every point has as many rows as the Model has Agents
+    return [[number, agent.name, agent.contamination_load_air, agent.contamination_load_droplet,
+             agent.contamination_load_surface_accumulation] for agent in _model.agents]
+
+
+def _completed(path: str, header: List[str], agents: int) -> set:
+    """
+    Numbers of the points of which all rows are in the table at path. Rows of points that were cut off by an
+    interruption, including a last row that was only partly written, are removed from the table.
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='') as f:
+        text = f.read()
+    partial = not text.endswith('\n')
+    if partial:
+        text = text[:text.rfind('\n') + 1]
+    reader = csv.reader(io.StringIO(text, newline=''))
+    found = next(reader, None)
+    if found is None:
+        found = header  # Even the header was cut off
+    if found != header:
+        raise ValueError('{} is the table of another sweep, with columns {}'.format(path, found))
+    rows = list(reader)
+    counts = {}
+    for row in rows:
+        if len(row) == len(header):
+            counts[row[0]] = counts.get(row[0], 0) + 1
+    completed = {number for number, count in counts.items() if count == agents}
+    if partial or len(completed) < len(counts) or any(len(row) != len(header) for row in rows):
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+        with open(temporary, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            writer.writerows(row for row in rows if len(row) == len(header) and row[0] in completed)
+        os.replace(temporary, path)
+    return {int(number) for number in completed}
+
+
+def run_sweep(model, config: dict, design: Sequence[Dict], path: str, workers: int = None) -> int:
+    """
+    Run the Model for every point of a parameter design in a pool of processes and write the exposures to one table.
+
+    A point is a dictionary of parameter values, by the name of an attribute of the Environment in
+    ENVIRONMENT_PARAMETERS or of a key of config['env'], such as Diffusivity or MaskAerosolProtectionEfficiency.
+    Parameters that a point leaves out keep the value of the Model and config. Every point runs with the same Seed, that
+    of the config or 0 without one, so that the differences between points are not hidden by differences in the
+    coughs.
+
+    The Model, with its Scripts, is pickled once and shipped to every worker when it starts, after which a point only
+    sends its parameters. The table at path has a row per point and Agent with the number of the point in the design,
+    its parameters, the Agent and its air, droplet and surface exposure. Rows are written as soon as a point is done.
+    If the table already exists, as after an interruption, the points that it contains are not run again.
+
+    :param workers: Number of processes, defaults to the number of cores. With 1 worker the points are run in this
+                    process.
+    :return: Number of points that were run, leaving out those already in the table
+    """
+    design = [dict(point) for point in design]
+    parameters = []
+    for point in design:
+        for name in point:
+            if name not in parameters:
+                parameters.append(name)
+    unknown = [name for name in parameters
+               if name not in ENVIRONMENT_PARAMETERS and name not in config['env'] and name != 'Seed']
+    if unknown:
+        raise KeyError('Unknown parameters {}'.format(unknown))
+
+    header = ['point'] + parameters + ['agent', 'air', 'droplet', 'surface']
+    completed = _completed(path, header, len(model.agents))
+    remaining = [number for number in range(len(design)) if number not in completed]
+    if not remaining:
+        return 0
+
+    config = deepcopy(config)
+    config['output']['Suppress'] = True
+    config['output']['CheckpointInterval'] = 0
+    if config['env'].get('Seed') is None:
+        config['env']['Seed'] = 0
+
+    model.reset()
+
+    new = not os.path.exists(path)
+    with open(path, 'a', newline='') as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(header)
+            f.flush()
+
+        def write(number, rows):
+            values = [design[number].get(name, '') for name in parameters]
+            writer.writerows([row[0]] + values + row[1:] for row in rows)
+            f.flush()
+
+        workers = os.cpu_count() if workers is None else workers
+        workers = max(1, min(workers, len(remaining)))
+        if workers == 1:
+            _initialize(pickle.dumps((model, config), protocol=pickle.HIGHEST_PROTOCOL))
+            for number in remaining:
+                write(number, _point(number, design[number]))
+        else:
+            with shared_geometry(model.env, config):
+                state = pickle.dumps((model, config), protocol=pickle.HIGHEST_PROTOCOL)
+                with ProcessPoolExecutor(max_workers=workers, initializer=_initialize, initargs=(state,)) as executor:
+                    futures = {executor.submit(_point, number, design[number]): number for number in remaining}
+                    for future in as_completed(futures):
+                        write(futures[future], future.result())
+    return len(remaining)
@@ -0,0 +1,121 @@
+import warnings
+from bisect import bisect_left
+from collections import namedtuple
+from typing import List
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.environment import Environment, IllegalAgentPosition
+from corona_model.script import Script
+
+# What to do with violations: raise InvalidScripts, clamp Moves to the nearest position within the Environment, or drop
+# the offending Moves. Enters can not be fixed and always raise.
+RAISE, CLAMP, DROP = 'raise', 'clamp', 'drop'
+
+# A position that an Agent is scripted to take but is not allowed to
+Violation = namedtuple('Violation', ['agent', 'tick', 'x', 'y', 'reason'])
+
+
+class InvalidScripts(IllegalAgentPosition):
+    """Raised with all Violations of the Scripts at once"""
+
+    def __init__(self, violations: List[Violation]):
+        self.violations = violations
+        shown = '\n'.join('  {} at tick {}: ({}, {}) is {}'.format(*v) for v in violations[:10])
+        more = '\n  and {} more'.format(len(violations) - 10) if len(violations) > 10 else ''
+        super().__init__('{} illegal agent positions:\n{}{}'.format(len(violations), shown, more))
+
+
+def validate_scripts(env: Environment, agents: List[Agent], fix: str = RAISE, ticks: int = None) -> List[Violation]:
+    """
+    Check the Scripts of all Agents against the Environment before running them. The absolute position of each Agent is
+    followed through its Enters and Moves, in the same way as the Environment does, and every position that is out of
+    bounds or in a void cell is reported at once. The rows are followed one by one, as fixing a Move changes all
+    positions after it.
+
+    When fixing, an Agent with violations is given a fixed copy of its Script to follow until its next reset, so that
+    its own Script stays as it was for later runs and for serialization. A Move that can not be fixed is removed, or
+    becomes a Face if it sets the facing of the Agent, and a warning is given.
+
+    :param env: Environment of which set_config has been called, as the void cells are defined by its Air
+    :param fix: RAISE, CLAMP or DROP
+    :param ticks: Number of ticks of the run. Only the actions from tick 0 up to this tick are checked, as the Model
+                  does not run the others. Defaults to all actions from tick 0.
+    :return: List of all Violations found, fixed or not
+    """
+    assert fix in (RAISE, CLAMP, DROP), "Unknown fix {}".format(fix)
+
+    def check(x, y):
+        if not 0 <= x < env.width or not 0 <= y < env.height:
+            return 'out of bounds'
+        if env.air.is_void(x, y):
+            return 'void'
+        return None
+
+    violations, unfixed = [], []
+    for agent in agents:
+        script = agent.script
+        times, codes, xs, ys = script.ticks, script.codes, script.x, script.y
+        x, y, active = 0, 0, False
+        fixed = None  # Copy of the Script with the fixes, made on the first one
+        dropped = set()  # Rows of the Moves to remove
+        end = len(times) if ticks is None else bisect_left(times, ticks)
+        for i in range(bisect_left(times, 0), end):
+            code = codes[i]
+            if code == Script.ENTER:
+                x, y, active = xs[i], ys[i], True
+                reason = check(x, y)
+                if reason is not None:
+                    violation = Violation(agent.name, times[i], x, y, reason)
+                    violations.append(violation)
+                    unfixed.append(violation)
+            elif not active:  # The Environment ignores all other actions of inactive Agents
+                continue
+            elif code == Script.MOVE:
+                new_x, new_y = x + xs[i], y + ys[i]
+                reason = check(new_x, new_y)
+                if reason is not None:
+                    violation = Violation(agent.name, times[i], new_x, new_y, reason)
+                    violations.append(violation)
+                    if fix == RAISE:
+                        unfixed.append(violation)
+                        x, y = new_x, new_y
+                        continue
+                    if fixed is None:
+                        fixed = script.copy()
+                    if fix == CLAMP:
+                        new_x = min(max(new_x, 0), env.width - 1)
+                        new_y = min(max(new_y, 0), env.height - 1)
+                    if fix == CLAMP and check(new_x, new_y) is None:
+                        fixed.x[i], fixed.y[i] = new_x - x, new_y - y
+                    else:  # Dropped, or clamped into a void cell: stay in place, but keep the facing of the Move
+                        new_x, new_y = x, y
+                        if script.facing[i] >= 0:
+                            fixed.codes[i], fixed.x[i], fixed.y[i] = Script.FACE, 0, 0
+                        else:
+                            dropped.add(i)
+                x, y = new_x, new_y
+            elif code == Script.LEAVE:
+                active = False
+        if fixed is not None:
+            if dropped:
+                fixed._take([i for i in range(len(times)) if i not in dropped])
+            agent.follow(fixed)
+
+    if unfixed:
+        raise InvalidScripts(unfixed)
+    if violations:
+        warnings.warn('{} illegal agent positions were fixed by {}'.format(len(violations), fix))
+    return violations
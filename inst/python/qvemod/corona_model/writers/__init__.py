@@ -1,4 +1,6 @@
 from .agent_exposure_writer import AgentExposureWriter
 from .aerosol_contamination_writer import AerosolContaminationWriter
 from .droplet_contamination_writer import DropletContaminationWriter
-from .surface_contamination_writer import SurfaceContaminationWriter
\ No newline at end of file
+from .surface_contamination_writer import SurfaceContaminationWriter
+from .contamination_summary_writer import ContaminationSummaryWriter
+from .binned_contamination_writer import BinnedAerosolContaminationWriter, BinnedDropletContaminationWriter
\ No newline at end of file
@@ -0,0 +1,136 @@
+import math
+from enum import Enum
+
+from .writer import Writer
+
+
+class BinnedContaminationWriter(Writer):
+    """
+    Writes a layer of the Air aggregated over time bins and, optionally, over square blocks of air cells.
+
+    The aggregation is computed incrementally: update is called every tick and the bin is written as soon as it is
+    full. A final, partial bin is written on close. Which layer is aggregated is determined by the LAYER prefix of
+    the subclass, which selects the configuration keys {LAYER}ContaminationBinInterval,
+    {LAYER}ContaminationBinStatistic, {LAYER}ContaminationBinBlockSize and {LAYER}ContaminationPrecision.
+    """
+
+    LAYER = str()
+
+    class Field(Enum):
+        START_TICK = "Start Tick"
+        END_TICK = "End Tick"
+        X = "X"
+        Y = "Y"
+        CONTAMINATION = "Contamination"
+
+    class Statistic(Enum):
+        MEAN = "mean"  # Mean over the ticks in the bin and the cells in the block
+        MAX = "max"  # Maximum over the ticks in the bin and the cells in the block
+        INTEGRAL = "integral"  # Time-integral of the block mean over the bin
+
+    @classmethod
+    def enabled(cls, config) -> bool:
+        return config['output'].get('{}ContaminationBinInterval'.format(cls.LAYER), 0) > 0
+
+    def __init__(self, config):
+        Writer.__init__(self, config)
+        output = config['output']
+        self.interval = int(output['{}ContaminationBinInterval'.format(self.LAYER)])
+        self.statistic = BinnedContaminationWriter.Statistic(
+            str(output.get('{}ContaminationBinStatistic'.format(self.LAYER), 'mean')))
+        self.block_size = int(output.get('{}ContaminationBinBlockSize'.format(self.LAYER), 1))
+        self.precision = output['{}ContaminationPrecision'.format(self.LAYER)]
+        assert self.interval > 0, "Bin interval must be a positive number of ticks"
+        assert self.block_size > 0, "Block size must be a positive number of cells"
+
+        self._start_tick = None
+        self._last_tick = None
+        self._ticks = 0
+        self._counts = None  # Number of non-void cells per block
+        self._sums = None
+        self._maxima = None
+
+    def _reset(self):
+        self._start_tick = None
+        self._ticks = 0
+        self._sums = [[0.0 for _ in column] for column in self._counts]
+        self._maxima = [[-math.inf for _ in column] for column in self._counts]
+
+    def update(self, tick: int, grid):
+        """
+        Adds the given layer (a FloatGrid of the Air, None for void cells) for this tick to the current bin.
+        """
+        k = self.block_size
+        if self._counts is None:  # First tick: derive the blocks from the grid
+            self._counts = [[0 for _ in range(math.ceil(len(grid[0]) / k))] for _ in range(math.ceil(len(grid) / k))]
+            for x, column in enumerate(grid):
+                for y, value in enumerate(column):
+                    if value is not None:
+                        self._counts[x // k][y // k] += 1
+            self._reset()
+        if self._start_tick is None:
+            self._start_tick = tick
+
+        for x, column in enumerate(grid):
+            sums = self._sums[x // k]
+            maxima = self._maxima[x // k]
+            for y, value in enumerate(column):
+                if value is None:
+                    continue
+                sums[y // k] += value
+                if value > maxima[y // k]:
+                    maxima[y // k] = value
+
+        self._last_tick = tick
+        self._ticks += 1
+        if self._ticks == self.interval:
+            self.flush()
+
+    def flush(self):
+        """Write the current bin and start a new one"""
+        if self._ticks == 0:
+            return
+        dt = self.config['env']['SimulationTimeStep']
+        for x, column in enumerate(self._counts):
+            for y, count in enumerate(column):
+                if count == 0:  # Block consists of void cells only
+                    continue
+                if self.statistic == BinnedContaminationWriter.Statistic.MEAN:
+                    contamination = self._sums[x][y] / (count * self._ticks)
+                elif self.statistic == BinnedContaminationWriter.Statistic.MAX:
+                    contamination = self._maxima[x][y]
+                elif self.statistic == BinnedContaminationWriter.Statistic.INTEGRAL:
+                    contamination = self._sums[x][y] / count * dt
+                else:
+                    raise ValueError
+                self.write(self._start_tick, self._last_tick, x, y, contamination)
+        self._reset()
+
+    def write(self, start_tick: int, end_tick: int, x: int, y: int, contamination: float):
+        contamination: str = "{:.{precision}f}".format(contamination, precision=self.precision)
+        self._writer.writerow(
+            {
+                BinnedContaminationWriter.Field.START_TICK.value: start_tick,
+                BinnedContaminationWriter.Field.END_TICK.value: end_tick,
+                BinnedContaminationWriter.Field.X.value: x,
+                BinnedContaminationWriter.Field.Y.value: y,
+                BinnedContaminationWriter.Field.CONTAMINATION.value: contamination
+            }
+        )
+
+    def close(self):
+        if self._counts is not None:
+            self.flush()
+        Writer.close(self)
+
+
+class BinnedAerosolContaminationWriter(BinnedContaminationWriter):
+
+    FILE_NAME = "aerosol_contamination_binned.csv"
+    LAYER = "Aerosol"
+
+
+class BinnedDropletContaminationWriter(BinnedContaminationWriter):
+
+    FILE_NAME = "droplet_contamination_binned.csv"
+    LAYER = "Droplet"
@@ -0,0 +1,36 @@
+from enum import Enum
+
+from .writer import Writer
+
+
+class ContaminationSummaryWriter(Writer):
+
+    FILE_NAME = "contamination_summary.csv"
+
+    class Field(Enum):
+        X = "X"
+        Y = "Y"
+        AEROSOL_INTEGRAL = "Integrated Contamination Aerosol"
+        DROPLET_INTEGRAL = "Integrated Contamination Droplet"
+        AEROSOL_MAXIMUM = "Maximum Contamination Aerosol"
+        DROPLET_MAXIMUM = "Maximum Contamination Droplet"
+
+    def write(self, x: int, y: int, aerosol_integral: float, droplet_integral: float,
+              aerosol_maximum: float, droplet_maximum: float):
+        def fmt(contamination, precision):
+            if contamination is None:  # Summary is not tracked
+                return ''
+            return "{:.{precision}f}".format(contamination, precision=precision)
+
+        aerosol_precision = self.config['output']['AerosolContaminationPrecision']
+        droplet_precision = self.config['output']['DropletContaminationPrecision']
+        self._writer.writerow(
+            {
+                ContaminationSummaryWriter.Field.X.value: x,
+                ContaminationSummaryWriter.Field.Y.value: y,
+                ContaminationSummaryWriter.Field.AEROSOL_INTEGRAL.value: fmt(aerosol_integral, aerosol_precision),
+                ContaminationSummaryWriter.Field.DROPLET_INTEGRAL.value: fmt(droplet_integral, droplet_precision),
+                ContaminationSummaryWriter.Field.AEROSOL_MAXIMUM.value: fmt(aerosol_maximum, aerosol_precision),
+                ContaminationSummaryWriter.Field.DROPLET_MAXIMUM.value: fmt(droplet_maximum, droplet_precision)
+            }
+        )
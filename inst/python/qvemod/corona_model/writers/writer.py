@@ -25,5 +25,36 @@ class Writer:
         self._writer = csv.DictWriter(self._file, fieldnames=self.__class__.fieldnames())
         self._writer.writeheader()
 
+    def __getstate__(self):
+        """State of the Writer for a checkpoint: the file is flushed and only the offset up to which it is written is kept"""
+        self._file.flush()
+        state = {k: v for k, v in self.__dict__.items() if k not in ('_file', '_writer')}
+        state['_offset'] = self._file.tell()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._file = None  # Reopened by restore
+        self._writer = None
+
+    def restore(self, source: str = None):
+        """
+        Reopen the file of an unpickled Writer, dropping everything that was written after the checkpoint.
+
+        :param source: Output path to copy the file up to the checkpoint from, when continuing in another output path
+        """
+        path = self.config['output']['Path']
+        file = os.path.join(path, self.__class__.FILE_NAME)
+        if source is not None and os.path.abspath(source) != os.path.abspath(path):
+            os.makedirs(path, exist_ok=True)
+            with open(os.path.join(source, self.__class__.FILE_NAME), 'rb') as f:
+                written = f.read(self._offset)
+            with open(file, 'wb') as f:
+                f.write(written)
+        self._file = open(file, 'r+', newline='')
+        self._file.seek(self._offset)
+        self._file.truncate()
+        self._writer = csv.DictWriter(self._file, fieldnames=self.__class__.fieldnames())
+
     def close(self):
         self._file.close()
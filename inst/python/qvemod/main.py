@@ -18,6 +18,7 @@ from corona_model.air import Void as Wall
 from corona_model.model import Model
 from corona_model.actions import *
 from corona_model.surfaces import Item, Fixture
+from corona_model.binary import is_binary
 
 
 def create_dummy_model(height=25, width=25, ticks=5, decay_rate_air=1.51, decay_rate_surface=0.262,decay_rate_droplet=0.3,
@@ -83,8 +84,11 @@ def main(model_fname, config_fname):
     with open(config_fname, 'r') as in_file:
         config = loads(in_file.read())
 
-    with open(model_fname, 'r') as in_file:
-        model = Model.deserialize(loads(in_file.read()))
+    if is_binary(model_fname):
+        model = Model.load(model_fname)
+    else:
+        with open(model_fname, 'r') as in_file:
+            model = Model.deserialize(loads(in_file.read()))
 
     model.run(config)
     print(model.air_exposure())
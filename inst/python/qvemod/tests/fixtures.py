@@ -0,0 +1,103 @@
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.environment import Environment
+from corona_model.air import Void
+from corona_model.model import Model
+from corona_model.actions import Enter, Leave, Move, Pickup, Putdown, Face, DonMask, DoffMask
+from corona_model.barriers import Wall, Shield
+from corona_model.surfaces import Item, Fixture
+
+# Models and configs shared by the tests of the parts of the model that run it as a whole
+
+
+CONFIG = {
+    "env": {
+        "AirCellSize": 50,
+        "MobilityCellSize": 10,
+        "AgentReach": 50,
+        "SimulationTimeStep": 0.00834,
+        "HandwashingContaminationFraction": 0.3,
+        "HandwashingEffectDuration": 0.5,
+        "MaskEmissionAerosolReductionEfficiency": 0.4,
+        "MaskEmissionDropletReductionEfficiency": 0.04,
+        "MaskAerosolProtectionEfficiency": 0.4,
+        "MaskDropletProtectionEfficiency": 0.04,
+        "CleaningInterval": 1,
+        "Diffusivity": 23,
+        "WallAbsorbingProportion": 0.0,
+        "CoughingRate": 60,
+        "CoughingFactor": 1000000,
+        "CoughingAerosolPercentage": 0.01,
+        "CoughingDropletPercentage": 0.99
+    },
+    "output": {
+        "Suppress": False,
+        "Path": "output",
+        "AerosolContaminationWriteInterval": 15,
+        "AerosolContaminationPrecision": 17,
+        "DropletContaminationWriteInterval": 15,
+        "DropletContaminationPrecision": 17,
+        "SurfaceContaminationWriteInterval": 15,
+        "SurfaceContaminationPrecision": 17
+    }
+}
+
+
+def config(output=None, **env):
+    """A copy of CONFIG with the given keys of config['env'] and those in output of config['output'] replaced"""
+    result = deepcopy(CONFIG)
+    result['env'].update(env)
+    result['output'].update(output or {})
+    return result
+
+
+# Config of the venue: output suppressed, as the BatchedModel does not write any
+VENUE_CONFIG = config(output={'Suppress': True}, CleaningInterval=0.1, WallAbsorbingProportion=0.3, CoughingRate=40)
+
+
+def build_venue(viral_loads=(1, 0, 2, 0), masks=(False, True, False, False)):
+    """
+    A venue with barriers, a void cell, an Item and two Fixtures, where four Agents take every action but Handwash
+    over 30 ticks
+    """
+    e = Environment(30, 30, 0.1, 0.2, 0.3, 0.1, 0.5, barriers=[Wall(0, 3, 2, 3), Shield(4, 0, 4, 3)],
+                    walls=[Void(5, 5)])
+    scripts = [
+        {0: Enter(12, 2, 'N'), 3: Pickup('cup'), 6: Move(1, 0), 9: Putdown('cup'), 14: Move(0, 1), 20: DoffMask()},
+        {0: Enter(14, 2, 'S'), 10: Move(-1, 0), 11: Pickup('cup'), 15: Leave(), 18: Enter(3, 3, 'E')},
+        {1: Enter(8, 8, 'W'), 5: Face('E'), 12: DonMask(), 25: Move(1, 1)},
+        {0: Enter(20, 20, 'S'), 4: Move(-1, 0, 'E')},
+    ]
+    agents = [Agent(name, viral_loads[i], 0, 0, 0, 1, 1, 1, 1, scripts[i], wearing_mask=masks[i])
+              for i, name in enumerate(['Anna', 'Bram', 'Cor', 'Dewi'])]
+    surfaces = [Item('cup', 12, 2, 0.5, 0.5, 0.1), Fixture('table', 13, 3, 0.5, 0.8, 15, 0.969),
+                Fixture('bar', 9, 8, 0.5, 0.4, 15, 0.9)]
+    return Model(30, e, agents, surfaces=surfaces)
+
+
+def build(environment=None, kees=(12, 2), saar=(12, 12), leave=15, others=()):
+    """
+    Kees, who is infected and moves twice, and Saar, who leaves at the given tick unless it is None, and any other
+    Agents, over 20 ticks. The Environment defaults to an open one of 25 x 25.
+    """
+    e = Environment(25, 25, 0.1, 0.1, 0.1, 0.1, 0.1) if environment is None else environment
+    a = Agent('Kees', 1, 0, 0, 0, 1, 1, 1, 1, {0: Enter(*kees, 'N'), 6: Move(1, 0), 14: Move(0, 1)})
+    script = {0: Enter(*saar, 'S')}
+    if leave is not None:
+        script[leave] = Leave()
+    b = Agent('Saar', 0, 0, 0, 0, 1, 1, 1, 1, script)
+    return Model(20, e, [a, b] + list(others))
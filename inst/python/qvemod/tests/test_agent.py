@@ -204,6 +204,24 @@ class TestAgent(unittest.TestCase):
         self.assertEqual(0, sum(sum(m.env.air._aerosols, [])))
         self.assertEqual(0, sum(sum(m.env.air._droplets, [])))
 
+    def test_cough_schedule(self):
+        # Coughs drawn ahead follow the same distribution as a coin flip with CoughingRate * SimulationTimeStep per tick
+        config = deepcopy(CONFIG)
+        config['env']['CoughingRate'] = 0.25 / config['env']['SimulationTimeStep']
+        config['env']['Seed'] = 11
+        a = Agent('Ted', 1, 0, 0, 0, 0, 0, 0, 0, {0: Enter(5, 5, 'N')})
+        a.set_config(config)
+        coughs = []
+        for tick in range(40000):
+            a.process_effects()
+            if a.queued_cough:
+                coughs.append(tick)
+                a.queued_cough = False
+        gaps = [t2 - t1 for t1, t2 in zip(coughs, coughs[1:])]
+        self.assertAlmostEqual(0.25, len(coughs) / 40000, delta=0.01)
+        self.assertAlmostEqual(0.25, gaps.count(1) / len(gaps), delta=0.02)
+        self.assertAlmostEqual(0.75 * 0.25, gaps.count(2) / len(gaps), delta=0.02)
+
 
 if __name__ == '__main__':
     unittest.main()
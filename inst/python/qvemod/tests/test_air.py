@@ -1,4 +1,5 @@
 import unittest
+from copy import deepcopy
 
 # Add the QVEmod package to the system path. Needed to import corona_model as 
 # a module
@@ -13,7 +14,7 @@ if not filename in sys.path:
     sys.path.append(filename)
 
 # Load the corona_model dependencies
-from corona_model.air import Air, Void
+from corona_model.air import Air, Void, Edge, get_edges
 from corona_model.facing import Facing
 from corona_model.emissionpatterns import initial_cough
 from corona_model.barriers import Shield
@@ -244,6 +245,55 @@ class TestAir(unittest.TestCase):
         self.assertEqual(0, air.get_droplet(55, 55))
         self.assertEqual(0, air.get_droplet(60, 50))
 
+    def test_accumulate_integral_and_maximum(self):
+        config = deepcopy(CONFIG)
+        config['output']['ContaminationIntegral'] = True
+        config['output']['ContaminationMaximum'] = True
+        air = Air(config, 25, 25, 0, 0, 0, voids=[Void(0, 0)])
+        air.add_aerosol(10, 10, 2.0)
+        air.accumulate()
+        air.subtract_aerosol(10, 10, 1.0)
+        air.accumulate()
+        dt = config['env']['SimulationTimeStep']
+        self.assertAlmostEqual(3.0 * dt, air.aerosol_integral[2][2])
+        self.assertEqual(2.0, air.aerosol_maximum[2][2])
+        self.assertEqual(0, air.droplet_integral[2][2])
+        self.assertIsNone(air.aerosol_integral[0][0])
+
+    def test_accumulate_disabled(self):
+        air = Air(CONFIG, 25, 25, 0, 0, 0)
+        air.add_aerosol(10, 10, 2.0)
+        air.accumulate()
+        self.assertIsNone(air.aerosol_integral)
+        self.assertIsNone(air.droplet_maximum)
+
+    def test_is_void(self):
+        air = Air(CONFIG, 25, 25, 0, 0, 0, voids=[Void(1, 2)])
+        self.assertTrue(air.is_void(5, 10))
+        self.assertFalse(air.is_void(10, 5))
+        self.assertFalse(air.is_void(500, 500))
+
+    def test_get_edges_diagonal(self):
+        edges = get_edges(2, 1, 7, 4)
+        self.assertEqual(5 + 3, len(edges))
+        self.assertEqual(len(edges), len(set(edges)))
+
+        # The staircase can not be crossed: flooding from one side of the line never reaches the other side
+        blocked = set(edges)
+        seen, todo = {(3, 0)}, [(3, 0)]
+        while todo:
+            x, y = todo.pop()
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if not (2 <= nx < 7 and 0 <= ny < 5) or (nx, ny) in seen:
+                    continue
+                if Edge(min(x, nx), min(y, ny), max(x, nx), max(y, ny)) in blocked:
+                    continue
+                seen.add((nx, ny))
+                todo.append((nx, ny))
+        self.assertIn((6, 0), seen)
+        self.assertNotIn((2, 4), seen)
+        self.assertNotIn((3, 3), seen)
+
 
 if __name__ == '__main__':
     unittest.main()
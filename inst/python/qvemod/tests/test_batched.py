@@ -0,0 +1,123 @@
+import threading
+import unittest
+import warnings
+from copy import deepcopy
+from unittest import mock
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.actions import Handwash
+from corona_model.batched import BatchedModel
+from corona_model.environment import Environment
+from tests.fixtures import VENUE_CONFIG, build_venue
+
+
+def grid(layer):
+    return [[0.0 if value is None else value for value in column] for column in layer]
+
+
+class TestBatched(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore')
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def test_replicates_match_model(self):
+        viral_loads = [(1, 0, 2, 0), (0, 3, 0, 0), (1, 1, 1, 1)]
+        masks = [(False, True, False, False), (True, True, True, True), (False, False, False, False)]
+        seeds = [4, 5, 6]
+        batched = BatchedModel(build_venue(), 3, viral_loads=viral_loads, wearing_masks=masks, seeds=seeds)
+        results = batched.run(VENUE_CONFIG)
+
+        config = deepcopy(VENUE_CONFIG)
+        for k in range(3):
+            config['env']['Seed'] = seeds[k]
+            m = build_venue(viral_loads[k], masks[k])
+            m.run(config)
+            self.assertEqual(seeds[k], results[k]['seed'])
+            self.assertEqual(m.air_exposure(), results[k]['air'])
+            self.assertEqual(m.droplet_exposure(), results[k]['droplet'])
+            self.assertEqual(m.surface_exposure(), results[k]['surface'])
+            self.assertEqual(grid(m.env.air._aerosols), batched.aerosols[k].tolist())
+            self.assertEqual(grid(m.env.air._droplets), batched.droplets[k].tolist())
+            self.assertEqual([s.contamination_load for s in m.surfaces], batched.surface_loads[k].tolist())
+
+    def test_parameters(self):
+        parameters = {'decay_rate_air': [0.1, 0.7], 'air_exchange_rate': [0.1, 3], 'Diffusivity': [23, 4],
+                      'WallAbsorbingProportion': [0.3, 0.9], 'MaskAerosolProtectionEfficiency': [0.4, 0.1],
+                      'CoughingRate': [40, 90], 'CoughingFactor': [1000000, 5000]}
+        batched = BatchedModel(build_venue(), 2, seeds=[4, 4], parameters=parameters)
+        results = batched.run(VENUE_CONFIG)
+
+        for k in range(2):
+            config = deepcopy(VENUE_CONFIG)
+            config['env']['Seed'] = 4
+            m = build_venue()
+            for name, values in parameters.items():
+                if hasattr(m.env, name):
+                    setattr(m.env, name, values[k])
+                else:
+                    config['env'][name] = values[k]
+            totals = {agent.name: 0.0 for agent in m.agents}
+
+            def callback(model, tick):
+                for agent in model.agents:
+                    if agent.is_active:
+                        totals[agent.name] += agent.contamination_load_air
+
+            m.run(config, callback=callback)
+            self.assertEqual(m.air_exposure(), results[k]['air'])
+            self.assertEqual(m.droplet_exposure(), results[k]['droplet'])
+            self.assertEqual(grid(m.env.air._aerosols), batched.aerosols[k].tolist())
+            self.assertEqual(list(totals.values()), batched.air_totals[k].tolist())
+        self.assertNotEqual(results[0]['air'], results[1]['air'])
+
+        with self.assertRaises(KeyError):
+            BatchedModel(build_venue(), 2, parameters={'SimulationTimeStep': [1, 2]})
+
+    def test_threads(self):
+        parameters = {'Diffusivity': [23, 4, 11], 'WallAbsorbingProportion': [0.3, 0.9, 0],
+                      'decay_rate_droplet': [1, 2, 3]}
+        expected = BatchedModel(build_venue(), 3, seeds=[4, 5, 6], parameters=parameters)
+        expected.run(VENUE_CONFIG)
+        for threads in (2, 3, 7):
+            config = deepcopy(VENUE_CONFIG)
+            config['env']['AirThreads'] = threads
+            batched = BatchedModel(build_venue(), 3, seeds=[4, 5, 6], parameters=parameters)
+            batched.run(config)
+            for name in ('aerosols', 'droplets', 'surface_loads', 'air_totals', 'droplet_totals', 'surface_totals'):
+                self.assertEqual(getattr(expected, name).tolist(), getattr(batched, name).tolist())
+        with self.assertWarns(UserWarning):
+            build_venue().run(config)  # A Model does not use the threads
+
+    def test_threads_stop_on_error(self):
+        config = deepcopy(VENUE_CONFIG)
+        config['env']['AirThreads'] = 3
+        threads = threading.active_count()
+        with mock.patch.object(Environment, '_leave', side_effect=RuntimeError('Bram can not leave')):
+            with self.assertRaises(RuntimeError):
+                BatchedModel(build_venue(), 2, seeds=[4, 5]).run(config)
+        self.assertEqual(threads, threading.active_count())
+
+    def test_handwash_not_supported(self):
+        m = build_venue()
+        m.agents[0].script[5] = Handwash()
+        with self.assertRaises(NotImplementedError):
+            BatchedModel(m, 2).run(VENUE_CONFIG)
+
+
+if __name__ == '__main__':
+    unittest.main()
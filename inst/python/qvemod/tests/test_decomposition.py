@@ -0,0 +1,91 @@
+import unittest
+import os
+import pickle
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.air import Air, Void
+from corona_model.barriers import Wall, Shield
+from corona_model.environment import Environment
+from corona_model.decomposition import DecomposedAir, tiles
+from tests.fixtures import config, build as build_pair
+
+
+CONFIG = config(output={'Suppress': True}, CoughingRate=121)
+
+# Air cells of 50 on a grid of 100 x 100 mobility cells: 20 x 20 Air cells, split at x = 10 and, for 4 processes, at
+# y = 10. The barriers and voids lie on and across these edges.
+BARRIERS = [Wall(10, 0, 10, 15), Shield(0, 10, 18, 10)]
+VOIDS = [Void(9, 4), Void(10, 4), Void(3, 10)]
+
+
+def build():
+    e = Environment(100, 100, 0.1, 0.1, 0.1, 0.1, 0.1, barriers=BARRIERS, walls=VOIDS)
+    return build_pair(e, kees=(48, 52), saar=(56, 44), leave=None)
+
+
+
+def contaminated(air):
+    for x, y in [(48, 52), (56, 44), (5, 95), (99, 0)]:
+        air.add_aerosol(x, y, 1000 + x)
+        air.add_droplet(x, y, 2000 + y)
+    return air
+
+
+class TestDecomposition(unittest.TestCase):
+
+    def test_tiles(self):
+        for width, height, processes in [(20, 20, 2), (20, 20, 4), (30, 7, 3), (7, 30, 6), (3, 3, 8)]:
+            cells = [(x, y) for x0, x1, y0, y1 in tiles(width, height, processes)
+                     for x in range(x0, x1) for y in range(y0, y1)]
+            self.assertEqual(sorted(cells), [(x, y) for x in range(width) for y in range(height)])
+        self.assertEqual([(0, 10, 0, 20), (10, 20, 0, 20)], tiles(20, 20, 2))
+        self.assertEqual(4, len({(x0, y0) for x0, _, y0, _ in tiles(20, 20, 4)}))
+
+    def test_same_as_air(self):
+        config = deepcopy(CONFIG)
+        config['env']['Seed'] = 5
+        m = build()
+        m.run(config)
+        expected = m.env.air._aerosols, m.env.air._droplets, m.air_exposure(), m.droplet_exposure()
+        for processes in (2, 3, 4):
+            config['env']['AirProcesses'] = processes
+            m = build()
+            m.run(config)
+            self.assertIsInstance(m.env.air, DecomposedAir)
+            self.assertEqual(expected, (m.env.air._aerosols, m.env.air._droplets, m.air_exposure(),
+                                        m.droplet_exposure()))
+
+    def test_barriers_and_pickle(self):
+        air = contaminated(Air(CONFIG, 100, 100, 0.1, 0.2, 0.3, barriers=BARRIERS, voids=VOIDS))
+        decomposed = contaminated(DecomposedAir(CONFIG, 100, 100, 0.1, 0.2, 0.3, barriers=BARRIERS, voids=VOIDS,
+                                                processes=4))
+        for step in range(3):
+            for a in (air, decomposed):
+                a.diffuse()
+                a.decay()
+            if step == 0:
+                for a in (air, decomposed):
+                    a.set_barriers(BARRIERS + [Shield(0, 5, 20, 5)])
+            if step == 1:
+                decomposed = pickle.loads(pickle.dumps(decomposed))
+            self.assertEqual(air._aerosols, [list(column) for column in decomposed._aerosols])
+            self.assertEqual(air._droplets, [list(column) for column in decomposed._droplets])
+            self.assertTrue(decomposed.is_void(45, 20))
+        decomposed.close()
+        self.assertEqual(air._aerosols, decomposed._aerosols)
+
+
+if __name__ == '__main__':
+    unittest.main()
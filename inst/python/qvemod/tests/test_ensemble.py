@@ -0,0 +1,46 @@
+import unittest
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.ensemble import run_ensemble
+from tests.fixtures import CONFIG, build
+
+
+class TestEnsemble(unittest.TestCase):
+
+    def test_matches_serial_runs(self):
+        seeds = [3, 1, 4, 1, 5]
+        expected = []
+        config = deepcopy(CONFIG)
+        config['output']['Suppress'] = True
+        for seed in seeds:
+            config['env']['Seed'] = seed
+            m = build()
+            m.run(config)
+            expected.append(m.air_exposure())
+
+        results = run_ensemble(build(), CONFIG, 5, seeds=seeds, workers=2)
+        self.assertEqual(seeds, [result['seed'] for result in results])
+        self.assertEqual(expected, [result['air'] for result in results])
+        self.assertEqual(results, run_ensemble(build(), CONFIG, 5, seeds=seeds, workers=1))
+        self.assertFalse(CONFIG['output']['Suppress'])
+
+    def test_replicates_differ(self):
+        results = run_ensemble(build(), CONFIG, 4, workers=1)
+        self.assertEqual(4, len({result['air']['Saar'] for result in results}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import pickle
+import tempfile
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.air import Air, Void
+from corona_model.barriers import Wall, Shield
+from corona_model.geometry_cache import GeometryCache
+from tests.fixtures import config
+
+
+CONFIG = config(CoughingRate=0)
+
+
+class TestGeometryCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = deepcopy(CONFIG)
+        self.config['env']['GeometryCachePath'] = self.directory.name
+        self.barriers = [Wall(5, 0, 5, 10), Shield(0, 3, 4, 6)]
+        self.voids = [Void(8, 8), Void(9, 8)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def entries(self):
+        return [f for f in os.listdir(self.directory.name) if f.endswith(GeometryCache.SUFFIX)]
+
+    def test_from_config(self):
+        self.assertIsNone(GeometryCache.from_config(CONFIG))
+        self.assertEqual(self.directory.name, GeometryCache.from_config(self.config).path)
+
+    def test_key_ignores_order(self):
+        key = GeometryCache.key(20, 20, self.config, self.barriers, self.voids)
+        self.assertEqual(key, GeometryCache.key(20, 20, self.config, self.barriers[::-1], self.voids[::-1]))
+        self.assertNotEqual(key, GeometryCache.key(20, 20, self.config, self.barriers[:1], self.voids))
+        self.assertNotEqual(key, GeometryCache.key(20, 21, self.config, self.barriers, self.voids))
+
+    def test_air_uses_cache(self):
+        air = Air(self.config, 100, 100, 0, 0, 0, barriers=self.barriers, voids=self.voids)
+        self.assertEqual(1, len(self.entries()))
+        cached = Air(self.config, 100, 100, 0, 0, 0, barriers=self.barriers, voids=self.voids)
+        self.assertEqual(1, len(self.entries()))
+        uncached = Air(CONFIG, 100, 100, 0, 0, 0, barriers=self.barriers, voids=self.voids)
+        for other in (cached, uncached):
+            self.assertEqual(air._aerosols, other._aerosols)
+            self.assertEqual(air._droplet_barriers, other._droplet_barriers)
+            self.assertEqual(air._aerosol_conductance, other._aerosol_conductance)
+
+    def test_version_mismatch_is_ignored(self):
+        cache = GeometryCache(self.directory.name)
+        cache.store('key', {'voids': []})
+        self.assertEqual([], cache.load('key')['voids'])
+        with open(os.path.join(self.directory.name, 'key' + GeometryCache.SUFFIX), 'wb') as f:
+            pickle.dump({'version': GeometryCache.VERSION - 1, 'voids': []}, f)
+        self.assertIsNone(cache.load('key'))
+        self.assertIsNone(cache.load('missing'))
+
+    def test_eviction(self):
+        cache = GeometryCache(self.directory.name, max_size=2500)
+        for i in range(5):
+            cache.store(str(i), {'data': bytes(1000)})
+            os.utime(os.path.join(self.directory.name, str(i) + GeometryCache.SUFFIX), (i, i))
+        cache.evict()
+        self.assertEqual(['3' + GeometryCache.SUFFIX, '4' + GeometryCache.SUFFIX], sorted(self.entries()))
+
+
+if __name__ == '__main__':
+    unittest.main()
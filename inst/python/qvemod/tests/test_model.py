@@ -1,5 +1,7 @@
 import unittest
 import os
+import random
+import tempfile
 from copy import deepcopy
 
 # Add the QVEmod package to the system path. Needed to import corona_model as 
@@ -19,8 +21,10 @@ from corona_model.agent import Agent
 from corona_model.environment import Environment
 from corona_model.air import Void
 from corona_model.model import Model
-from corona_model.actions import Enter, Leave
+from corona_model.actions import Enter, Leave, Move, Pickup, Putdown, Face
 from corona_model.barriers import Wall, Shield
+from corona_model.surfaces import Item, Fixture
+from corona_model.binary import BinaryFormatError, is_binary
 
 
 CONFIG = {
@@ -73,6 +77,36 @@ class TestModel(unittest.TestCase):
         sfrommfroms = mfroms.serialize()
         self.assertEqual(s, sfrommfroms)
 
+    def test_binary_serialization(self):
+        e = Environment(25, 25, 0.1, 0.2, 0.3, 0.4, 0.5,
+                        barriers=[Wall(2, 2, 2, 3), Shield(1, 1, 1, 2)],
+                        walls=[Void(4, 4)])
+        a = Agent('James Bond', 1, 1, 1, 0, 1, 1, 0, 0,
+                  {0: Enter(0, 0, 'N'), 1: Pickup('Menu'), 2: Move(1, 0, facing='E'), 3: Putdown('Menu')})
+        b = Agent('Q', 0, 0.5, 0, 0, 1, 1, 2.3, 2.3,
+                  {1: Enter(3, 3, 'S'), 2: Pickup('Fork'), 3: Face('W'), 4: Pickup('Menu'), 6: Leave()},
+                  wearing_mask=True)
+        m = Model(7, e, [a, b], surfaces=[Item('Menu', 1, 3, 0.7, 0.2, 0.274), Item('Fork', 1, 2, 0.3, 0.05, 0.2),
+                                          Fixture('Table', 1, 1, 0.5, 0.8, 15, 0.969)], name='Casino')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.bin')
+            m.save(path)
+            self.assertTrue(is_binary(path))
+            loaded = Model.load(path)
+            s, sfromloaded = m.serialize(), loaded.serialize()
+            for agent in s['agents'] + sfromloaded['agents']:
+                del agent['script']  # The targets of the Scripts are numbered differently
+            self.assertEqual(s, sfromloaded)
+            for agent, fromloaded in zip(m.agents, loaded.agents):
+                self.assertEqual([(t, a.serialize()) for t, a in agent.script.items()],
+                                 [(t, a.serialize()) for t, a in fromloaded.script.items()])
+
+            path = os.path.join(directory, 'model.json')
+            with open(path, 'w') as f:
+                f.write('{}')
+            self.assertFalse(is_binary(path))
+            self.assertRaises(BinaryFormatError, Model.load, path)
+
     def test_mask_emission(self):
         env1 = Environment(25, 25, 0, 0, 0, 0, 0)
         env2 = Environment(25, 25, 0, 0, 0, 0, 0)
@@ -155,6 +189,125 @@ class TestModel(unittest.TestCase):
         m = Model(10, e, [a])
         m.run(CONFIG, callback=checker)
 
+    def test_contamination_summary(self):
+        config = deepcopy(CONFIG)
+        config['output']['ContaminationIntegral'] = True
+        config['output']['ContaminationMaximum'] = True
+        e = Environment(25, 25, 0.1, 0.1, 0, 0.1, 0)
+        a = Agent('Oscar', 1, 1, 1, 0, 1, 1, 0, 0, {0: Enter(15, 2, 'N')})
+        integral = [0.0]
+        maximum = [0.0]
+
+        def tracker(model, tick):
+            integral[0] += model.env.air._get_aerosol(3, 0) * config['env']['SimulationTimeStep']
+            maximum[0] = max(maximum[0], model.env.air._get_aerosol(3, 0))
+        m = Model(15, e, [a])
+        m.run(config, callback=tracker)
+        self.assertAlmostEqual(integral[0], m.aerosol_integral()[3][0])
+        self.assertEqual(maximum[0], m.aerosol_maximum()[3][0])
+
+    def test_rerun(self):
+        e = Environment(25, 25, 0.1, 0.1, 0, 0.1, 0, walls=[Void(4, 4)])
+        a = Agent('Rita', 1, 0, 0, 0, 1, 1, 1, 1, {0: Enter(12, 2, 'N'), 1: Pickup('cup'), 4: Move(1, 0),
+                                                   6: Putdown('cup'), 9: Leave()}, wearing_mask=True)
+        b = Agent('Ruud', 0, 0, 0, 0, 1, 1, 1, 1, {0: Enter(14, 2, 'S'), 8: Pickup('cup')})
+        cup = Item('cup', 12, 2, 0.5, 0.5, 0.1)
+        m = Model(10, e, [a, b], surfaces=[cup])
+
+        def state():
+            return (deepcopy(e.air._aerosols), a.contamination_load_air, b.contamination_load_air,
+                    b.contamination_load_surface_accumulation, cup.contamination_load, b.facing, len(b.held))
+        m.run(CONFIG)
+        first, routines = state(), len(m.termination_routines)
+        m.run(CONFIG)
+        self.assertEqual(first, state())
+        self.assertEqual(1, sum(len(cell) for row in e.surfaces for cell in row))
+        self.assertEqual(routines, len(m.termination_routines))
+        self.assertTrue(a.under_effect('wearing_mask'))
+        self.assertIs(e.air.compiled, e._compiled[(CONFIG['env']['AirCellSize'], CONFIG['env']['MobilityCellSize'])])
+
+    def test_checkpoint_resume(self):
+        def build():
+            e = Environment(25, 25, 0.1, 0.1, 0.1, 0.1, 0.1, walls=[Void(4, 4)])
+            a = Agent('Kees', 1, 0, 0, 0, 1, 1, 1, 1, {0: Enter(12, 2, 'N'), 3: Pickup('cup'), 6: Move(1, 0),
+                                                       9: Putdown('cup'), 14: Move(0, 1)})
+            b = Agent('Saar', 0, 0, 0, 0, 1, 1, 1, 1, {0: Enter(14, 2, 'S'), 15: Leave()})
+            return Model(20, e, [a, b], surfaces=[Item('cup', 12, 2, 0.5, 0.5, 0.1)])
+
+        def outputs(path):
+            files = {}
+            for name in sorted(os.listdir(path)):
+                if name.endswith('.csv'):
+                    with open(os.path.join(path, name)) as f:
+                        files[name] = f.read()
+            return files
+
+        class Killed(Exception):
+            pass
+
+        def kill(model, tick):
+            if tick == 12:
+                raise Killed()
+
+        with tempfile.TemporaryDirectory() as directory:
+            config = deepcopy(COUGH_CONFIG)
+            config['env']['SurfaceExposureRatio'] = 0.1
+            config['env']['CoughingRate'] = 60  # Coughs on about half of the ticks
+            config['output'].update({'Suppress': False, 'ContaminationIntegral': True, 'AerosolContaminationWriteInterval': 3,
+                                     'AerosolContaminationBinInterval': 4})
+            config['output']['Path'] = os.path.join(directory, 'uninterrupted')
+            random.seed(3)
+            m = build()
+            m.run(config)
+            expected = outputs(config['output']['Path']), m.air_exposure(), m.surface_exposure()
+
+            config['output']['Path'] = os.path.join(directory, 'resumed')
+            config['output']['CheckpointInterval'] = 5
+            random.seed(3)
+            with self.assertRaises(Killed):
+                build().run(config, callback=kill)
+            m = Model.resume(os.path.join(config['output']['Path'], 'checkpoint.pickle'))
+            self.assertEqual(expected, (outputs(config['output']['Path']), m.air_exposure(), m.surface_exposure()))
+
+    def test_seeded_streams(self):
+        config = deepcopy(CONFIG)
+        config['env'].update({'CoughingRate': 60, 'Diffusivity': 0, 'Seed': 7})
+
+        def aerosols(order, seed):
+            # Without diffusion and decay, each cell only holds the coughs of the Agent in it
+            config['env']['Seed'] = seed
+            e = Environment(25, 25, 0, 0, 0, 0, 0)
+            agents = {name: Agent(name, 1, 0, 0, 0, 1, 1, 0, 0, {0: Enter(x, 2, 'N')})
+                      for name, x in (('Ada', 2), ('Bob', 12), ('Cas', 22))}
+            Model(20, e, [agents[name] for name in order]).run(config)
+            return e.air._aerosols
+
+        random.seed(1)
+        expected = aerosols(['Ada', 'Bob', 'Cas'], 7)
+        random.seed(2)
+        self.assertEqual(expected, aerosols(['Cas', 'Ada', 'Bob'], 7))
+        self.assertNotEqual(expected, aerosols(['Ada', 'Bob', 'Cas'], 8))
+
+    def test_streams_of_agents(self):
+        config = deepcopy(CONFIG)
+        config['env'].update({'CoughingRate': 60, 'Diffusivity': 0})
+
+        def aerosols(names, x=(2, 12, 22)):
+            e = Environment(25, 25, 0, 0, 0, 0, 0)
+            agents = [Agent(name, 1, 0, 0, 0, 1, 1, 0, 0, {0: Enter(x, 2, 'N')}) for name, x in zip(names, x)]
+            Model(20, e, agents).run(config)
+            return [e.air._aerosols[x][0] for x in (0, 2, 4)]  # The air cells of the Agents
+
+        # Agents that share a name cough independently
+        coughs = aerosols(['Ada', 'Ada', 'Ada'])
+        self.assertEqual(3, len(set(coughs)))
+
+        # Without a Seed, the streams are derived from one seed per run, so they do not depend on the order either
+        random.seed(4)
+        expected = aerosols(['Ada', 'Bob', 'Cas'])
+        random.seed(4)
+        self.assertEqual(expected, aerosols(['Cas', 'Bob', 'Ada'], x=(22, 12, 2)))
+
     def test_agent_no_script(self):
         e = Environment(25, 25, 0, 0, 0, 0, 0)
         script = {}
@@ -0,0 +1,74 @@
+import unittest
+import random
+import tempfile
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.barriers import Shield
+from tests.fixtures import config, build
+
+
+CONFIG = config(output={'AerosolContaminationWriteInterval': 3, 'DropletContaminationWriteInterval': 3,
+                        'SurfaceContaminationWriteInterval': 3}, SurfaceExposureRatio=0.1)
+
+
+def outputs(path):
+    files = {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name)) as f:
+            files[name] = f.read()
+    return files
+
+
+class TestScenarios(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = dict(CONFIG, output=dict(CONFIG['output'], Path=os.path.join(self.directory.name, 'base')))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_fork_equals_run(self):
+        random.seed(5)
+        m = build()
+        m.run(dict(self.config, output=dict(self.config['output'], Path=self.path('run'))))
+
+        random.seed(5)
+        snapshot = build().snapshot(self.config, 8)
+        self.assertEqual(8, snapshot.tick)
+        fork = snapshot.fork(path=self.path('fork'))
+        self.assertEqual(m.air_exposure(), fork.air_exposure())
+        self.assertEqual(outputs(self.path('run')), outputs(self.path('fork')))
+
+    def test_forks_are_independent(self):
+        random.seed(5)
+        snapshot = build().snapshot(self.config, 8)
+        plain = snapshot.fork(path=self.path('plain'))
+        masked = snapshot.fork(lambda model, config: [agent.don_mask() for agent in model.agents],
+                               path=self.path('masked'))
+        shielded = snapshot.fork(lambda model, config: model.env.set_barriers([Shield(0, 1, 5, 1)]),
+                                 path=self.path('shielded'))
+        again = snapshot.fork(path=self.path('again'))
+        self.assertLess(masked.air_exposure()['Saar'], plain.air_exposure()['Saar'])
+        self.assertNotEqual(plain.env.air._droplets, shielded.env.air._droplets)
+        self.assertEqual(plain.air_exposure(), again.air_exposure())
+        self.assertEqual(outputs(self.path('plain')), outputs(self.path('again')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.script import Script
+from corona_model.actions import *
+
+
+class TestScript(unittest.TestCase):
+
+    def test_mapping(self):
+        actions = {
+            5: Leave(),
+            0: Enter(2, 3, 'S'),
+            1: Move(1, -1),
+            2: Move(0, 1, 'W'),
+            3: Pickup('Menu'),
+            4: Face('E'),
+        }
+        script = Script(actions)
+        self.assertEqual([0, 1, 2, 3, 4, 5], script.keys())
+        self.assertEqual(6, len(script))
+        self.assertIn(3, script)
+        self.assertNotIn(6, script)
+        self.assertEqual({k: a.serialize() for k, a in actions.items()},
+                         {k: a.serialize() for k, a in script.items()})
+        self.assertIsNone(script.get(6))
+        self.assertRaises(KeyError, lambda: script[6])
+
+    def test_set_and_delete(self):
+        script = Script({0: Enter(0, 0), 4: Leave()})
+        script[2] = Putdown('Fork')
+        script[0] = Enter(1, 1, 'E')
+        self.assertEqual([0, 2, 4], script.keys())
+        self.assertEqual('Fork', script[2].target)
+        self.assertEqual((1, 1, 'E'), (script[0].x, script[0].y, script[0].facing))
+        del script[2]
+        self.assertEqual([0, 4], script.keys())
+
+    def test_from_arrays_keeps_last_of_tick(self):
+        script = Script.from_arrays([0, 2, 1, 2], [Script.ENTER, Script.MOVE, Script.MOVE, Script.LEAVE],
+                                    [1, 1, 0, 0], [1, 0, 1, 0], [0, -1, -1, -1], [-1, -1, -1, -1], [])
+        self.assertEqual([0, 1, 2], script.keys())
+        self.assertEqual('leave', script[2].type)
+        self.assertEqual((0, 1), (script[1].x, script[1].y))
+
+    def test_serialization_shared_targets(self):
+        targets = ['Menu', 'Fork', 'Plate']
+        script = Script.from_arrays([0, 1], [Script.ENTER, Script.PICKUP], [1, 0], [1, 0], [0, -1], [-1, 2], targets)
+        s = script.serialize()
+        self.assertEqual(['Plate'], s['targets'])
+        self.assertEqual('Plate', Script.deserialize(s)[1].target)
+
+    def test_agent_legacy_deserialization(self):
+        serial = {
+            'name': 'James Bond', 'viral_load': 1, 'contamination_load_air': 1, 'contamination_load_droplet': 1,
+            'contamination_load_surface': 0, 'emission_rate_air': 1, 'emission_rate_droplet': 1, 'pick_up_air': 0,
+            'pick_up_droplet': 0, 'is_active': False, 'wearing_mask': False,
+            'script': {'0': {'type': 'enter', 'x': 0, 'y': 0, 'facing': 'N'}, '1': {'type': 'move', 'x': 1, 'y': 0}}
+        }
+        a = Agent.deserialize(serial)
+        self.assertIsInstance(a.script, Script)
+        self.assertEqual([0, 1], a.script.keys())
+        self.assertEqual('move', a.script[1].type)
+
+    def test_flyweights(self):
+        script = Script({0: Enter(0, 0, 'N'), 1: Face('E'), 2: Face('E'), 3: Handwash(), 4: Leave()})
+        self.assertIs(script[1], script[2])
+        self.assertEqual('E', script[1].direction)
+        self.assertIs(script[3], Script.intern(Handwash()))
+        self.assertIs(script[4], Script.intern(Leave()))
+        self.assertIs(script[1], Script.intern(Face('E')))
+        move = Move(1, 0)
+        self.assertIs(move, Script.intern(move))
+
+
+if __name__ == '__main__':
+    unittest.main()
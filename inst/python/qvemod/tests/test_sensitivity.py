@@ -0,0 +1,99 @@
+import pickle
+import tempfile
+import unittest
+
+import numpy as np
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.actions import Enter, Move
+from corona_model.batched import BatchedModel
+from corona_model.sensitivity import evaluate, infection_risk, sobol, morris
+from tests.fixtures import CONFIG, build as build_pair
+
+
+BOUNDS = {'decay_rate_air': (0.1, 2), 'Diffusivity': (2, 30), 'MaskAerosolProtectionEfficiency': (0.1, 0.9)}
+
+# Number of BatchedModels run by counting
+runs = 0
+
+
+def counting(batched):
+    global runs
+    runs += 1
+    return infection_risk(batched)
+
+
+def build():
+    return build_pair(saar=(13, 4), 
+                      others=[Agent('Tim', 0, 0, 0, 0, 1, 1, 1, 1, {3: Enter(10, 3, 'S'), 9: Move(1, 0)})])
+
+
+class TestSensitivity(unittest.TestCase):
+
+    def test_evaluate(self):
+        values = np.array([[0.1, 23], [1.5, 23], [0.1, 3], [0.7, 9], [2, 2]])
+        outcomes = evaluate(build(), CONFIG, ['decay_rate_air', 'Diffusivity'], values, seed=3, batch=2)
+        batched = BatchedModel(build(), 5, seeds=[3] * 5,
+                               parameters={'decay_rate_air': values[:, 0], 'Diffusivity': values[:, 1]})
+        batched.run(CONFIG)
+        self.assertEqual(infection_risk(batched).tolist(), outcomes.tolist())
+        self.assertEqual(5, len(set(outcomes.tolist())))
+        self.assertEqual(outcomes.tolist(), evaluate(build(), CONFIG, ['decay_rate_air', 'Diffusivity'], values,
+                                                     seed=3, batch=2, workers=2).tolist())
+        with self.assertRaises(KeyError):
+            evaluate(build(), CONFIG, ['SimulationTimeStep'], values[:, :1])
+
+    def test_checkpoint(self):
+        global runs
+        values = np.linspace([0.1, 2], [2, 30], 7)
+        names = ['decay_rate_air', 'Diffusivity']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sensitivity.pickle')
+            outcomes = evaluate(build(), CONFIG, names, values, batch=3, path=path)
+
+            # Interrupted after the first batch
+            with open(path, 'rb') as f:
+                checkpoint = pickle.load(f)
+            checkpoint['outcomes'] = checkpoint['outcomes'][:3]
+            with open(path, 'wb') as f:
+                pickle.dump(checkpoint, f)
+            runs = 0
+            self.assertEqual(outcomes.tolist(),
+                             evaluate(build(), CONFIG, names, values, batch=3, path=path, outcome=counting).tolist())
+            self.assertEqual(2, runs)
+            with self.assertRaises(ValueError):
+                evaluate(build(), CONFIG, names, values[1:], batch=3, path=path)
+
+    def test_sobol(self):
+        indices = sobol(build(), CONFIG, BOUNDS, n=16, seed=1, bootstrap=50)
+        self.assertEqual(list(BOUNDS), list(indices))
+        # Nobody wears a mask
+        self.assertEqual(0, indices['MaskAerosolProtectionEfficiency']['S1'])
+        self.assertEqual(0, indices['MaskAerosolProtectionEfficiency']['ST'])
+        self.assertGreater(indices['decay_rate_air']['ST'], 0)
+        low, high = indices['decay_rate_air']['ST_conf']
+        self.assertLessEqual(low, high)
+
+    def test_morris(self):
+        effects = morris(build(), CONFIG, BOUNDS, trajectories=6, seed=1, bootstrap=50)
+        self.assertEqual(0, effects['MaskAerosolProtectionEfficiency']['mu_star'])
+        self.assertGreater(effects['decay_rate_air']['mu_star'], 0)
+        self.assertLess(effects['decay_rate_air']['mu'], 0)  # Faster decay, less risk
+        self.assertGreater(effects['Diffusivity']['mu_star'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import os
+import pickle
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.air import Air, Void
+from corona_model.barriers import Wall, Shield
+from corona_model.environment import Environment
+from corona_model.shared import SharedGeometry, shared_geometry
+from tests.fixtures import config, build as build_pair
+
+
+CONFIG = config(output={'Suppress': True}, CoughingRate=121)
+
+
+def build():
+    e = Environment(100, 100, 0.1, 0.1, 0.1, 0.1, 0.1, barriers=[Wall(5, 0, 5, 10), Shield(0, 3, 4, 6)],
+                    walls=[Void(8, 8), Void(9, 8)])
+    return build_pair(e, saar=(20, 12), leave=None)
+
+
+class TestShared(unittest.TestCase):
+
+    def test_round_trip(self):
+        compiled = Air.compile(20, 20, [Wall(5, 0, 5, 10), Shield(0, 3, 4, 6)], [Void(8, 8), Void(9, 8)])
+        geometry = SharedGeometry(compiled)
+        try:
+            shared = geometry.compiled
+            for key in ('voids', 'aerosol_barriers', 'droplet_barriers'):
+                self.assertEqual(compiled[key], shared[key])
+            for key in ('aerosol_conductance', 'droplet_conductance'):
+                self.assertEqual(compiled[key], [bytes(column) for column in shared[key]])
+            with self.assertRaises(TypeError):
+                shared['aerosol_conductance'][0][0] = 0
+
+            # Pickled as the name of the segment, and attached to when unpickled
+            state = pickle.dumps(shared)
+            self.assertLess(len(state), 200)
+            attached = pickle.loads(state)
+            self.assertEqual(compiled['droplet_conductance'],
+                             [bytes(column) for column in attached['droplet_conductance']])
+            del shared, attached
+        finally:
+            geometry.close()
+
+    def test_shared_geometry(self):
+        expected = build()
+        expected.run(CONFIG)
+
+        m = build()
+        with shared_geometry(m.env, CONFIG) as geometry:
+            key = (CONFIG['env']['AirCellSize'], CONFIG['env']['MobilityCellSize'])
+            self.assertIs(geometry.compiled, m.env._compiled[key])
+            self.assertLess(len(pickle.dumps(m)), len(pickle.dumps(expected)))
+            copy = pickle.loads(pickle.dumps(m))
+            copy.run(CONFIG)
+            self.assertEqual(expected.air_exposure(), copy.air_exposure())
+            self.assertEqual(expected.env.air._aerosols, copy.env.air._aerosols)
+            del copy
+        self.assertIsInstance(m.env._compiled[key]['aerosol_conductance'][0], bytes)
+        m.run(CONFIG)
+        self.assertEqual(expected.droplet_exposure(), m.droplet_exposure())
+
+    def test_closes_decomposed_air(self):
+        config = deepcopy(CONFIG)
+        config['env']['AirProcesses'] = 2
+        m = build()
+        m.env.set_config(config)
+        air = m.env.air
+        air.diffuse()  # Starts the workers
+        self.assertIsNotNone(air._workers)
+        with shared_geometry(m.env, config):
+            self.assertIsNone(air._workers)
+            m.env.set_config(config)
+            m.env.air.diffuse()
+            finalizer = m.env.air._workers[1]  # Stops the workers and unlinks the layers of the Air
+            del air
+        self.assertFalse(finalizer.alive)
+
+
+if __name__ == '__main__':
+    unittest.main()
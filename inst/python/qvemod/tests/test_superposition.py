@@ -0,0 +1,121 @@
+import unittest
+import warnings
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.environment import Environment
+from corona_model.model import Model
+from corona_model.actions import Enter, Leave
+from corona_model.superposition import Superposition, attribute_exposures
+from tests.fixtures import VENUE_CONFIG, build_venue
+
+
+class TestSuperposition(unittest.TestCase):
+
+    def setUp(self):
+        warnings.simplefilter('ignore')
+
+    def tearDown(self):
+        warnings.resetwarnings()
+
+    def run_model(self, viral_loads, seed, model=None):
+        """Run a Model and return the exposures over the run of its Agents per layer, by name"""
+        config = deepcopy(VENUE_CONFIG)
+        config['env']['Seed'] = seed
+        m = build_venue(viral_loads) if model is None else model
+        totals = {'air': {agent.name: 0.0 for agent in m.agents}, 'droplet': {agent.name: 0.0 for agent in m.agents}}
+
+        def callback(model, tick):
+            for agent in model.agents:
+                if agent.is_active:
+                    totals['air'][agent.name] += agent.contamination_load_air
+                    totals['droplet'][agent.name] += agent.contamination_load_droplet
+
+        m.run(config, callback=callback)
+        totals['surface'] = m.surface_exposure()
+        totals['agents'] = [agent.name for agent in m.agents]
+        return totals
+
+    def assertExposures(self, m, exposures, layers=('air', 'droplet', 'surface')):
+        for layer in layers:
+            for i, name in enumerate(m['agents']):
+                expected = m[layer][name]
+                self.assertAlmostEqual(expected, exposures[layer][i], delta=1e-9 * max(1.0, abs(expected)))
+
+    def test_index_cases(self):
+        superposition = Superposition(build_venue(), seed=3)
+        superposition.run(VENUE_CONFIG)
+        cases = superposition.index_cases(2.5)
+        for g, case in enumerate(cases):
+            viral_loads = [0] * 4
+            viral_loads[g] = 2.5
+            m = self.run_model(viral_loads, 3)
+            self.assertEqual([m['agents'][g]], case['source'])
+            self.assertExposures(m, {layer: list(case[layer].values()) for layer in ('air', 'droplet', 'surface')})
+
+        # With several infected sources only the air and droplet exposures are exact
+        m = self.run_model((1.5, 0, 4, 0), 3)
+        self.assertExposures(m, superposition.exposures([1.5, 0, 4, 0]), layers=('air', 'droplet'))
+
+    def test_infected(self):
+        superposition = Superposition(build_venue(), sources=['Anna', 'Cor'], infected=['Anna', 'Cor'], seed=8)
+        superposition.run(VENUE_CONFIG)
+        assignments = [[1.5, 4], [0.2, 7], [3, 3]]
+        exposures = superposition.exposures(assignments)
+        for row, (a, c) in enumerate(assignments):
+            m = self.run_model((a, 0, c, 0), 8)
+            self.assertExposures(m, {layer: values[row] for layer, values in exposures.items()})
+
+    def test_attribute_exposures(self):
+        config = deepcopy(VENUE_CONFIG)
+        config['env']['Seed'] = 5
+        attribution = attribute_exposures(build_venue((1.5, 0, 4, 0)), config)
+        self.assertEqual({'Anna', 'Cor'}, set(attribution['air']['Bram']))
+
+        # Each row adds up to the exposure of the Agent
+        m = self.run_model((1.5, 0, 4, 0), 5)
+        self.assertExposures(m, {layer: [sum(attribution[layer][name].values()) for name in m['agents']]
+                                 for layer in ('air', 'droplet', 'surface')})
+
+        # The air and droplets from one source do not depend on the others
+        m = self.run_model((0, 0, 4, 0), 5)
+        self.assertExposures(m, {layer: [attribution[layer][name]['Cor'] for name in m['agents']]
+                                 for layer in ('air', 'droplet')}, layers=('air', 'droplet'))
+
+    def test_exposure_over_run(self):
+        def visit():
+            # Bram is exposed to Anna early on and has left by the end, when his last pickup is 0
+            agents = [Agent('Anna', 1, 0, 0, 0, 1, 1, 1, 1, {0: Enter(12, 2, 'N')}),
+                      Agent('Bram', 0, 0, 0, 0, 1, 1, 1, 1, {0: Enter(14, 2, 'S'), 10: Leave()})]
+            return Model(30, Environment(30, 30, 0.1, 0.2, 0.3, 0.1, 0.5), agents)
+
+        expected = self.run_model(None, 5, model=visit())
+        self.assertGreater(expected['air']['Bram'], 0)
+        config = deepcopy(VENUE_CONFIG)
+        config['env']['Seed'] = 5
+        attribution = attribute_exposures(visit(), config)
+        self.assertEqual(expected['air']['Bram'], attribution['air']['Bram']['Anna'])
+        self.assertEqual(expected['droplet']['Bram'], attribution['droplet']['Bram']['Anna'])
+
+    def test_groups(self):
+        superposition = Superposition(build_venue(), sources=[['Anna', 'Cor'], 'Dewi'])
+        self.assertEqual([[1, 0, 1, 0], [0, 0, 0, 1]], superposition.viral_loads[1:].tolist())
+        with self.assertRaises(KeyError):
+            Superposition(build_venue(), sources=['Eva'])
+
+
+if __name__ == '__main__':
+    unittest.main()
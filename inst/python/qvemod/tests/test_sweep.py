@@ -0,0 +1,124 @@
+import csv
+import tempfile
+import unittest
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.sweep import run_sweep
+from corona_model.agent import Agent
+from corona_model.actions import Enter
+from tests.fixtures import config, build
+
+
+CONFIG = config(Seed=7)
+
+DESIGN = [
+    {'decay_rate_air': 0.1, 'Diffusivity': 23},
+    {'decay_rate_air': 0.5, 'Diffusivity': 23},
+    {'decay_rate_air': 0.1, 'Diffusivity': 5},
+    {'air_exchange_rate': 2, 'MaskAerosolProtectionEfficiency': 0.2},
+]
+
+
+def read(path):
+    with open(path, newline='') as f:
+        return sorted(csv.DictReader(f), key=lambda row: (int(row['point']), row['agent']))
+
+
+class TestSweep(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'sweep.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_matches_runs(self):
+        self.assertEqual(4, run_sweep(build(), CONFIG, DESIGN, self.path, workers=2))
+        rows = read(self.path)
+        self.assertEqual(8, len(rows))
+        self.assertEqual(['point', 'decay_rate_air', 'Diffusivity', 'air_exchange_rate',
+                          'MaskAerosolProtectionEfficiency', 'agent', 'air', 'droplet', 'surface'], list(rows[0]))
+
+        for number, point in enumerate(DESIGN):
+            m = build()
+            config = deepcopy(CONFIG)
+            config['output']['Suppress'] = True
+            for name, value in point.items():
+                if hasattr(m.env, name):
+                    setattr(m.env, name, value)
+                else:
+                    config['env'][name] = value
+            m.run(config)
+            for row in rows[2 * number:2 * number + 2]:
+                self.assertEqual(m.air_exposure()[row['agent']], float(row['air']))
+                self.assertEqual(m.droplet_exposure()[row['agent']], float(row['droplet']))
+        self.assertNotEqual(rows[0]['air'], rows[2]['air'])
+
+    def test_resume(self):
+        self.assertEqual(2, run_sweep(build(), CONFIG, DESIGN[:2], self.path, workers=1))
+        self.assertEqual(2, run_sweep(build(), CONFIG, DESIGN[:2] + [DESIGN[0], DESIGN[1]], self.path, workers=1))
+        self.assertEqual(0, run_sweep(build(), CONFIG, DESIGN[:2] + [DESIGN[0], DESIGN[1]], self.path, workers=1))
+        rows = read(self.path)
+        self.assertEqual([row['air'] for row in rows[:4]], [row['air'] for row in rows[4:]])
+
+        # The rows of a point that was cut off are replaced
+        with open(self.path) as f:
+            lines = f.readlines()
+        with open(self.path, 'w') as f:
+            f.writelines(lines[:-1])
+        self.assertEqual(1, run_sweep(build(), CONFIG, DESIGN[:2] + [DESIGN[0], DESIGN[1]], self.path, workers=1))
+        self.assertEqual(rows, read(self.path))
+
+        # As is a row that was cut off halfway
+        with open(self.path) as f:
+            text = f.read()
+        with open(self.path, 'w') as f:
+            f.write(text[:len(text) - len(text.splitlines()[-1]) // 2 - 1])
+        self.assertEqual(1, run_sweep(build(), CONFIG, DESIGN[:2] + [DESIGN[0], DESIGN[1]], self.path, workers=1))
+        self.assertEqual(rows, read(self.path))
+        with open(self.path) as f:
+            self.assertTrue(all(len(line.split(',')) == 7 for line in f))
+
+    def test_duplicate_names(self):
+        # Every Agent has its own row, also when it shares its name, and the points are complete
+        other = Agent('Saar', 0, 0, 0, 0, 1, 1, 1, 1, {0: Enter(12, 7, 'S')})
+        self.assertEqual(2, run_sweep(build(others=[other]), CONFIG, DESIGN[:2], self.path, workers=1))
+        rows = read(self.path)
+        self.assertEqual(6, len(rows))
+        self.assertEqual(0, run_sweep(build(others=[other]), CONFIG, DESIGN[:2], self.path, workers=1))
+        self.assertEqual(rows, read(self.path))
+
+    def test_same_coughs(self):
+        config = deepcopy(CONFIG)
+        del config['env']['Seed']
+        run_sweep(build(), config, [{'Diffusivity': 23}, {'Diffusivity': 23}], self.path, workers=1)
+        rows = read(self.path)
+        self.assertEqual([row['air'] for row in rows[:2]], [row['air'] for row in rows[2:]])
+        self.assertNotIn('Seed', config['env'])
+
+    def test_other_sweep(self):
+        run_sweep(build(), CONFIG, DESIGN[:1], self.path, workers=1)
+        with self.assertRaises(ValueError):
+            run_sweep(build(), CONFIG, DESIGN, self.path, workers=1)
+        with self.assertRaises(KeyError):
+            run_sweep(build(), CONFIG, [{'decay_rate': 1}], self.path, workers=1)
+        with self.assertRaises(KeyError):
+            run_sweep(build(), CONFIG, [{'decay_rate_surface': 1}], self.path, workers=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
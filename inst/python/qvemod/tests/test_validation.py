@@ -0,0 +1,140 @@
+import unittest
+import warnings
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.agent import Agent
+from corona_model.environment import Environment, IllegalAgentPosition
+from corona_model.air import Void
+from corona_model.model import Model
+from corona_model.actions import Enter, Move, Leave, Face
+from corona_model.validation import validate_scripts, InvalidScripts, CLAMP, DROP
+from copy import deepcopy
+
+
+CONFIG = {
+    "env": {
+        "AirCellSize": 50,
+        "MobilityCellSize": 10,
+        "AgentReach": 50,
+        "SimulationTimeStep": 0.00834,
+        "HandwashingContaminationFraction": 0.3,
+        "HandwashingEffectDuration": 0.5,
+        "MaskEmissionAerosolReductionEfficiency": 0.4,
+        "MaskEmissionDropletReductionEfficiency": 0.04,
+        "MaskAerosolProtectionEfficiency": 0.4,
+        "MaskDropletProtectionEfficiency": 0.04,
+        "CleaningInterval": 1,
+        "Diffusivity": 23,
+        "WallAbsorbingProportion": 0.0,
+        "CoughingRate": 0,
+        "CoughingFactor": 1000000,
+        "CoughingAerosolPercentage": 0.01,
+        "CoughingDropletPercentage": 0.99
+    },
+    "output": {
+        "Suppress": True,
+        "Path": "output",
+        "AerosolContaminationWriteInterval": 15,
+        "AerosolContaminationPrecision": 17,
+        "DropletContaminationWriteInterval": 15,
+        "DropletContaminationPrecision": 17,
+        "SurfaceContaminationWriteInterval": 15,
+        "SurfaceContaminationPrecision": 17
+    }
+}
+
+
+class TestValidation(unittest.TestCase):
+
+    def setUp(self):
+        self.env = Environment(10, 5, 0, 0, 0, 0, 0, walls=[Void(0, 1)])
+        self.env.set_config(CONFIG)
+
+    def test_all_violations_reported(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, 5), 2: Move(9, 0)})
+        b = Agent('Vigo', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(4, 4, 'N'), 1: Move(1, 0), 2: Leave(), 3: Move(-9, 0)})
+        with self.assertRaises(InvalidScripts) as context:
+            validate_scripts(self.env, [a, b])
+        self.assertEqual([('Oscar', 1, 2, 8, 'void'), ('Oscar', 2, 11, 8, 'out of bounds'),
+                          ('Vigo', 1, 5, 4, 'out of bounds')], context.exception.violations)
+
+    def test_clamp(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, 5), 2: Move(9, 1)})
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            violations = validate_scripts(self.env, [a], CLAMP)
+        self.assertEqual(2, len(violations))
+        self.assertNotIn(1, a.script)  # Clamped into the void, so dropped
+        self.assertEqual((2, 1), (a.script[2].x, a.script[2].y))  # Clamped to (4, 4)
+
+    def test_drop(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, 5), 2: Move(1, 1)})
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            validate_scripts(self.env, [a], DROP)
+        self.assertEqual([0, 2], a.script.keys())
+        self.assertEqual([0, 1, 2], a.own_script.keys())  # Fixed for this run only
+        a.reset()
+        self.assertEqual([0, 1, 2], a.script.keys())
+
+    def test_drop_keeps_facing(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, 5, facing='E'), 2: Move(1, 1)})
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            validate_scripts(self.env, [a], DROP)
+        self.assertIsInstance(a.script[1], Face)
+        self.assertEqual('E', a.script[1].direction)
+
+        config = deepcopy(CONFIG)
+        config['env']['ScriptViolations'] = DROP
+        m = Model(2, self.env, [a])
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            m.run(config)
+        self.assertEqual((2, 3), self.env.agent_lookup[a])  # Turned to the east without stepping into the void
+        self.assertEqual('E', a.facing.value)
+
+    def test_fixes_per_run(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, 5), 2: Move(1, 1)})
+        serial = a.serialize()
+        m = Model(3, self.env, [a])
+        config = deepcopy(CONFIG)
+        config['env']['ScriptViolations'] = DROP
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            m.run(config)
+        self.assertEqual(serial['script'], a.serialize()['script'])
+        self.assertRaises(InvalidScripts, m.run, CONFIG)  # The next run follows the Script of the Agent again
+
+    def test_enter_can_not_be_fixed(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 8, 'N')})
+        self.assertRaises(InvalidScripts, validate_scripts, self.env, [a], CLAMP)
+
+    def test_run_validates(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, -4)})
+        m = Model(2, self.env, [a])
+        self.assertRaises(IllegalAgentPosition, m.run, CONFIG)
+        self.assertIsNone(self.env.agent_lookup.get(a))
+
+    def test_after_last_tick(self):
+        a = Agent('Oscar', 0, 0, 0, 0, 0, 0, 0, 0, {0: Enter(2, 3, 'N'), 1: Move(0, -4)})
+        self.assertEqual([], validate_scripts(self.env, [a], ticks=1))
+        m = Model(1, self.env, [a])  # The illegal Move comes after the last tick, so is never run
+        m.run(CONFIG)
+        self.assertEqual([0, 1], a.script.keys())
+
+
+if __name__ == '__main__':
+    unittest.main()
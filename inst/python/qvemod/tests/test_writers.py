@@ -0,0 +1,103 @@
+import unittest
+import csv
+import tempfile
+from copy import deepcopy
+
+# Add the QVEmod package to the system path. Needed to import corona_model as 
+# a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the corona_model dependencies
+from corona_model.writers import BinnedAerosolContaminationWriter
+
+
+CONFIG = {
+    "env": {
+        "AirCellSize": 50,
+        "MobilityCellSize": 10,
+        "AgentReach": 50,
+        "SimulationTimeStep": 0.00834,
+        "HandwashingContaminationFraction": 0.3,
+        "HandwashingEffectDuration": 0.5,
+        "MaskEmissionAerosolReductionEfficiency": 0.4,
+        "MaskEmissionDropletReductionEfficiency": 0.04,
+        "MaskAerosolProtectionEfficiency": 0.4,
+        "MaskDropletProtectionEfficiency": 0.04,
+        "CleaningInterval": 1,
+        "Diffusivity": 23,
+        "WallAbsorbingProportion": 0.0,
+        "CoughingRate": 0,
+        "CoughingFactor": 1000000,
+        "CoughingAerosolPercentage": 0.01,
+        "CoughingDropletPercentage": 0.99
+    },
+    "output": {
+        "Suppress": False,
+        "Path": "output",
+        "AerosolContaminationWriteInterval": 15,
+        "AerosolContaminationPrecision": 17,
+        "DropletContaminationWriteInterval": 15,
+        "DropletContaminationPrecision": 17,
+        "SurfaceContaminationWriteInterval": 15,
+        "SurfaceContaminationPrecision": 17,
+        "AerosolContaminationBinInterval": 2,
+        "AerosolContaminationBinStatistic": "mean",
+        "AerosolContaminationBinBlockSize": 2
+    }
+}
+
+
+class TestBinnedContaminationWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = deepcopy(CONFIG)
+        self.config['output']['Path'] = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_writer(self, statistic):
+        self.config['output']['AerosolContaminationBinStatistic'] = statistic
+        writer = BinnedAerosolContaminationWriter(self.config)
+        grids = [
+            [[1.0, 2.0, 0.0], [3.0, None, 0.0], [0.0, 0.0, 5.0]],
+            [[3.0, 2.0, 0.0], [1.0, None, 0.0], [0.0, 0.0, 1.0]],
+            [[4.0, 4.0, 4.0], [4.0, None, 4.0], [4.0, 4.0, 4.0]],
+        ]
+        for tick, grid in enumerate(grids):
+            writer.update(tick, grid)
+        writer.close()
+        with open(os.path.join(self.directory.name, BinnedAerosolContaminationWriter.FILE_NAME)) as in_file:
+            return {(int(row['Start Tick']), int(row['End Tick']), int(row['X']), int(row['Y'])):
+                    float(row['Contamination']) for row in csv.DictReader(in_file)}
+
+    def test_mean(self):
+        rows = self.run_writer('mean')
+        self.assertEqual(8, len(rows))  # 2 bins of 2 x 2 blocks
+        self.assertAlmostEqual(12.0 / 6, rows[(0, 1, 0, 0)])
+        self.assertAlmostEqual(6.0 / 2, rows[(0, 1, 1, 1)])
+        self.assertAlmostEqual(4.0, rows[(2, 2, 0, 0)])
+
+    def test_max(self):
+        rows = self.run_writer('max')
+        self.assertEqual(3.0, rows[(0, 1, 0, 0)])
+        self.assertEqual(5.0, rows[(0, 1, 1, 1)])
+
+    def test_integral(self):
+        rows = self.run_writer('integral')
+        dt = self.config['env']['SimulationTimeStep']
+        self.assertAlmostEqual(12.0 / 3 * dt, rows[(0, 1, 0, 0)])
+        self.assertAlmostEqual(4.0 * dt, rows[(2, 2, 1, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,10 +1,30 @@
 import numpy as np
+import pandas as pd
 from utility import dfs_to_object
 
-def run_model(model, 
-              configs, 
+from qvemod.corona_model.ensemble import run_ensemble as _run_ensemble
+from qvemod.corona_model.sweep import run_sweep as _run_sweep
+from qvemod.corona_model.sensitivity import sobol as _sobol, morris as _morris
+
+def to_config(configs,
               keys):
-    
+    """"Convert the configuration dataframes to a QVEmod config
+
+    Parameters
+    ----------
+    configs : list
+        List of the pandas dataframes of the configurations.
+    keys : list
+        List of the keys under which each configuration is stored ("env",
+        "output").
+
+    Returns
+    -------
+    dict
+        Configuration as used by QVEmod, with integer values where QVEmod
+        expects them.
+    """
+
     # Transform the configuration dataframes to an object
     config = dfs_to_object(
         configs, 
@@ -25,16 +45,206 @@ def run_model(model,
     for column in columns:
         config['env'][column] = int(np.round(config['env'][column]))
 
+    # A missing seed (NA in R) leaves the random streams to the global random
+    # state of Python
+    if pd.isna(config['env'].get('Seed')):
+        config['env'].pop('Seed', None)
+    else:
+        config['env']['Seed'] = int(np.round(config['env']['Seed']))
+
     columns = [
         'AerosolContaminationWriteInterval', 
         'AerosolContaminationPrecision',
         'DropletContaminationWriteInterval',
         'DropletContaminationPrecision',
         'SurfaceContaminationWriteInterval',
-        'SurfaceContaminationPrecision'
+        'SurfaceContaminationPrecision',
+        'AerosolContaminationBinInterval',
+        'AerosolContaminationBinBlockSize',
+        'DropletContaminationBinInterval',
+        'DropletContaminationBinBlockSize'
     ]
     for column in columns:
         config['output'][column] = int(np.round(config['output'][column]))
 
+    return config
+
+def run_model(model, 
+              configs, 
+              keys):
+    
     # Run the model
-    model.run(config)
\ No newline at end of file
+    model.run(to_config(configs, keys))
+
+def run_ensemble(model,
+                 configs,
+                 keys,
+                 n,
+                 seeds = None,
+                 workers = None):
+    """"Run replicates of the model in parallel
+
+    Parameters
+    ----------
+    model : Model
+        The QVEmod model to run.
+    configs : list
+        List of the pandas dataframes of the configurations.
+    keys : list
+        List of the keys under which each configuration is stored ("env",
+        "output").
+    n : int
+        Number of replicates.
+    seeds : list, optional
+        Seed of each replicate. Defaults to seeds derived from the Seed in
+        the "env" configuration (0 if not given) and the number of the
+        replicate, as by derive_seed(Seed or 0, "replicate", i).
+    workers : int, optional
+        Number of processes. Defaults to the number of cores.
+
+    Returns
+    -------
+    pd.DataFrame
+        Pandas dataframe with one row per replicate and agent, containing the
+        replicate, its seed, the agent and the air, droplet and surface 
+        exposure of the agent at the end of the replicate.
+    """
+
+    results = _run_ensemble(
+        model, 
+        to_config(configs, keys), 
+        int(n), 
+        seeds = None if seeds is None else [int(seed) for seed in seeds],
+        workers = None if workers is None else int(workers)
+    )
+
+    # Stack the exposures of all replicates
+    rows = [
+        (i, result['seed'], agent, air, result['droplet'][agent], result['surface'][agent])
+        for i, result in enumerate(results)
+        for agent, air in result['air'].items()
+    ]
+    return pd.DataFrame(
+        rows,
+        columns = ["replicate", "seed", "agent", "air", "droplet", "surface"]
+    )
+
+def run_sweep(model,
+              configs,
+              keys,
+              design,
+              path,
+              workers = None):
+    """"Run the model for every point of a parameter design in parallel
+
+    Parameters
+    ----------
+    model : Model
+        The QVEmod model to run.
+    configs : list
+        List of the pandas dataframes of the configurations.
+    keys : list
+        List of the keys under which each configuration is stored ("env",
+        "output").
+    design : pd.DataFrame
+        Pandas dataframe with one row per point and one column per parameter,
+        named after an attribute of the environment (e.g. "decay_rate_air") or
+        a key of the environment configuration (e.g. "Diffusivity").
+    path : str
+        Path of the csv file to which the results are written. If it exists,
+        the points that it already contains are not run again.
+    workers : int, optional
+        Number of processes. Defaults to the number of cores.
+
+    Returns
+    -------
+    pd.DataFrame
+        Pandas dataframe with one row per point and agent, containing the
+        number of the point, its parameters, the agent and the air, droplet 
+        and surface exposure of the agent at the end of the run.
+    """
+
+    _run_sweep(
+        model, 
+        to_config(configs, keys), 
+        design.to_dict(orient = "records"), 
+        path,
+        workers = None if workers is None else int(workers)
+    )
+
+    return pd.read_csv(path).sort_values(["point", "agent"], ignore_index = True)
+
+
+def run_sensitivity(model,
+                    configs,
+                    keys,
+                    bounds,
+                    method = "sobol",
+                    n = 256,
+                    seed = None,
+                    path = None,
+                    workers = None):
+    """"Global sensitivity analysis of the infection risk
+
+    Parameters
+    ----------
+    model : Model
+        The QVEmod model to run.
+    configs : list
+        List of the pandas dataframes of the configurations.
+    keys : list
+        List of the keys under which each configuration is stored ("env",
+        "output").
+    bounds : pd.DataFrame
+        Pandas dataframe with the columns "parameter", "lower" and "upper",
+        containing the range of each parameter.
+    method : str, optional
+        Either "sobol" for Sobol indices or "morris" for elementary effects.
+        Defaults to "sobol".
+    n : int, optional
+        Number of base samples for "sobol" or of trajectories for "morris".
+        Defaults to 256.
+    seed : int, optional
+        Seed of the sampling design, the bootstrap and the coughs.
+    path : str, optional
+        Path of the file to which partial progress is checkpointed. If it
+        exists, the runs that it contains are not run again.
+    workers : int, optional
+        Number of processes. Defaults to 1.
+
+    Returns
+    -------
+    pd.DataFrame
+        Pandas dataframe with one row per parameter and index, containing the
+        parameter, the name of the index, its estimate and the lower and upper
+        bound of its bootstrap confidence interval (if any).
+    """
+
+    ranges = {
+        row.parameter: (float(row.lower), float(row.upper)) 
+        for row in bounds.itertuples()
+    }
+    kwargs = dict(
+        seed = None if seed is None else int(seed),
+        path = path,
+        workers = 1 if workers is None else int(workers)
+    )
+    config = to_config(configs, keys)
+    if method == "sobol":
+        indices = _sobol(model, config, ranges, n = int(n), **kwargs)
+    elif method == "morris":
+        indices = _morris(model, config, ranges, trajectories = int(n), **kwargs)
+    else:
+        raise ValueError("Unknown method {}".format(method))
+
+    # One row per parameter and index, with the interval of the index if any
+    rows = [
+        (parameter, index, estimate) + values.get(index + "_conf", (np.nan, np.nan))
+        for parameter, values in indices.items()
+        for index, estimate in values.items()
+        if not index.endswith("_conf")
+    ]
+    return pd.DataFrame(
+        rows,
+        columns = ["parameter", "index", "estimate", "lower", "upper"]
+    )
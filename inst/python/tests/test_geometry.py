@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+# Add the Python modules of the package to the system path. Needed to import
+# geometry as a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the dependencies
+from geometry import rasterize_voids
+
+
+def cells(voids):
+    return set(zip(voids['x'].tolist(), voids['y'].tolist()))
+
+
+def square(x1, y1, x2, y2):
+    return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]])
+
+
+class TestGeometry(unittest.TestCase):
+
+    def test_concave(self):
+        # A U of which the opening faces up: the cells in the opening are not
+        # void
+        u = np.array([[0, 0], [5, 0], [5, 5], [4, 5], [4, 1], [1, 1], [1, 5], [0, 5]])
+        expected = {(x, 0) for x in range(5)} | {(x, y) for x in (0, 4) for y in range(1, 5)}
+        self.assertEqual(expected, cells(rasterize_voids([u], [0, 0], 1, 6, 6)))
+
+    def test_hole(self):
+        # A square with a square hole, as one ring that is connected to the 
+        # hole by an edge that is traversed in both directions
+        ring = np.array([[0, 0], [6, 0], [6, 6], [0, 6], [0, 0], 
+                         [2, 2], [2, 4], [4, 4], [4, 2], [2, 2]])
+        expected = {(x, y) for x in range(6) for y in range(6)} - {(x, y) for x in (2, 3) for y in (2, 3)}
+        self.assertEqual(expected, cells(rasterize_voids([ring], [0, 0], 1, 8, 8)))
+
+    def test_boundary(self):
+        # Centers on the left and lower edges are within the polygon, those on
+        # the right and upper edges are not, so that adjacent polygons never
+        # share a cell
+        left = rasterize_voids([square(0.5, 0.5, 2.5, 2.5)], [0, 0], 1, 6, 6)
+        self.assertEqual({(x, y) for x in (0, 1) for y in (0, 1)}, cells(left))
+
+        right = rasterize_voids([square(2.5, 0.5, 4.5, 2.5)], [0, 0], 1, 6, 6)
+        self.assertEqual(set(), cells(left) & cells(right))
+        both = rasterize_voids([square(0.5, 0.5, 4.5, 2.5)], [0, 0], 1, 6, 6)
+        self.assertEqual(cells(both), cells(left) | cells(right))
+
+    def test_origin_and_cell_size(self):
+        # Cells of 0.5 on a grid that starts at (-1, -1); only the polygon 
+        # within the grid counts
+        voids = rasterize_voids([square(-1, -1, 0, 0), square(10, 10, 11, 11)], [-1, -1], 0.5, 4, 4)
+        self.assertEqual({(x, y) for x in (0, 1) for y in (0, 1)}, cells(voids))
+        self.assertEqual(['x', 'y'], list(voids.columns))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import warnings
+
+import pandas as pd
+
+# Add the Python modules of the package and QVEmod to the system path. Needed to
+# import translate and corona_model as modules
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+for path in (filename, os.path.join(filename, "qvemod")):
+    if not path in sys.path:
+        sys.path.append(path)
+
+# Load the dependencies
+from corona_model.agent import Agent
+from corona_model.actions import Leave
+from corona_model.environment import Environment
+from corona_model.model import Model
+from corona_model.surfaces import Item
+from translate import translate_data, translate_row
+
+
+CONFIG = {
+    "env": {
+        "AirCellSize": 50,
+        "MobilityCellSize": 10,
+        "AgentReach": 50,
+        "SimulationTimeStep": 0.00834,
+        "HandwashingContaminationFraction": 0.3,
+        "HandwashingEffectDuration": 0.5,
+        "MaskEmissionAerosolReductionEfficiency": 0.4,
+        "MaskEmissionDropletReductionEfficiency": 0.04,
+        "MaskAerosolProtectionEfficiency": 0.4,
+        "MaskDropletProtectionEfficiency": 0.04,
+        "CleaningInterval": 1,
+        "Diffusivity": 23,
+        "WallAbsorbingProportion": 0.0,
+        "CoughingRate": 0,
+        "CoughingFactor": 1000000,
+        "CoughingAerosolPercentage": 0.01,
+        "CoughingDropletPercentage": 0.99
+    },
+    "output": {
+        "Suppress": True,
+        "Path": "output"
+    }
+}
+
+# Rows of the time series of two agents, interleaved, as (id, iteration, status,
+# x, y, orientation, end_goal, goal_id). Ann enters, turns, moves, picks up the
+# cup and leaves, with redundant faces in between and after leaving. Ben enters
+# later, has two rows at the same iteration and does not leave.
+ROWS = [
+    ('ann', 1, 'move', 5, 5, 90, False, 'cup'),
+    ('ann', 2, 'plan', 0, 0, 100, False, 'cup'),
+    ('ben', 2, 'move', 8, 8, 200, False, 'goal exit'),
+    ('ann', 3, 'move', 1, 0, 10, False, 'cup'),
+    ('ben', 3, 'move', -1, 0, 200, False, 'goal exit'),
+    ('ann', 4, 'move', 0, 0, 350, False, 'cup'),
+    ('ben', 4, 'plan', 0, 0, 300, False, 'goal exit'),
+    ('ben', 4, 'move', 0, -1, 270, False, 'goal exit'),
+    ('ann', 5, 'completing goal', 0, 0, 0, True, 'cup'),
+    ('ben', 5, 'plan', 0, 0, 260, False, 'goal exit'),
+    ('ann', 6, 'reroute', 0, 0, 180, False, 'cup'),
+    ('ben', 6, 'reroute', 0, 0, 90, False, 'goal exit'),
+    ('ann', 7, 'completing goal', 0, 0, 190, False, 'cup'),
+    ('ann', 8, 'move', 0, 1, 260, False, 'cup'),
+    ('ann', 9, 'exit', 0, 0, 260, False, 'goal exit'),
+    ('ann', 10, 'plan', 0, 0, 45, False, 'goal exit'),
+]
+
+SPECIFICATIONS = pd.DataFrame({
+    'id': ['ann', 'ben'],
+    'viral_load': [1, 0],
+    'contamination_load_air': [0, 0],
+    'contamination_load_droplet': [0, 0],
+    'contamination_load_surface': [0, 0],
+    'emission_rate_air': [0.53, 0.53],
+    'emission_rate_droplet': [0.47, 0.47],
+    'pick_up_air': [2.3, 2.3],
+    'pick_up_droplet': [2.3, 2.3],
+    'wearing_mask': [0, 1],
+})
+
+
+def time_series():
+    return pd.DataFrame(
+        ROWS, 
+        columns = ['id', 'iteration', 'status', 'x', 'y', 'orientation', 'end_goal', 'goal_id']
+    )
+
+
+def translate_rows(time_series, agent_specifications):
+    """The agents of translate_data as translated row by row with translate_row"""
+    agents = []
+    for i in time_series['id'].unique():
+        df = time_series.loc[time_series['id'] == i].reset_index()
+        actions = {}
+        for j, row in df.iterrows():
+            idx = int(df['iteration'][j] - 1)
+            actions[idx] = translate_row(row, first_entry = j == 0)
+        if type(actions[idx]).__name__ != 'Leave':
+            actions[idx + 1] = Leave()
+
+        agent_args = agent_specifications.loc[agent_specifications['id'] == i].iloc[0]
+        parameters = [float(agent_args[name]) for name in agent_specifications if name not in ('id', 'wearing_mask')]
+        agents.append(Agent(i, *parameters, actions, wearing_mask = agent_args['wearing_mask'] == 1))
+    return agents
+
+
+def follow(agents):
+    """Position, facing and activity of every agent after every tick of a run"""
+    env = Environment(20, 20, 0, 0, 0, 0, 0)
+    model = Model(12, env, agents, surfaces = [Item('cup', 6, 5, 0.5, 0.5, 0.1)])
+    states = []
+
+    def callback(model, tick):
+        states.append([(env.agent_lookup.get(agent), agent.facing, agent.is_active, [item.name for item in agent.held])
+                       for agent in model.agents])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model.run(CONFIG, callback = callback)
+    return states
+
+
+class TestTranslate(unittest.TestCase):
+
+    def test_same_as_rows(self):
+        expected = translate_rows(time_series(), SPECIFICATIONS)
+        agents = translate_data(time_series(), SPECIFICATIONS)
+
+        self.assertEqual([agent.name for agent in expected], [agent.name for agent in agents])
+        for agent, fromrows in zip(agents, expected):
+            self.assertEqual(fromrows.serialize()['wearing_mask'], agent.serialize()['wearing_mask'])
+            self.assertEqual(fromrows.viral_load, agent.viral_load)
+
+            # Only faces that do not change anything are left out
+            actions = [(tick, action.serialize()) for tick, action in agent.script.items()]
+            self.assertEqual([(tick, action.serialize()) for tick, action in fromrows.script.items()
+                              if action.type != 'face' or (tick, action.serialize()) in actions], actions)
+            self.assertLess(len(agent.script), len(fromrows.script))
+
+        self.assertEqual(follow(expected), follow(agents))
+
+    def test_faces_kept(self):
+        agents = translate_data(time_series(), SPECIFICATIONS)
+        faces = {agent.name: [tick for tick, action in agent.script.items() if action.type == 'face'] 
+                 for agent in agents}
+
+        # Ann turns west while rerouting, Ben turns north; the faces in the
+        # direction that the agent already faces and after leaving are dropped
+        self.assertEqual({'ann': [5], 'ben': [5]}, faces)
+
+
+if __name__ == '__main__':
+    unittest.main()
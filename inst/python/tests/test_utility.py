@@ -0,0 +1,48 @@
+import unittest
+
+import pandas as pd
+
+# Add the Python modules of the package to the system path. Needed to import
+# utility as a module
+import sys
+import os
+filename = os.path.join(
+    os.path.dirname(__file__),
+    ".."
+)
+
+if not filename in sys.path:
+    sys.path.append(filename)
+
+# Load the dependencies
+from utility import index_by_id, select
+
+
+class TestUtility(unittest.TestCase):
+
+    def test_index_by_id(self):
+        df = pd.DataFrame({
+            'id': ['a', 'b', 'a'],
+            'viral_load': [1, 0, 5],
+            'pick_up_air': [2.3, '30', 7],
+        })
+        records = index_by_id(df)
+        self.assertEqual(['a', 'b'], list(records))
+
+        # The same values as select, so the first row of a duplicate id
+        for id in ('a', 'b'):
+            self.assertEqual({column: values.values[0] for column, values in select(df, id).items()},
+                             records[id])
+        self.assertEqual({'viral_load': 1.0, 'pick_up_air': 2.3}, records['a'])
+        self.assertIsInstance(records['b']['pick_up_air'], float)
+
+        # Ids that are not in the dataframe are not found
+        with self.assertRaises(KeyError):
+            records['c']
+
+    def test_index_by_id_empty(self):
+        self.assertEqual({}, index_by_id(pd.DataFrame({'id': [], 'viral_load': []})))
+
+
+if __name__ == '__main__':
+    unittest.main()
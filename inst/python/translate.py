@@ -8,8 +8,9 @@ from corona_model.environment import Environment
 from corona_model.air import Wall, Shield, Void, EmissionPattern
 from corona_model.actions import *
 from corona_model.surfaces import Item, Fixture
+from corona_model.script import Script
 
-from utility import select
+from utility import index_by_id
 
 # General function
 #
@@ -23,6 +24,12 @@ def translate_data(time_series,
     function takes the data generated by `predped` and then translates it to this 
     format. 
 
+    Rather than filtering the time series for each agent separately, the data 
+    are sorted on the agents once, after which the orientations and statuses of 
+    all rows are translated at once. The compact `Script` of each agent is then 
+    built from its slice of these arrays. The result is the same as calling 
+    `translate_row` on each of the rows of an agent.
+
     Parameters
     ----------
     time_series : dataframe
@@ -41,52 +48,247 @@ def translate_data(time_series,
     # Transform the R dataframes to a pandas dataframe
     time_series = pd.DataFrame(time_series)
     agent_specifications = pd.DataFrame(agent_specifications)
-    
-    # We need to translate all actions for each of the individuals separately.
-    # Get all of these individuals for the dataframe.
-    agent_id = time_series['id'].unique()
+
+    # Sort the data on the agents once, keeping the agents in order of 
+    # appearance and the rows of each agent in their original order. The 
+    # slice of each agent is then defined by its start and end in the sorted 
+    # data.
+    codes, agent_id = pd.factorize(time_series['id'])
+    order = np.argsort(codes, kind = 'stable')
+    codes = codes[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)]
+
+    # Translate all rows at once to the rows of a `Script`, consisting of the 
+    # code of the action, the position (for entering and moving), the facing 
+    # code, and the index of the picked up goal in the list of all goals.
+    first_entry = np.zeros(len(codes), dtype = bool)
+    first_entry[starts] = True
+
+    x = time_series['x'].to_numpy()[order]
+    y = time_series['y'].to_numpy()[order]
+
+    ticks = (time_series['iteration'].to_numpy()[order] - 1).astype(int)
+    kind = translate_status(
+        time_series['status'].to_numpy()[order],
+        x, 
+        y,
+        time_series['end_goal'].to_numpy()[order],
+        first_entry
+    )
+    facing = translate_orientation(
+        time_series['orientation'].to_numpy()[order]
+    )
+
+    positional = (kind == Script.ENTER) | (kind == Script.MOVE)
+    x = np.where(positional, x, 0).astype(int)
+    y = np.where(positional, y, 0).astype(int)
+    facing = np.where(kind == Script.LEAVE, -1, facing)
+
+    target, targets = pd.factorize(time_series['goal_id'].to_numpy()[order])
+    target = np.where(kind == Script.PICKUP, target, -1)
+    targets = targets.tolist()
+
+    # Most rows are `Face`s that leave the facing of the agent as it is. These 
+    # are dropped from the scripts, so that the model does not need to 
+    # dispatch them. The slice of each agent in the remaining rows is again 
+    # defined by its start and end.
+    #
+    # Rows that are followed by another row of the agent at the same tick are
+    # left out of this, as only the last of these ends up in the script.
+    unique = np.r_[codes[1:] != codes[:-1], True] | np.r_[ticks[1:] != ticks[:-1], True]
+    first_row = np.r_[True, codes[unique][1:] != codes[unique][:-1]]
+    keep = unique.copy()
+    keep[unique] = ~redundant_faces(
+        kind[unique], 
+        x[unique], 
+        y[unique], 
+        facing[unique], 
+        first_row
+    )
+    kept = np.r_[0, np.cumsum(keep)]
+
+    last_tick = ticks[ends - 1]
+    last_kind = kind[ends - 1]
+    ticks, kind, x, y, facing, target = (
+        i[keep] for i in (ticks, kind, x, y, facing, target)
+    )
+
+    # Look up the arguments of the agents by their id
+    agent_specifications = index_by_id(agent_specifications)
 
     # Loop over the agents
     agents = []
-    for i in agent_id:
-        # Select data for this agent only
-        df = time_series.loc[time_series['id'] == i].reset_index()
-
-        # Loop over each row and translate the actions of the agent to what 
-        # QVEmod expects
-        actions = {}
-        for j, row in df.iterrows():
-            idx = int(df['iteration'][j] - 1)
-            actions[idx] = translate_row(
-                row,
-                first_entry = j == 0
-            )
+    for i, start, end, idx, last in zip(agent_id, kept[starts], kept[ends], last_tick, last_kind):
+        # Create the script of this agent out of its slice of the arrays
+        script = Script.from_arrays(
+            ticks[start:end].tolist(),
+            kind[start:end].tolist(),
+            x[start:end].tolist(),
+            y[start:end].tolist(),
+            facing[start:end].tolist(),
+            target[start:end].tolist(),
+            targets
+        )
 
         # Small fix: If the last thing the agent did is not leave, make sure 
-        # they do!
-        if(type(actions[idx]).__name__ != 'Leave'): 
-            actions[idx + 1] = Leave()
+        # they do! This is based on the last row of the agent, whether or not
+        # it was dropped.
+        if last != Script.LEAVE: 
+            script[int(idx) + 1] = Leave()
 
         # Add the Agent to the list
-        agent_args = select(agent_specifications, i)
+        agent_args = agent_specifications[i]
         agents.append(
             Agent(
                 i, 
-                agent_args['viral_load'].values[0], 
-                agent_args['contamination_load_air'].values[0], 
-                agent_args['contamination_load_droplet'].values[0], 
-                agent_args['contamination_load_surface'].values[0],
-                agent_args['emission_rate_air'].values[0], 
-                agent_args['emission_rate_droplet'].values[0], 
-                agent_args['pick_up_air'].values[0], 
-                agent_args['pick_up_droplet'].values[0],
-                actions,
-                wearing_mask = agent_args['wearing_mask'].values[0] == 1
+                agent_args['viral_load'], 
+                agent_args['contamination_load_air'], 
+                agent_args['contamination_load_droplet'], 
+                agent_args['contamination_load_surface'],
+                agent_args['emission_rate_air'], 
+                agent_args['emission_rate_droplet'], 
+                agent_args['pick_up_air'], 
+                agent_args['pick_up_droplet'],
+                script,
+                wearing_mask = agent_args['wearing_mask'] == 1
             )
         )
 
     return agents
 
+# Vectorized translation of orientations.
+#
+# Bins the continuous orientations of predped to the discrete directions that 
+# QVEmod uses. Follows the same binning as `translate_row`.
+def translate_orientation(orientation):
+    """"Translate orientations to facing codes
+
+    Parameters
+    ----------
+    orientation : np.ndarray
+        Orientations of the agents in degrees.
+
+    Returns
+    -------
+    np.ndarray
+        array of indices in `Script.FACINGS`, corresponding to "N", "W", "S", 
+        or "E"
+    """
+
+    # Anything outside of [45, 315), including missing values, is "E"
+    idx = np.digitize(orientation, [45, 135, 225, 315])
+    directions = np.array([
+        Script.FACINGS.index(i) for i in ['E', 'N', 'W', 'S', 'E']
+    ])
+    return directions[idx]
+
+# Vectorized translation of statuses.
+#
+# Classifies the rows of the time series to the type of action that the agent 
+# performs. Follows the same logic as `translate_row`.
+def translate_status(status, 
+                     x, 
+                     y, 
+                     end_goal, 
+                     first_entry):
+    """"Translate statuses to action codes
+
+    Parameters
+    ----------
+    status : np.ndarray
+        Status of the agents as provided by `predped`.
+    x, y : np.ndarray
+        Movement of the agents relative to their previous position. For the 
+        first entry, their absolute position instead.
+    end_goal : np.ndarray
+        Whether the agent has completed their goal in this row.
+    first_entry : np.ndarray
+        Whether the row is the first entry of the agent.
+
+    Returns
+    -------
+    np.ndarray
+        array of action codes as defined in `Script`, being one of those for 
+        `Enter`, `Move`, `Leave`, `Pickup`, or `Face`
+    """
+
+    move = status == 'move'
+    return np.select(
+        [
+            move & first_entry,
+            move & (x == 0) & (y == 0),
+            move,
+            status == 'exit',
+            (status == 'completing goal') & end_goal.astype(bool)
+        ],
+        [Script.ENTER, Script.FACE, Script.MOVE, Script.LEAVE, Script.PICKUP],
+        default = Script.FACE
+    )
+
+# Vectorized detection of redundant faces.
+#
+# Follows the facing of each agent through their rows in the same way as the 
+# `Environment` does when the script is run.
+def redundant_faces(kind, 
+                    x, 
+                    y, 
+                    facing, 
+                    first_row):
+    """"Find `Face`s that do not change the facing of the agent
+
+    A `Face` does not change anything when the agent already faces in that 
+    direction, or when the agent is not in the environment (before entering or 
+    after leaving), in which case the `Environment` ignores it.
+
+    Parameters
+    ----------
+    kind, x, y, facing : np.ndarray
+        Action codes, positions and facing codes of the rows of all agents, 
+        sorted on the agents, as in `translate_data`.
+    first_row : np.ndarray
+        Whether the row is the first row of the agent.
+
+    Returns
+    -------
+    np.ndarray
+        boolean array that is true for the `Face`s that can be dropped
+    """
+
+    rows = np.arange(len(kind))
+    if len(rows) == 0:
+        return np.zeros(0, dtype = bool)
+
+    # Whether the agent is in the environment before each row: the last enter 
+    # or leave of this agent determines this.
+    marks = np.where(first_row | (kind == Script.ENTER) | (kind == Script.LEAVE), rows, 0)
+    marks = np.maximum.accumulate(marks)
+    active_after = kind[marks] == Script.ENTER
+    active_before = np.r_[False, active_after[:-1]] & ~first_row
+
+    # Facing after each row that sets it. A move without a facing turns the 
+    # agent in the direction of the move, as in `Environment.get_direction`.
+    degrees = np.degrees(np.arctan2(y, x))
+    direction = np.select(
+        [
+            (degrees >= 45) & (degrees <= 135),
+            (degrees >= -45) & (degrees <= 45),
+            (degrees >= -135) & (degrees <= -45)
+        ],
+        [Script.FACINGS.index(i) for i in ['N', 'E', 'S']],
+        default = Script.FACINGS.index('W')
+    )
+    turned = np.where((kind == Script.MOVE) & (facing < 0), direction, facing)
+
+    sets = (kind == Script.ENTER) | (((kind == Script.MOVE) | (kind == Script.FACE)) & active_before)
+    marks = np.where(sets | first_row, rows, 0)
+    marks = np.maximum.accumulate(marks)
+    facing_after = np.where(sets[marks], turned[marks], -2)
+    facing_before = np.where(first_row, -2, np.r_[-2, facing_after[:-1]])
+
+    return (kind == Script.FACE) & (~active_before | (facing == facing_before))
+
 # Specific function for rows.
 #
 # Translates a single row in the dataframe to an Action that the agent has 
@@ -138,18 +340,18 @@ def translate_row(row,
                 return Enter(row['x'], row['y'], direction)
             
             if (row['x'] == 0) & (row['y'] == 0):
-                return Face(direction)
+                return Script.intern(Face(direction))
             
             return Move(row['x'], row['y'], facing = direction)
         case 'exit':
-            return Leave()
+            return Script.intern(Leave())
         case 'completing goal':
             if row['end_goal']:
                 return Pickup(row['goal_id'])
             else:
-                return Face(direction)
+                return Script.intern(Face(direction))
         case _:
-            return Face(direction)
+            return Script.intern(Face(direction))
         
 # Specific function for items.
 #
@@ -181,36 +383,30 @@ def translate_items(time_series,
 
     # Transform the R dataframes to a pandas dataframe
     time_series = pd.DataFrame(time_series)
-    item_specifications = pd.DataFrame(item_specifications)
+    item_specifications = index_by_id(pd.DataFrame(item_specifications))
     
     # We need to translate all goals that have been observed to an Item. Get all
-    # unique goals out of the dataframe.
-    goal_id = time_series['goal_id'].unique()
+    # unique goals out of the dataframe, together with the coordinates at which
+    # they are first observed.
+    goals = time_series.drop_duplicates('goal_id')
 
     # Loop over the goals
     items = []
-    for i in goal_id:
+    for i, x, y in zip(goals['goal_id'], goals['goal_x'], goals['goal_y']):
         # Delete all exit goals from this list, they do not count
         if 'goal exit' in i: 
             continue 
 
-        # Select a single goal
-        df = time_series.loc[time_series['goal_id'] == i]
-
-        # Get the x and y coordinates for this goal
-        x = df['goal_x'].values[0]
-        y = df['goal_y'].values[0]
-
         # Create the item and add it to the list
-        item_args = select(item_specifications, i)
+        item_args = item_specifications[i]
         items.append(
             Item(
                 i, 
                 x, 
                 y, 
-                item_args['transfer_efficiency'].values[0],
-                item_args['surface_ratio'].values[0],
-                item_args['surface_decay_rate'].values[0]
+                item_args['transfer_efficiency'],
+                item_args['surface_ratio'],
+                item_args['surface_decay_rate']
             )
         )
 
@@ -243,7 +439,8 @@ def translate_env(shape,
         starting position ("x1", "y1") and an ending position ("x2", "y2").
     void_centers: dataframe
         R data.frame that contains all positions that fall within inpenetrable 
-        objects in its rows, having column names ("x", "y").
+        objects in its rows, having column names ("x", "y"). Output of 
+        `rasterize_voids`.
     env_specifications: dataframe
         R data.frame of a single row that contains all of the parameters
         required by `QVEmod`s `Environment` class. 
@@ -267,32 +464,29 @@ def translate_env(shape,
     width = int(math.ceil(width))
     height = int(math.ceil(height))
 
-    # Create a list of walls that make up the environment
-    barriers = []
-    for i, row in shape.iterrows():
-        barriers.append(
-            Wall(
-                row['x1'], 
-                row['y1'],
-                row['x2'], 
-                row['y2']
-            )
-        )
+    # Create a list of walls that make up the environment. Segments that are 
+    # neither horizontal nor vertical are covered by QVEmod itself.
+    barriers = [
+        Wall(x1, y1, x2, y2) 
+        for x1, y1, x2, y2 in zip(*(shape[i].tolist() for i in ['x1', 'y1', 'x2', 'y2']))
+    ]
 
     # Now make a list of other barriers in the environment
-    for i, row in objects.iterrows():
-        barriers.append(
-            Shield(
-                row['x1'], 
-                row['y1'],
-                row['x2'], 
-                row['y2']
-            )
-        )
+    if len(objects) > 0:
+        barriers += [
+            Shield(x1, y1, x2, y2) 
+            for x1, y1, x2, y2 in zip(*(objects[i].tolist() for i in ['x1', 'y1', 'x2', 'y2']))
+        ]
 
     # Finally make those cells that fall within an object void. Needed to ensure
     # the correct contamination is computed by QVEmod
-    walls = [Void(row['x'], row['y']) for i, row in void_centers.iterrows()]
+    void_centers = pd.DataFrame(void_centers)
+    walls = []
+    if len(void_centers) > 0:
+        walls = [
+            Void(int(x), int(y)) 
+            for x, y in zip(void_centers['x'].tolist(), void_centers['y'].tolist())
+        ]
 
     # With these defined, we will now combine all information into a singular 
     # `Environment` class, which we can then output as the result of the 
@@ -343,22 +537,22 @@ def translate_surf(objects,
 
     # Transform the R dataframes to a pandas dataframe
     objects = pd.DataFrame(objects)
-    surf_specifications = pd.DataFrame(surf_specifications)
+    surf_specifications = index_by_id(pd.DataFrame(surf_specifications))
 
     # Create a list of walls that make up the environment
     surfaces = []
     for i, row in objects.iterrows():
         # Create the Fixture and add to the list
-        surf_args = select(surf_specifications, row['id'])
+        surf_args = surf_specifications[row['id']]
         surfaces.append(
             Fixture(
                 row['id'],
                 int(row['x']), 
                 int(row['y']),
-                surf_args['transfer_efficiency'].values[0], 
+                surf_args['transfer_efficiency'], 
                 row['ratio'],
-                surf_args['touch_frequency'].values[0], 
-                surf_args['surface_decay_rate'].values[0]
+                surf_args['touch_frequency'], 
+                surf_args['surface_decay_rate']
             )
         )
 
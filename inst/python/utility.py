@@ -86,4 +86,40 @@ def select(df, id):
     for column in df:
         df[column] = df[column].astype(float)
 
-    return df
\ No newline at end of file
+    return df
+
+# Function that indexes a dataframe of specifications on their id once, so that
+# the arguments of each entity can be looked up directly instead of calling 
+# `select` for each of them.
+def index_by_id(df):
+    """"Index values on id in dataframe
+
+    Equivalent to calling `select` for each of the ids in the dataframe, but 
+    each column is transformed to floats only once. If an id occurs more than 
+    once, the first row with this id is used, like in `select`.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Pandas dataframe containing multiple rows with arguments to pass along 
+        to functions defined in QVEmod. 
+
+    Return
+    ------
+    dict :
+        Dictionary with the values of column "id" as keys and, as values, 
+        dictionaries containing the argument names as keys and the values of the
+        arguments as floats.
+    """
+
+    columns = {
+        column: df[column].to_numpy(dtype = float) 
+        for column in df if column != 'id'
+    }
+
+    records = {}
+    for i, id in enumerate(df['id'].tolist()):
+        if id not in records:
+            records[id] = {column: values[i] for column, values in columns.items()}
+
+    return records